@@ -23,20 +23,20 @@ def key_hash(key: int) -> str:
     return sha256(str(key).encode()).hexdigest()
 
 
-def print_message(client: bool, send: bool, sock: socket.socket, data: str) -> None:
+def print_message(client: bool, send: bool, sock: socket.socket, data: str | bytes) -> None:
     """
-    Function prints message
+    Function prints message (in one write - the messages of the clients aren't mixed without a lock)
     :param client: True - Client, False - Server
     :param send: True - Send/TO, else Receive/FROM
     :param sock: current socket
     :param data: data that sends/receives
     """
     peer = sock.getpeername()
-    print(f"[{'Client' if client else 'Server'} Part {'Send' if send else 'Receive'}]")
-    print(f"[{'TO' if send else 'FROM'}: {peer[0]}:{peer[1]}]")
-    print(f"[Socket FD: {sock.fileno()}]\n-----------------------")
-    print(f"Content: {repr(data)}")
-    print("-----------------------\n\n\n")
+    print(f"[{'Client' if client else 'Server'} Part {'Send' if send else 'Receive'}]\n"
+          f"[{'TO' if send else 'FROM'}: {peer[0]}:{peer[1]}]\n"
+          f"[Socket FD: {sock.fileno()}]\n-----------------------\n"
+          f"Content: {repr(data)}\n"
+          "-----------------------\n\n\n")
 
 
 def ip_and_port(ip_port: str) -> tuple[str, int]:
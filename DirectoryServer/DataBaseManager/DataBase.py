@@ -2,6 +2,7 @@
 import sqlite3
 import os
 import random
+import threading
 
 from DataBaseUser import DataBaseUser
 
@@ -13,33 +14,465 @@ AVAILABLE = 1
 NOT_AVAILABLE = 0
 
 
+# Functions
+def _alias_table(weights: list[int]) -> tuple[list[float], list[int]]:
+    """
+    Function builds the alias table of the weights (Vose's alias method) - to draw an index by the weights in O(1):
+    a random column i, then i with probability probabilities[i] or else aliases[i]
+    :param weights: the positive weights
+    :return: the probabilities and the aliases of the columns
+    """
+    count, total = len(weights), sum(weights)
+
+    probabilities = [weight * count / total for weight in weights]
+    aliases = list(range(count))
+
+    small = [index for index, probability in enumerate(probabilities) if probability < 1]
+    large = [index for index, probability in enumerate(probabilities) if probability >= 1]
+
+    while small and large:
+        less, more = small.pop(), large.pop()
+
+        aliases[less] = more
+        probabilities[more] -= 1 - probabilities[less]
+
+        (small if probabilities[more] < 1 else large).append(more)
+
+    # Rounding leftovers are full columns
+    for index in small + large:
+        probabilities[index] = 1.0
+
+    return probabilities, aliases
+
+
+def _alias_draw(table: tuple[list[float], list[int]]) -> int:
+    """
+    Function draws an index from the alias table
+    :param table: the probabilities and the aliases of the columns
+    :return: the drawn index
+    """
+    probabilities, aliases = table
+    column = random.randrange(len(probabilities))
+
+    return column if random.random() < probabilities[column] else aliases[column]
+
+
 # Classes
+class _RelaySet:
+    """
+    Set of usernames with weights (bandwidths) in an array, to sample random members by their weights in O(1) each.
+    The array is updated in O(1) - a removed member is replaced by the last one.
+
+    The array is split into blocks - every block has an alias table of its members, and one alias table chooses the
+    block by the total weights of the blocks. A change marks its block only, and before the next sample the marked
+    blocks and the table of the blocks are built again - O(BLOCK_SIZE + blocks count) instead of O(members)
+    """
+
+    # Members in a block of the alias tables
+    BLOCK_SIZE = 256
+
+    # Drawn excluded members in a row before the members are chosen by a full scan (the excluded members have almost
+    # all the weight)
+    MAX_REDRAWS = 64
+
+    # Candidates drawn for every sampled member when the loads are given - the least loaded of them is sampled (the
+    # power of two choices). 1 - the loads aren't used
+    CHOICES = 2
+
+    def __init__(self):
+        """
+        Creates an empty set
+        """
+        self.__members: list[str] = []
+        self.__weights: list[int] = []
+        self.__positions: dict[str, int] = {}        # { username: index in the array }
+
+        self.__blocks_tables: list[tuple[list[float], list[int]] | None] = []      # None - the block was changed
+        self.__blocks_weights: list[int] = []
+        self.__table: tuple[list[float], list[int]] | None = None
+
+    def __len__(self) -> int:
+        return len(self.__members)
+
+    def __contains__(self, username: str) -> bool:
+        return username in self.__positions
+
+    def __mark(self, position: int) -> None:
+        """
+        Marks the block of the position as changed
+        :param position: the changed position in the array
+        """
+        block = position // _RelaySet.BLOCK_SIZE
+
+        if block < len(self.__blocks_tables):
+            self.__blocks_tables[block] = None
+
+        self.__table = None
+
+    def add(self, username: str, weight: int = 1) -> None:
+        """
+        Adds a member, or changes its weight (if it's a member)
+        :param username: the username to add
+        :param weight: the weight of the member (positive)
+        """
+        position = self.__positions.get(username)
+
+        if position is None:
+            self.__positions[username] = len(self.__members)
+            self.__members.append(username)
+            self.__weights.append(weight)
+
+            self.__mark(len(self.__members) - 1)
+
+        elif self.__weights[position] != weight:
+            self.__weights[position] = weight
+            self.__mark(position)
+
+    def discard(self, username: str) -> None:
+        """
+        Removes a member (if it's a member)
+        :param username: the username to remove
+        """
+        position = self.__positions.pop(username, None)
+
+        if position is not None:
+            last, weight = self.__members.pop(), self.__weights.pop()
+            self.__mark(len(self.__members))
+
+            if position < len(self.__members):
+                self.__members[position] = last
+                self.__weights[position] = weight
+                self.__positions[last] = position
+
+                self.__mark(position)
+
+    def __build(self) -> tuple[list[float], list[int]]:
+        """
+        Builds the alias tables of the changed blocks, and the table of the blocks
+        :return: the alias table of the blocks
+        """
+        if self.__table is None:
+            size = _RelaySet.BLOCK_SIZE
+            blocks_count = (len(self.__members) + size - 1) // size
+
+            del self.__blocks_tables[blocks_count:], self.__blocks_weights[blocks_count:]
+            self.__blocks_tables.extend([None] * (blocks_count - len(self.__blocks_tables)))
+            self.__blocks_weights.extend([0] * (blocks_count - len(self.__blocks_weights)))
+
+            for block, table in enumerate(self.__blocks_tables):
+                if table is None:
+                    weights = self.__weights[block * size:(block + 1) * size]
+
+                    self.__blocks_tables[block] = _alias_table(weights)
+                    self.__blocks_weights[block] = sum(weights)
+
+            self.__table = _alias_table(self.__blocks_weights)
+
+        return self.__table
+
+    def __draw(self) -> str:
+        """
+        Draws a member by the weights - O(1)
+        :return: the drawn member
+        """
+        block = _alias_draw(self.__build())
+        position = block * _RelaySet.BLOCK_SIZE + _alias_draw(self.__blocks_tables[block])
+
+        return self.__members[position]
+
+    def __draw_not_excluded(self, excluded: set[str]) -> str:
+        """
+        Draws a member that isn't excluded by the weights - O(1) expected (a drawn excluded member is drawn again)
+        :param excluded: the members that can't be drawn (at least one member isn't excluded)
+        :return: the drawn member
+        """
+        for _ in range(_RelaySet.MAX_REDRAWS):
+            username = self.__draw()
+
+            if username not in excluded:
+                return username
+
+        candidates = [index for index, member in enumerate(self.__members) if member not in excluded]
+        weights = [self.__weights[index] for index in candidates]
+
+        return self.__members[random.choices(candidates, weights)[0]]
+
+    def __load(self, username: str, loads: dict[str, int]) -> float:
+        """
+        Gives the load of a member per its weight, with one more load (the load if it's sampled)
+        :param username: the member
+        :param loads: the loads of the members
+        :return: the load per weight
+        """
+        return (loads.get(username, 0) + 1) / self.__weights[self.__positions[username]]
+
+    def sample(self, count: int, excluded: set[str], loads: dict[str, int] | None = None) -> list[str]:
+        """
+        Samples distinct random members that aren't excluded, by their weights - O(count) expected (at most
+        count + len(excluded) members are excluded).
+        With the loads, CHOICES candidates are drawn for every member and the least loaded of them (by the load per
+        weight, with the new load) is sampled
+        :param count: count of the members to sample
+        :param excluded: [reference] the members that can't be sampled, the sampled members are added to it
+        :param loads: the loads of the members (None - without the loads, a missing member isn't loaded)
+        :return: the sampled members. ValueError if there are less than `count` members that aren't excluded
+        """
+        available = len(self.__members) - sum(1 for username in excluded if username in self.__positions)
+
+        if available < count:
+            raise ValueError(f"Not enough relays: {count} needed, {available} available")
+
+        choices = 1 if (loads is None) else _RelaySet.CHOICES
+        sampled = []
+
+        while len(sampled) < count:
+            username = self.__draw_not_excluded(excluded)
+
+            for _ in range(choices - 1):
+                candidate = self.__draw_not_excluded(excluded)
+
+                if self.__load(candidate, loads) < self.__load(username, loads):
+                    username = candidate
+
+            excluded.add(username)
+            sampled.append(username)
+
+        return sampled
+
+
+class _RelayRegistry:
+    """
+    In-memory copy of the users table, indexed by username and by (ip, port). The rows have the layout of the table
+    (see DataBase indexes), but the RSA public key is already decoded to an int.
+    Read by the requests of the directory server instead of the database, and updated after every write to it.
+
+    The registry keeps the sets of the relays that can be in a circuit (available) and of the relays that can be its
+    exit node (available and allow exit node), so the paths are sampled without going over all the relays. A relay
+    is chosen with a probability proportional to its bandwidth.
+
+    The registry counts the open circuits of every relay (opened by construct, closed by teardown), and every relay of
+    a path is the less loaded (circuits per bandwidth) of two sampled relays - the popular relays aren't overloaded
+    """
+
+    def __init__(self):
+        """
+        Creates an empty registry
+        """
+        self.__relays: dict[str, tuple] = {}                          # { username: row }
+        self.__addresses: dict[tuple[str, int], set[str]] = {}       # { (ip, port): { username, ... } }
+        self.__mutex = threading.Lock()
+
+        # Relays that can be in a circuit, and relays that can be its exit node
+        self.__available = _RelaySet()
+        self.__exits = _RelaySet()
+
+        self.__circuits: dict[str, int] = {}         # { username: count of the open circuits (if any) }
+
+    def put(self, relay: tuple) -> None:
+        """
+        Adds a relay or replaces its row
+        :param relay: the row of the relay (the public key decoded)
+        """
+        username = relay[DataBase.USERNAME_INDEX]
+        address = relay[DataBase.IP_INDEX], relay[DataBase.PORT_INDEX]
+
+        with self.__mutex:
+            self.__remove_address(username)
+
+            # A replaced row keeps its place - the rows stay in the registration order
+            self.__relays[username] = relay
+            self.__addresses.setdefault(address, set()).add(username)
+
+            # The relays are chosen by their bandwidths
+            bandwidth = relay[DataBase.BANDWIDTH_INDEX]
+
+            if relay[DataBase.AVAILABLE_INDEX]:
+                self.__available.add(username, bandwidth)
+            else:
+                self.__available.discard(username)
+
+            if relay[DataBase.AVAILABLE_INDEX] and relay[DataBase.ALLOW_EXIT_NODE_INDEX]:
+                self.__exits.add(username, bandwidth)
+            else:
+                self.__exits.discard(username)
+
+    def update(self, username: str, values: dict[int, object]) -> None:
+        """
+        Changes columns of a relay (if exists). The writes are serialized by the database
+        :param username: the username of the relay
+        :param values: the new values by the indexes of the columns
+        """
+        relay = self.__relays.get(username)
+
+        if relay is not None:
+            self.put(tuple(values.get(index, value) for index, value in enumerate(relay)))
+
+    def update_by_address(self, ip: str, port: int, values: dict[int, object]) -> None:
+        """
+        Changes columns of all the relays with the given ip and port
+        :param ip: the ip of the relays
+        :param port: the port of the relays
+        :param values: the new values by the indexes of the columns
+        """
+        with self.__mutex:
+            usernames = list(self.__addresses.get((ip, port), ()))
+
+        for username in usernames:
+            self.update(username, values)
+
+    def remove(self, username: str) -> None:
+        """
+        Removes a relay (if exists)
+        :param username: the username of the relay
+        """
+        with self.__mutex:
+            self.__remove_address(username)
+            self.__relays.pop(username, None)
+
+            self.__available.discard(username)
+            self.__exits.discard(username)
+            self.__circuits.pop(username, None)
+
+    def __remove_address(self, username: str) -> None:
+        """
+        Removes a relay from the index of the addresses (the mutex must be held)
+        :param username: the username of the relay
+        """
+        relay = self.__relays.get(username)
+
+        if relay is not None:
+            address = relay[DataBase.IP_INDEX], relay[DataBase.PORT_INDEX]
+            usernames = self.__addresses[address]
+
+            usernames.discard(username)
+            if not usernames:
+                del self.__addresses[address]
+
+    def get(self, username: str) -> tuple | None:
+        """
+        Gives the row of a relay by its username
+        :param username: the username of the relay
+        :return: the row of the relay | None if there isn't such relay
+        """
+        return self.__relays.get(username)
+
+    def get_by_address(self, ip: str, port: int) -> tuple | None:
+        """
+        Gives the row of a relay by its ip and port (the first registered, like the query of the database)
+        :param ip: the ip of the relay
+        :param port: the port of the relay
+        :return: the row of the relay | None if there isn't such relay
+        """
+        with self.__mutex:
+            relays = [self.__relays[username] for username in self.__addresses.get((ip, port), ())]
+
+        return min(relays, default=None, key=lambda relay: relay[DataBase.ID_INDEX])
+
+    def get_path(self, source_username: str, destination_username: str, nodes_count: int) -> list[tuple]:
+        """
+        Samples random relays for a circuit by their bandwidths and loads - O(nodes_count) expected. The relays are
+        available, the last one allows to be an exit node, and the source and the destination aren't in the path
+        :param source_username: the username of the circuit's source
+        :param destination_username: the username of the circuit's destination
+        :param nodes_count: count of the relays in the path
+        :return: rows of the relays, the exit node is the last. ValueError if there are not enough relays
+        """
+        excluded = {source_username, destination_username}
+
+        with self.__mutex:
+            if nodes_count == 0:
+                return []
+
+            try:
+                exit_node = self.__exits.sample(1, excluded, self.__circuits)
+            except ValueError:
+                raise ValueError("Not enough relays: no available relay allows to be an exit node") from None
+
+            path = self.__available.sample(nodes_count - 1, excluded, self.__circuits) + exit_node
+            return [self.__relays[username] for username in path]
+
+    def open_circuit(self, usernames: list[str]) -> None:
+        """
+        Counts a new circuit of the relays
+        :param usernames: the usernames of the relays of the circuit
+        """
+        with self.__mutex:
+            for username in usernames:
+                if username in self.__relays:
+                    self.__circuits[username] = self.__circuits.get(username, 0) + 1
+
+    def close_circuit(self, usernames: list[str]) -> None:
+        """
+        Stops counting a circuit of the relays
+        :param usernames: the usernames of the relays of the circuit
+        """
+        with self.__mutex:
+            for username in usernames:
+                count = self.__circuits.pop(username, 0) - 1
+
+                if count > 0:
+                    self.__circuits[username] = count
+
+    def get_circuits_counts(self) -> dict[str, int]:
+        """
+        Gives the counts of the open circuits of the relays
+        :return: the count of every relay with open circuits
+        """
+        with self.__mutex:
+            return dict(self.__circuits)
+
+    def get_all(self) -> list[tuple]:
+        """
+        Gives the rows of all the relays
+        :return: list of the rows, in the registration order
+        """
+        with self.__mutex:
+            return list(self.__relays.values())
+
+
 class DataBase:
     """
     Class that gives management of the database file.
-    Class provides functionality to add users, remove them, check password, and so on
+    Class provides functionality to add users, remove them, check password, and so on.
+
+    Every thread keeps its own connection to the database (the server handles every client in a thread), open until
+    the thread ends. The database runs in the WAL mode (the readers don't wait for the writer), and the statements are
+    parameterized - sqlite prepares every statement once per connection and reuses it.
+
+    The requests read the relays from an in-memory registry (loaded at startup), and the writes go to the database and
+    then to the registry (write-through), under one mutex - so the registry has the rows of the database
     """
 
     # Static variables
+    ID_INDEX = 0
     USERNAME_INDEX = 1
     PASSWORD_INDEX = 2
+    PUBLIC_KEY_INDEX = 3
 
     IP_INDEX = 4
     PORT_INDEX = 5
+    ALLOW_EXIT_NODE_INDEX = 6
     AVAILABLE_INDEX = 7
+    X25519_KEY_INDEX = 8
+    BANDWIDTH_INDEX = 9
 
     def __init__(self, db_path: str):
         """
-        Constructor of DataBase class. Initialize connection and cursor fields.
-        Updates existing table or creates a new one \n
+        Constructor of DataBase class. Initialize the connections of the threads.
+        Updates existing table or creates a new one, and loads the registry of the relays \n
         :param db_path: path to the database file
         """
         self.__path = db_path
-        self.__db_connection: sqlite3.Connection = None
-        self.__db_cursor: sqlite3.Cursor = None
+        self.__connections = threading.local()
 
         DataBase.__create_if_not_exist_and_update(self.__path)
 
+        self.__registry = _RelayRegistry()
+        self.__write_mutex = threading.Lock()
+
+        for user in self.get_users():
+            self.__registry.put(DataBase.__decode(user))
+
     @staticmethod
     def __create_if_not_exist_and_update(path: str) -> None:
         """
@@ -53,7 +486,7 @@ class DataBase:
         connection = sqlite3.connect(path)
         cursor = connection.cursor()
 
-        cursor.execute('''CREATE TABLE IF NOT EXISTS users (
+        cursor.execute(f'''CREATE TABLE IF NOT EXISTS users (
             id INTEGER PRIMARY KEY AUTOINCREMENT,
             username TEXT UNIQUE NOT NULL,
             password TEXT NOT NULL,
@@ -61,43 +494,83 @@ class DataBase:
             ip TEXT NOT NULL,
             port INTEGER NOT NULL,
             allow_exit_node INTEGER NOT NULL,
-            available INTEGER NOT NULL
+            available INTEGER NOT NULL,
+            x25519_key BLOB,
+            bandwidth INTEGER NOT NULL DEFAULT {DataBaseUser.DEFAULT_BANDWIDTH}
         )''')
 
+        # Tables of the older versions don't have the X25519 key and the bandwidth columns
+        columns = [column[1] for column in cursor.execute('PRAGMA table_info(users)')]
+        if 'x25519_key' not in columns:
+            cursor.execute('ALTER TABLE users ADD COLUMN x25519_key BLOB')
+
+        if 'bandwidth' not in columns:
+            cursor.execute(f'ALTER TABLE users ADD COLUMN bandwidth INTEGER NOT NULL DEFAULT {DataBaseUser.DEFAULT_BANDWIDTH}')
+
+        # Lookups of the relays by ip and port (get_rsa, teardown). The username is indexed by its UNIQUE constraint
+        cursor.execute('CREATE INDEX IF NOT EXISTS users_ip_port ON users (ip, port)')
+
         #cursor.execute('''DELETE FROM users''')
 
         connection.commit()
+
+        # The journal mode is stored in the database file
+        cursor.execute('PRAGMA journal_mode = WAL')
+
         cursor.close()
         connection.close()
 
-    def __open_connection(self) -> None:
+    def __get_connection(self) -> sqlite3.Connection:
         """
-        Method that opens connection to the database
+        Method gives the connection of the current thread to the database (opens it on the first use).
+        The connection commits the changes at the end of a `with` block, and rolls them back on an exception
+        :return: the connection of the current thread
         """
-        self.__db_connection = sqlite3.connect(self.__path)
-        self.__db_cursor = self.__db_connection.cursor()
+        connection = getattr(self.__connections, 'connection', None)
+
+        if connection is None:
+            connection = sqlite3.connect(self.__path)
+
+            # In the WAL mode the commits are durable without a sync of every transaction
+            connection.execute('PRAGMA synchronous = NORMAL')
+
+            self.__connections.connection = connection
 
-    def __close_connection(self) -> None:
+        return connection
+
+    def close(self) -> None:
         """
-        Method that closes connection to the database
+        Method that closes the connection of the current thread to the database
         """
-        self.__db_connection.commit()
-        self.__db_cursor.close()
-        self.__db_connection.close()
+        connection = getattr(self.__connections, 'connection', None)
+
+        if connection is not None:
+            connection.close()
+            self.__connections.connection = None
+
+    @staticmethod
+    def __decode(user: tuple) -> tuple:
+        """
+        Method converts a row of the database to a row of the registry (decodes the RSA public key)
+        :param user: the row of the database
+        :return: the row of the registry
+        """
+        public_key = int.from_bytes(user[DataBase.PUBLIC_KEY_INDEX], byteorder='big')
+        return user[:DataBase.PUBLIC_KEY_INDEX] + (public_key,) + user[DataBase.PUBLIC_KEY_INDEX + 1:]
 
     def get_users(self) -> list[tuple]:
         """
         Method that returns all users in database
         :return: list of all users in database (every user represented as a tuple)
         """
-        self.__open_connection()
-
-        self.__db_cursor.execute('SELECT * FROM users')
-        users = self.__db_cursor.fetchall()
+        return self.__get_connection().execute('SELECT * FROM users').fetchall()
 
-        self.__close_connection()
-
-        return users
+    def get_relays(self) -> list[tuple]:
+        """
+        Method that returns all users from the registry (without the database)
+        :return: list of all users, the RSA public key of every user is decoded to an int
+        """
+        return self.__registry.get_all()
 
     def add_user(self, user: DataBaseUser) -> bool:
         """
@@ -108,19 +581,25 @@ class DataBase:
         if self.does_username_exists(user.get_username()):
             return False
 
-        self.__open_connection()
-
         data_tuple = (
             user.get_username(), user.get_password(), sqlite3.Binary(user.get_public_key_n().to_bytes(BYTES_COUNT, "big")),
-            user.get_ip(), user.get_port(), int(user.get_allow_exit_node()), AVAILABLE
+            user.get_ip(), user.get_port(), int(user.get_allow_exit_node()), AVAILABLE, user.get_x25519_public_key(),
+            user.get_bandwidth()
         )
 
-        self.__db_cursor.execute(
-            f'INSERT INTO users (username, password, public_key, ip, port, allow_exit_node, available) VALUES (?, ?, ?, ?, ?, ?, ?)',
-            data_tuple
-        )
+        with self.__write_mutex:
+            with self.__get_connection() as connection:
+                cursor = connection.execute(
+                    'INSERT INTO users (username, password, public_key, ip, port, allow_exit_node, available, x25519_key, bandwidth) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)',
+                    data_tuple
+                )
+
+            self.__registry.put((
+                cursor.lastrowid, user.get_username(), user.get_password(), user.get_public_key_n(),
+                user.get_ip(), user.get_port(), int(user.get_allow_exit_node()), AVAILABLE, user.get_x25519_public_key(),
+                user.get_bandwidth()
+            ))
 
-        self.__close_connection()
         return True
 
     def remove_user(self, username: str) -> None:
@@ -128,11 +607,11 @@ class DataBase:
         Method that removes user from the database
         :param username: the username to remove from the database
         """
-        self.__open_connection()
+        with self.__write_mutex:
+            with self.__get_connection() as connection:
+                connection.execute('DELETE FROM users WHERE username = ?', (username,))
 
-        self.__db_cursor.execute(f'DELETE FROM users WHERE username = "{username}"')
-
-        self.__close_connection()
+            self.__registry.remove(username)
 
     def is_password_valid(self, username: str, password: str) -> bool:
         """
@@ -141,15 +620,10 @@ class DataBase:
         :param password: the password of the user to check
         :return: True - if password math with username | else - False
         """
-        self.__open_connection()
-
-        self.__db_cursor.execute(f'SELECT * FROM users WHERE username = "{username}" AND password = "{password}"')
-        data = self.__db_cursor.fetchall()
-
-        self.__close_connection()
+        user = self.__registry.get(username)
 
         # Username and password are correct
-        return (data is not None) and (len(data) != 0)
+        return (user is not None) and (user[DataBase.PASSWORD_INDEX] == password)
 
     def does_username_exists(self, username: str):
         """
@@ -157,15 +631,8 @@ class DataBase:
         :param username: the username of user to check
         :return: True - if username exists | else - False
         """
-        self.__open_connection()
-
-        self.__db_cursor.execute(f'SELECT * FROM users WHERE username = "{username}"')
-        data = self.__db_cursor.fetchall()
-
-        self.__close_connection()
-
         # Username exists
-        return (data is not None) and (len(data) != 0)
+        return self.__registry.get(username) is not None
 
     def change_ip_and_port(self, username: str, new_port: int, new_ip: str) -> bool:
         """
@@ -178,25 +645,64 @@ class DataBase:
         if not self.does_username_exists(username):
             return False
 
-        self.__open_connection()
-
         # Update the port and ip for the specified username
-        self.__db_cursor.execute(f'UPDATE users SET port = {new_port}, ip = "{new_ip}" WHERE username = "{username}"')
+        with self.__write_mutex:
+            with self.__get_connection() as connection:
+                connection.execute('UPDATE users SET port = ?, ip = ? WHERE username = ?', (int(new_port), new_ip, username))
+
+            self.__registry.update(username, {DataBase.PORT_INDEX: int(new_port), DataBase.IP_INDEX: new_ip})
 
-        self.__close_connection()
         return True
 
     def change_rsa_public_key(self, user: DataBaseUser):
-        self.__open_connection()
-
         rsa_key = user.get_public_key_n().to_bytes(BYTES_COUNT, "big")
 
-        self.__db_cursor.execute(
-            f'UPDATE users SET public_key = ? WHERE username = ? AND password = ?',
-            (sqlite3.Binary(rsa_key), user.get_username(), user.get_password())
-        )
+        with self.__write_mutex:
+            with self.__get_connection() as connection:
+                connection.execute(
+                    'UPDATE users SET public_key = ? WHERE username = ? AND password = ?',
+                    (sqlite3.Binary(rsa_key), user.get_username(), user.get_password())
+                )
+
+            if self.is_password_valid(user.get_username(), user.get_password()):
+                self.__registry.update(user.get_username(), {DataBase.PUBLIC_KEY_INDEX: user.get_public_key_n()})
+
+        return True
+
+    def change_x25519_public_key(self, user: DataBaseUser) -> bool:
+        """
+        Method changes user's static X25519 public key (removes it if the user doesn't offer the x25519 suite anymore)
+        :param user: the instance of DataBaseUser with the new key
+        :return: True - if succeed
+        """
+        with self.__write_mutex:
+            with self.__get_connection() as connection:
+                connection.execute(
+                    'UPDATE users SET x25519_key = ? WHERE username = ? AND password = ?',
+                    (user.get_x25519_public_key(), user.get_username(), user.get_password())
+                )
+
+            if self.is_password_valid(user.get_username(), user.get_password()):
+                self.__registry.update(user.get_username(), {DataBase.X25519_KEY_INDEX: user.get_x25519_public_key()})
+
+        return True
+
+    def change_bandwidth(self, user: DataBaseUser) -> bool:
+        """
+        Method changes user's bandwidth (the user measures it on every start)
+        :param user: the instance of DataBaseUser with the new bandwidth
+        :return: True - if succeed
+        """
+        with self.__write_mutex:
+            with self.__get_connection() as connection:
+                connection.execute(
+                    'UPDATE users SET bandwidth = ? WHERE username = ? AND password = ?',
+                    (user.get_bandwidth(), user.get_username(), user.get_password())
+                )
+
+            if self.is_password_valid(user.get_username(), user.get_password()):
+                self.__registry.update(user.get_username(), {DataBase.BANDWIDTH_INDEX: user.get_bandwidth()})
 
-        self.__close_connection()
         return True
 
     def change_availability(self, not_available_ip: str, port: int, available: int = 0) -> bool:
@@ -207,12 +713,14 @@ class DataBase:
         :param available: available flag (0 - not available)
         :return: True - if succeed to change ip and port | else - False
         """
-        self.__open_connection()
-
         # Update the availability for the specified ip
-        self.__db_cursor.execute(f'UPDATE users SET available = {available} WHERE ip = "{not_available_ip}" AND port = {port}')
+        with self.__write_mutex:
+            with self.__get_connection() as connection:
+                connection.execute('UPDATE users SET available = ? WHERE ip = ? AND port = ?',
+                                   (int(available), not_available_ip, int(port)))
+
+            self.__registry.update_by_address(not_available_ip, int(port), {DataBase.AVAILABLE_INDEX: int(available)})
 
-        self.__close_connection()
         return True
 
     def get_rsa_by_ip(self, ip: str, port: int) -> int:
@@ -220,37 +728,64 @@ class DataBase:
         Method gives rsa public key of the user with given ip and port
         :param ip: the ip of the user to get rsa public key
         :param port: the port of the user to get rsa public key
-        :return: the rsa public key of the user by ip and port
+        :return: the rsa public key of the user by ip and port. ValueError if there isn't such user
         """
-        self.__open_connection()
+        user = self.__registry.get_by_address(ip, int(port))
 
-        self.__db_cursor.execute(f'SELECT public_key FROM users WHERE ip = "{ip}" AND port = {port}')
-        public_key = int.from_bytes(self.__db_cursor.fetchone()[0], byteorder='big')
+        if user is None:
+            raise ValueError(f"Unknown relay {ip}:{port}")
 
-        self.__close_connection()
-        return public_key
+        return user[DataBase.PUBLIC_KEY_INDEX]
 
-    def get_circuit(self, source_username: str, destination_username: str, nodes_count: int = 3) -> list[tuple[int, str, str, bytes, str, int, int, int]]:
+    def get_x25519_by_ip(self, ip: str, port: int) -> bytes | None:
         """
-        Function generates circuit of users
+        Method gives static X25519 public key of the user with given ip and port
+        :param ip: the ip of the user to get the key
+        :param port: the port of the user to get the key
+        :return: the static X25519 public key of the user (None - the user doesn't offer the x25519 handshake suite).
+                 ValueError if there isn't such user
+        """
+        user = self.__registry.get_by_address(ip, int(port))
+
+        if user is None:
+            raise ValueError(f"Unknown relay {ip}:{port}")
+
+        return user[DataBase.X25519_KEY_INDEX]
+
+    def get_circuit(self, source_username: str, destination_username: str, nodes_count: int = 3) -> list[tuple[int, str, str, int, str, int, int, int, bytes, int]]:
+        """
+        Function generates circuit of users - random available relays (by their bandwidths and open circuits), the last
+        relay allows to be an exit node
         :param source_username: circuit from username
         :param destination_username: circuit to the target username
         :param nodes_count: nodes count in the circuit - default is 3
-        :return: list of users to be in the circuit. [(id, username, password, key, ip, port, can_exit_node, available), ...]
+        :return: list of users to be in the circuit (ValueError if there are not enough relays). [(id, username, password, key, ip, port, can_exit_node, available, x25519_key, bandwidth), ...]
         """
-        original_users = self.get_users()
+        destination_user = self.__registry.get(destination_username)
+
+        if (destination_user is None) or (self.__registry.get(source_username) is None):
+            raise ValueError("Unknown source or destination user")
 
-        # Remove source user of the users's list
-        source_user = [user for user in original_users if user[DataBase.USERNAME_INDEX] == source_username][0]
-        original_users.remove(source_user)
+        # Available relays, without the source and the destination. The last one (before the destination) is the exit
+        return self.__registry.get_path(source_username, destination_username, nodes_count) + [destination_user]
 
-        # Remove destination user of the users's list
-        destination_user = [user for user in original_users if user[DataBase.USERNAME_INDEX] == destination_username][0]
-        original_users.remove(destination_user)
+    def open_circuit(self, relays: list[tuple]) -> None:
+        """
+        Method counts a constructed circuit in the loads of its relays (the next circuits prefer less loaded relays)
+        :param relays: the relays of the circuit (rows of get_circuit, without the destination)
+        """
+        self.__registry.open_circuit([relay[DataBase.USERNAME_INDEX] for relay in relays])
 
-        if len(original_users) < nodes_count:
-            # Error
-            pass
+    def close_circuit(self, relays: list[tuple]) -> None:
+        """
+        Method removes a torn down circuit from the loads of its relays
+        :param relays: the relays of the circuit (rows of get_circuit, without the destination)
+        """
+        self.__registry.close_circuit([relay[DataBase.USERNAME_INDEX] for relay in relays])
 
-        random.shuffle(original_users)
-        return original_users[:nodes_count] + [destination_user]
+    def get_circuits_counts(self) -> dict[str, int]:
+        """
+        Method gives the counts of the open circuits of the relays
+        :return: { username: count of the open circuits } of the relays with open circuits
+        """
+        return self.__registry.get_circuits_counts()
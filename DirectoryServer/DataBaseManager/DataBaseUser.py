@@ -2,12 +2,28 @@
 class DataBaseUser:
     """
     Class represents database user (just filled with database fields)
+
+    Attributes:
+    - DEFAULT_BANDWIDTH (int): Bandwidth of the users that don't report it (KB/s)
+    - MAX_BANDWIDTH (int): Bandwidth that the reports are clamped to (KB/s)
+    - X25519_KEY_SIZE (int): Size of the static X25519 public keys (bytes, x25519.KEY_SIZE of the users)
     """
 
+    # Bandwidth of the users that don't report it (KB/s)
+    DEFAULT_BANDWIDTH = 1024
+
+    # Bandwidth that the reports are clamped to (KB/s) - far above the onion layer decryption of a relay (~1 MB/s), so
+    # a relay that reports a huge bandwidth gets the share of a fast relay and not most of the circuits
+    MAX_BANDWIDTH = 16 * 1024
+
+    # Size of the static X25519 public keys (bytes)
+    X25519_KEY_SIZE = 32
+
     def __init__(self, arguments: str):
         """
         Constructor - creates user instance from given string, where every item
         separated by ', and represents database table column
+        ValueError if a field is malformed (the static X25519 key must be X25519_KEY_SIZE bytes)
         """
         parameters = arguments.split(',')
 
@@ -22,6 +38,19 @@ class DataBaseUser:
 
         self.__allow_exit_node = bool(int(parameters[6]))
 
+        # Static X25519 public key (hex) - only the users that offer the x25519 handshake suite send it
+        x25519_public_key = parameters[7] if len(parameters) > 7 else ''
+        self.__x25519_public_key = bytes.fromhex(x25519_public_key) if x25519_public_key else None
+
+        # Every handshake with a wrong size key would fail - the key isn't published
+        if self.__x25519_public_key is not None and len(self.__x25519_public_key) != DataBaseUser.X25519_KEY_SIZE:
+            raise ValueError(f"X25519 public key must be {DataBaseUser.X25519_KEY_SIZE} bytes")
+
+        # Bandwidth that the user measured (KB/s) - the share of the circuits that the user relays
+        bandwidth = parameters[8] if len(parameters) > 8 else ''
+        self.__bandwidth = min(max(int(bandwidth), 1), DataBaseUser.MAX_BANDWIDTH) if bandwidth else \
+            DataBaseUser.DEFAULT_BANDWIDTH
+
     def get_username(self) -> str:
         """
         Getter for user's username
@@ -70,3 +99,17 @@ class DataBaseUser:
         :return: allow exit node flag
         """
         return self.__allow_exit_node
+
+    def get_x25519_public_key(self) -> bytes | None:
+        """
+        Getter for user's static X25519 public key
+        :return: user's static X25519 public key (None - the user doesn't offer the x25519 handshake suite)
+        """
+        return self.__x25519_public_key
+
+    def get_bandwidth(self) -> int:
+        """
+        Getter for user's bandwidth
+        :return: user's bandwidth (KB/s)
+        """
+        return self.__bandwidth
@@ -1,6 +1,9 @@
 # Global imports
+import asyncio
 import socket
 import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 
 import os
 import sys
@@ -17,7 +20,7 @@ def add_directory_server_paths():
 add_directory_server_paths()
 
 # Project imports
-from Encryptions.DH import dh
+from Encryptions.DH import dh, dh_pool
 from Encryptions.AES import aes
 from Encryptions.RSA import rsa
 
@@ -28,247 +31,289 @@ from Constants import Constants
 
 
 # Classes
-class ExternalServer:
+class _DirectoryRequests:
     """
-    Class of external server that must be running, to provide to TOR nodes required data
+    The requests of the directory server without the connections - shared by ExternalServer and the threaded server
+    of the benchmarks. The methods are called from several threads: the database serializes its writes and the
+    registry of the relays has its own lock, so the reads take no mutex. The append of a user (several writes) and
+    the circuits have their own mutexes, and a read never waits for a write of the database.
+    The start (DH) and the requests that write the database block, the other requests read the registry only
     """
 
-    # Path to the DB file. Can be changed
-    DB_PATH = '../DataBase/TOR_DB.db'
+    # Requests that write the database
+    WRITE_REQUESTS = ('append', 'teardown')
 
-    def __init__(self, db_path: str = None):
+    # Requests that have no response
+    NO_RESPONSE_REQUESTS = ('teardown', 'close')
+
+    # Seconds that a circuit counts in the loads of its relays without a close or a teardown request (the clients that
+    # crash never send them)
+    CIRCUIT_LIFETIME = 10 * 60
+
+    def __init__(self, db_path: str):
         """
-        Constructor of the external server that initialize fields
+        Constructor of the requests that initialize fields
         :param db_path: path to the database file (to create)
         """
-        dp_path = ExternalServer.DB_PATH if (db_path is None) else db_path
-        self.__db = DataBase(dp_path)
+        self.__db = DataBase(db_path)
 
-        self.__server_socket: socket.socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-        self.__mutex = threading.Lock()
+        self.__append_mutex = threading.Lock()
+        self.__circuits_mutex = threading.Lock()
 
-        self.__aes_keys: dict[socket.socket, aes] = {}
-        self.__circuit_ids: dict[int, list[tuple]] = {}
+        self.__circuit_ids: dict[int, tuple[list[tuple], float]] = {}      # { circuit_id: (users, construct time) }
 
-    def start_server(self) -> None:
+    @staticmethod
+    def start() -> tuple[dh, int, str]:
         """
-        Method starts the server, listening for the new clients, and run detached thread for everyone
+        Static method that starts the session of a client (start request) - DH parameters of a random preset and a key
+        pair of the server
+        :return: tuple of the dh instance, the private number of the server and the response (p, g and public key)
         """
-        try:
-            self.__server_socket.bind((Constants.IP, Constants.PORT))
-            self.__server_socket.listen()
-
-            print(f"[Directory Server] Bind ON {Constants.IP}:{Constants.PORT}", end='\n\n\n')
-            print(f"[Directory Server] Start listen port: {Constants.PORT}", end='\n\n\n')
-
-            while True:
-                client_socket, client_address = self.__server_socket.accept()
+        client_parameters = p, g = dh.generate_parameters()
 
-                client_thread = threading.Thread(target=self.__handle_new_client, args=(client_socket,))
-                client_thread.daemon = True
-                client_thread.start()
+        DH = dh(client_parameters)
+        private_number, public_key = dh_pool.get_default().get_key_pair(client_parameters)
 
-        except OSError as e:
-            print(e)
-            exit(1)
+        return DH, private_number, f"{p},{g},{public_key}"
 
-    def __handle_new_client(self, client_socket: socket.socket) -> None:
+    @staticmethod
+    def finish_start(DH: dh, private_number: int, request: str) -> aes | None:
         """
-        Method to handle new clients (runs in detached thread for each new connected client).
-        Method runs infinity until user is disconnected
-        :param client_socket: the socket with the current client
+        Static method that finishes the session of a client - the final dh key from the client's public key
+        :param DH: the dh instance of the start
+        :param private_number: the private number of the server
+        :param request: the client's public key and the hash of the dh key
+        :return: aes of the session | None if the hash of the dh key isn't the same
         """
+        public_key, dh_hash = request.split(',')
+        dh_key = DH.exchange(int(public_key), private_number)
 
-        # Aes of the client (currently none)
-        AES = None
-
-        while True:
-            request = client_socket.recv(Constants.BUFF_SIZE).decode()
-
-            if not request:
-                continue
-
-            if (request == "start") and not AES:
-                with self.__mutex:
-                    Constants.print_message(False, False, client_socket, request)
+        if Constants.key_hash(dh_key) != dh_hash:
+            return None
 
-                current_dh_key = ExternalServer.__handle_start_request(client_socket)
+        return aes(dh_key)
 
-                if current_dh_key != Constants.ERROR_CODE:
-                    AES = aes(current_dh_key)
-                    with self.__mutex:
-                        self.__aes_keys[client_socket] = AES
+    def handle(self, client_socket: socket.socket, AES: aes, request: bytes) -> bytes | None:
+        """
+        Method that handles an encrypted request of a started session
+        :param client_socket: socket of the current user (to print the messages)
+        :param AES: aes instance of the current user
+        :param request: the encrypted request
+        :return: the encrypted response (see respond)
+        """
+        return self.respond(AES, _DirectoryRequests.decrypt(client_socket, AES, request))
 
-                continue
+    @staticmethod
+    def decrypt(client_socket: socket.socket, AES: aes, request: bytes) -> str:
+        """
+        Static method that decrypts a request of a started session
+        :param client_socket: socket of the current user (to print the messages)
+        :param AES: aes instance of the current user
+        :param request: the encrypted request
+        :return: the decrypted request
+        """
+        decrypted_request = AES.decrypt_bytes(request).decode()
+        Constants.print_message(False, False, client_socket, decrypted_request)
 
-            # Decrypt the request (if encrypted)
-            decrypted_request = AES.decrypt(request)
+        return decrypted_request
 
-            with self.__mutex:
-                Constants.print_message(False, False, client_socket, decrypted_request)
+    @staticmethod
+    def is_write_request(decrypted_request: str) -> bool:
+        """
+        Static method checks if the request writes the database (blocks)
+        :param decrypted_request: the decrypted request
+        :return: True - if the request writes the database | else - False
+        """
+        return decrypted_request.startswith(_DirectoryRequests.WRITE_REQUESTS)
 
+    def respond(self, AES: aes, decrypted_request: str) -> bytes | None:
+        """
+        Method that handles a decrypted request of a started session
+        :param AES: aes instance of the current user
+        :param decrypted_request: the decrypted request
+        :return: the encrypted response ("error" for a malformed request) | b'' if the request has no response
+                 (teardown and close) | None if the session ends (stop or an unknown request)
+        """
+        try:
             if decrypted_request == "get_dh":
-                ExternalServer.__handle_dh_request(client_socket, AES)
+                response = _DirectoryRequests.__handle_dh_request()
 
             elif decrypted_request.startswith("get_rsa"):
-                self.__handle_rsa_request(client_socket, decrypted_request, AES)
+                response = self.__handle_rsa_request(decrypted_request)
 
             elif decrypted_request.startswith("append"):
-                self.__handle_append_request(client_socket, decrypted_request, AES)
+                response = self.__handle_append_request(decrypted_request)
 
             elif decrypted_request.startswith("construct"):
-                self.__handle_construct_request(client_socket, decrypted_request, AES)
+                response = self.__handle_construct_request(decrypted_request)
 
             elif decrypted_request.startswith("teardown"):
                 self.__handle_teardown_request(decrypted_request)
+                return b''
 
-            elif decrypted_request.startswith("stop"):
-                break
+            elif decrypted_request.startswith("close"):
+                self.__handle_close_request(decrypted_request)
+                return b''
 
             else:
-                break
-
-        client_socket.close()
-
-    @staticmethod
-    def __handle_start_request(client_socket: socket.socket) -> int:
-        """
-        Static method that handles start request for each user
-        :param client_socket: socket of the current user
-        :return: the final dh key between client and directory server
-        """
-        client_parameters = p, g = dh.generate_parameters()
-
-        DH = dh(client_parameters)
-        private_number = dh.generate_private_number()
-        public_key = DH.generate_public_key(private_number)
+                # Stop or unknown request
+                return None
 
-        dh_response = f"{p},{g},{public_key}"
-
-        client_socket.sendall(dh_response.encode())
-        Constants.print_message(False, True, client_socket, dh_response)
-
-        dh_request = client_socket.recv(Constants.BUFF_SIZE).decode()
-        Constants.print_message(False, False, client_socket, dh_request)
-
-        public_key, dh_hash = dh_request.split(',')
-        dh_key = DH.exchange(int(public_key), private_number)
+        except (IndexError, ValueError) as e:
+            # Malformed request (no parameters after '#', missing or not numeric fields)
+            print(f"[Directory Server] Request error: {e!r}", end='\n\n\n')
 
-        if Constants.key_hash(dh_key) != dh_hash:
-            return Constants.ERROR_CODE
+            # The requests without a response are just dropped - the client doesn't wait for an answer
+            if decrypted_request.startswith(_DirectoryRequests.NO_RESPONSE_REQUESTS):
+                return b''
 
-        client_socket.sendall("started".encode())
-        Constants.print_message(False, True, client_socket, "started")
+            response = "error"
 
-        return dh_key
+        return AES.encrypt_bytes(response.encode())
 
     @staticmethod
-    def __handle_dh_request(client_socket: socket.socket, AES: aes) -> None:
+    def __handle_dh_request() -> str:
         """
         Static method that handles dh request for each user.
-        Just to get random p, g dh parameters from the server \n
-        :param client_socket: socket of the current user
-        :param AES: aes instance of the current user - to encrypt message
+        Just to get random p, g dh parameters from the server
+        :return: the response
         """
         p, g = dh.generate_parameters()
 
-        get_dh_response = f"{p},{g}"
-        get_dh_response_encrypted = AES.encrypt(get_dh_response)
-
-        client_socket.sendall(get_dh_response_encrypted.encode())
-        Constants.print_message(False, True, client_socket, get_dh_response_encrypted)
+        return f"{p},{g}"
 
-    def __handle_rsa_request(self, client_socket: socket.socket, request: str, AES: aes) -> None:
+    def __handle_rsa_request(self, request: str) -> str:
         """
-        Static method that handles rsa request for each user.
-        Sends to the user rsa public key by given ip and port \n
-        :param client_socket: socket of the current user
+        Method that handles rsa request for each user.
+        Gives the rsa public key (and static X25519 key) of the user by given ip and port
         :param request: the request string
-        :param AES: aes instance of the current user - to encrypt message
+        :return: the response
         """
         ip, port = Constants.ip_and_port(request.split('#')[1])
 
-        with self.__mutex:
+        try:
             rsa_public_key = self.__db.get_rsa_by_ip(ip, port)
+            x25519_public_key = self.__db.get_x25519_by_ip(ip, port)
 
-        get_public_key_response = f"{rsa.PUBLIC_EXPONENT},{rsa_public_key}"
-        get_public_key_response_encrypted = AES.encrypt(get_public_key_response)
+        except ValueError as e:
+            print(f"[Directory Server] Get rsa error: {e}", end='\n\n\n')
+            return "error"
 
-        client_socket.sendall(get_public_key_response_encrypted.encode())
+        # The static X25519 key (hex) is empty if the user doesn't offer the x25519 handshake suite
+        x25519_public_key = '' if (x25519_public_key is None) else x25519_public_key.hex()
 
-        with self.__mutex:
-            Constants.print_message(False, True, client_socket, get_public_key_response_encrypted)
+        return f"{rsa.PUBLIC_EXPONENT},{rsa_public_key},{x25519_public_key}"
 
-    def __handle_append_request(self, client_socket: socket.socket, request: str, AES: aes) -> None:
+    def __handle_append_request(self, request: str) -> str:
         """
-        Static method that handles append request for each user.
-        Adds user to the database \n
-        :param client_socket: socket of the current user
+        Method that handles append request for each user.
+        Adds user to the database
         :param request: the request string
-        :param AES: aes instance of the current user - to encrypt message
+        :return: the response
         """
-        parameters = request.split('#')[1]
+        try:
+            user = DataBaseUser(request.split('#', 1)[1])
+
+        except (IndexError, ValueError) as e:
+            # Malformed parameters (a wrong size X25519 key, not a number...)
+            print(f"[Directory Server] Append error: {e}", end='\n\n\n')
+            return "error"
 
-        user = DataBaseUser(parameters)
         result = False
 
-        with self.__mutex:
+        with self.__append_mutex:
             if not self.__db.does_username_exists(user.get_username()):
                 result = self.__db.add_user(user)
 
             elif self.__db.is_password_valid(user.get_username(), user.get_password()):
                 result = self.__db.change_ip_and_port(user.get_username(), user.get_port(), user.get_ip()) and \
                          self.__db.change_rsa_public_key(user) and \
+                         self.__db.change_x25519_public_key(user) and \
+                         self.__db.change_bandwidth(user) and \
                          self.__db.change_availability(user.get_ip(), user.get_port(), available=1)
 
-        append_response = "appended" if result else "error"
-        append_response_encrypted = AES.encrypt(append_response)
+        return "appended" if result else "error"
 
-        client_socket.sendall(append_response_encrypted.encode())
-        with self.__mutex:
-            Constants.print_message(False, True, client_socket, append_response_encrypted)
-
-    def __handle_construct_request(self, client_socket: socket.socket, request: str, AES: aes) -> None:
+    def __handle_construct_request(self, request: str) -> str:
         """
-        Static method that handles construct request for each user.
-        Chose random three users from database and sends their ip and ports
-        :param client_socket: socket of the current user
+        Method that handles construct request for each user.
+        Chose random three available users from database (the last one allows to be an exit node) and gives their ip
+        and ports, or error if there are not enough users
         :param request: the request string
-        :param AES: aes instance of the current user - to encrypt message
+        :return: the response
         """
         source, destination = request.split('#')[1].split(',', 1)
 
-        if source == destination:
-            message = AES.encrypt('error')
-            client_socket.sendall(message.encode())
+        try:
+            if source == destination:
+                raise ValueError("The source and the destination are the same user")
 
-        with self.__mutex:
             users = self.__db.get_circuit(source, destination)
+
+        except ValueError as e:
+            # Unknown users or not enough relays
+            print(f"[Directory Server] Construct error: {e}", end='\n\n\n')
+            return "error"
+
+        with self.__circuits_mutex:
+            self.__expire_circuits()
             circuit_id = self.__generate_circuit_id()
 
-            self.__circuit_ids[circuit_id] = users
+            self.__circuit_ids[circuit_id] = users, time.monotonic()
+            self.__db.open_circuit(users[:-1])
 
         # ip:port of each user
         users = [f"{user[DataBase.IP_INDEX]}:{user[DataBase.PORT_INDEX]}" for user in users]
 
-        response = f"{circuit_id},{','.join(users)}"
-        response_encrypted = AES.encrypt(response)
-
-        client_socket.sendall(response_encrypted.encode())
-        with self.__mutex:
-            Constants.print_message(False, True, client_socket, response_encrypted)
+        return f"{circuit_id},{','.join(users)}"
 
     def __handle_teardown_request(self, request: str) -> None:
         """
-        Static method that handles teardown request for each user.
-        Deletes circuit id from the list and changes user's availability
+        Method that handles teardown request for each user.
+        Deletes circuit id from the list (and from the loads of its relays) and changes user's availability
         :param request: the request string
         """
         not_available_ip, port, circuit_id = request.split('#')[1].split(',', 2)
 
-        with self.__mutex:
-            self.__circuit_ids.pop(circuit_id, None)
-            self.__db.change_availability(not_available_ip, port)
+        self.__close_circuit(circuit_id)
+        self.__db.change_availability(not_available_ip, port)
+
+    def __handle_close_request(self, request: str) -> None:
+        """
+        Method that handles close request for each user.
+        Deletes circuit id of a finished circuit from the list (and from the loads of its relays)
+        :param request: the request string
+        """
+        self.__close_circuit(request.split('#')[1])
+
+    def __close_circuit(self, circuit_id: str) -> None:
+        """
+        Method deletes circuit id from the list and from the loads of its relays (nothing if it isn't open)
+        :param circuit_id: the circuit id (string of the request)
+        """
+        with self.__circuits_mutex:
+            # The ids of the circuits are ints
+            circuit = self.__circuit_ids.pop(int(circuit_id), None) if circuit_id.isdigit() else None
+
+            if circuit is not None:
+                self.__db.close_circuit(circuit[0][:-1])
+
+    def __expire_circuits(self) -> None:
+        """
+        Method closes the circuits constructed more than CIRCUIT_LIFETIME ago (the circuits mutex must be held)
+        """
+        expiry = time.monotonic() - _DirectoryRequests.CIRCUIT_LIFETIME
+
+        # The circuits are in the construct order - the expired ones are first
+        while self.__circuit_ids:
+            circuit_id = next(iter(self.__circuit_ids))
+            users, construct_time = self.__circuit_ids[circuit_id]
+
+            if construct_time > expiry:
+                break
+
+            del self.__circuit_ids[circuit_id]
+            self.__db.close_circuit(users[:-1])
 
     def __generate_circuit_id(self) -> int:
         """
@@ -284,6 +329,148 @@ class ExternalServer:
         return new_id
 
 
+class ExternalServer:
+    """
+    Class of external server that must be running, to provide to TOR nodes required data.
+
+    The clients are coroutines of one asyncio event loop (instead of a thread for every client). The blocking work -
+    the DH of the start requests and the requests that write the database - runs in a pool of threads, so the loop
+    keeps serving the other clients meanwhile. A client that closes the connection ends its coroutine
+    """
+
+    # Path to the DB file. Can be changed
+    DB_PATH = '../DataBase/TOR_DB.db'
+
+    # Connections waiting to be accepted
+    BACKLOG = 1024
+
+    # Threads of the blocking work of the requests (None - the default of ThreadPoolExecutor)
+    WORKERS = None
+
+    def __init__(self, db_path: str = None):
+        """
+        Constructor of the external server that initialize fields
+        :param db_path: path to the database file (to create)
+        """
+        dp_path = ExternalServer.DB_PATH if (db_path is None) else db_path
+        self.__requests = _DirectoryRequests(dp_path)
+
+        self.__executor = ThreadPoolExecutor(max_workers=ExternalServer.WORKERS,
+                                             thread_name_prefix='DirectoryServer')
+
+    def start_server(self) -> None:
+        """
+        Method starts the server, listening for the new clients, and serves them until the process ends
+        """
+        try:
+            asyncio.run(self.serve())
+
+        except OSError as e:
+            print(e)
+            exit(1)
+
+        finally:
+            self.__executor.shutdown(wait=False)
+
+    async def serve(self) -> None:
+        """
+        Coroutine that binds, listens and serves the clients (forever)
+        """
+        server = await asyncio.start_server(self.__handle_new_client, Constants.IP, Constants.PORT,
+                                            backlog=ExternalServer.BACKLOG)
+
+        print(f"[Directory Server] Bind ON {Constants.IP}:{Constants.PORT}", end='\n\n\n')
+        print(f"[Directory Server] Start listen port: {Constants.PORT}", end='\n\n\n')
+
+        # Every start request takes a key pair of a random preset - generate them while waiting for the clients
+        dh_pool.get_default().fill(dh.get_presets())
+
+        async with server:
+            await server.serve_forever()
+
+    async def __handle_new_client(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        """
+        Coroutine to handle new clients (runs for each new connected client) until the client stops or disconnects
+        :param reader: the stream of the requests
+        :param writer: the stream of the responses
+        """
+        client_socket = writer.get_extra_info('socket')
+        loop = asyncio.get_running_loop()
+
+        # Aes of the client (currently none)
+        AES = None
+
+        try:
+            while True:
+                request = await reader.read(Constants.BUFF_SIZE)
+
+                # The client closed the connection
+                if not request:
+                    break
+
+                if AES is None:
+                    if request != b"start":
+                        break
+
+                    Constants.print_message(False, False, client_socket, request)
+                    AES = await self.__handle_start_request(reader, writer, client_socket)
+                    continue
+
+                decrypted_request = _DirectoryRequests.decrypt(client_socket, AES, request)
+
+                # The writes of the database wait for the disk, the other requests read the registry
+                if _DirectoryRequests.is_write_request(decrypted_request):
+                    response = await loop.run_in_executor(self.__executor, self.__requests.respond,
+                                                          AES, decrypted_request)
+                else:
+                    response = self.__requests.respond(AES, decrypted_request)
+
+                if response is None:
+                    break
+
+                if response:
+                    writer.write(response)
+                    await writer.drain()
+
+                    Constants.print_message(False, True, client_socket, response)
+
+        except (OSError, ValueError) as e:
+            # Reset connection or a broken request
+            print(f"[Directory Server] Client error: {e}", end='\n\n\n')
+
+        finally:
+            writer.close()
+
+    async def __handle_start_request(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter,
+                                     client_socket: socket.socket) -> aes | None:
+        """
+        Coroutine that handles start request for each user
+        :param reader: the stream of the requests
+        :param writer: the stream of the responses
+        :param client_socket: socket of the current user (to print the messages)
+        :return: aes of the session | None if the session isn't started
+        """
+        loop = asyncio.get_running_loop()
+        DH, private_number, dh_response = await loop.run_in_executor(self.__executor, _DirectoryRequests.start)
+
+        writer.write(dh_response.encode())
+        await writer.drain()
+        Constants.print_message(False, True, client_socket, dh_response)
+
+        dh_request = (await reader.read(Constants.BUFF_SIZE)).decode()
+        Constants.print_message(False, False, client_socket, dh_request)
+
+        AES = await loop.run_in_executor(self.__executor, _DirectoryRequests.finish_start,
+                                         DH, private_number, dh_request)
+
+        if AES is not None:
+            writer.write("started".encode())
+            await writer.drain()
+            Constants.print_message(False, True, client_socket, "started")
+
+        return AES
+
+
 # Main function
 def main():
     """
@@ -1,25 +1,27 @@
 # Global Imports
 import time
-from queue import SimpleQueue
+from collections.abc import Iterable
 
 # Project imports
 from Constants import Constants
 from Commands import Commands
 
 from ClientCommunicator import ClientCommunicator
-from Encryptions.AES import aes
+from Encryptions.OnionCipher import OnionCipher
 
 
 # Classes
 class Client:
-    def __init__(self, circuit_id: int, server_port: int, server_ip: str = Constants.IP):
+    def __init__(self, circuit_id: int, server_port: int, server_ip: str = Constants.IP,
+                 handshake_suites: tuple[str, ...] = None):
         """
         Constructor of the Client class
         :param circuit_id: circuit_id
         :param server_port: Server port to make connection
         :param server_ip: Server ip to make connection
+        :param handshake_suites: handshake suites of the client, in the preference order (None - the default suites)
         """
-        self.__communicator = ClientCommunicator(circuit_id, server_port, server_ip)
+        self.__communicator = ClientCommunicator(circuit_id, server_port, server_ip, handshake_suites)
         self.__connected = False
 
     # Socket methods
@@ -48,10 +50,10 @@ class Client:
             self.__connected = False
             print("--Disconnected from server--", end='\n\n\n')
 
-    def send_request(self, data: str) -> None:
+    def send_request(self, data: bytes | memoryview) -> None:
         """
         Function that sends request to the server
-        :param data: Data to send to the server
+        :param data: Data to send to the server (raw bytes)
         """
         if not self.__connected:
             raise Exception("Not connected to server")
@@ -62,11 +64,11 @@ class Client:
         except Exception as e:
             print(f"[Client Error] sending request: {e}", end='\n\n\n')
 
-    def receive_response(self, timeout: int = 5) -> str:
+    def receive_response(self, timeout: int = 5) -> bytes:
         """
         Function that receives and returns a data from the server
         :param timeout: Timeout of the message in seconds
-        :return: Decoded data from the server
+        :return: Raw data from the server
         """
         if not self.__connected:
             raise Exception("Not connected to server")
@@ -81,11 +83,11 @@ class Client:
         if time.time() - start_time > timeout:
             raise TimeoutError("Response timeout exceeded")
 
-    def send_and_receive(self, data: str) -> str:
+    def send_and_receive(self, data: bytes | memoryview) -> bytes:
         """
         Function sends data to server and then returns the response
-        :param data: Data to send to the server
-        :return: Decoded response from the server
+        :param data: Data to send to the server (raw bytes)
+        :return: Raw response from the server
         """
         self.send_request(data)
         return self.receive_response()
@@ -98,38 +100,49 @@ class Client:
         """
         return self.__communicator.create()
 
-    def extend(self, ip_and_port: str, aes_keys: SimpleQueue[aes]) -> int | Commands.Teardown:
+    def extend(self, ip_and_port: str, onion: OnionCipher) -> int | Commands.Teardown:
         """
         Function do `extend` command TOR logic
         :param ip_and_port: ip and port of the next node of the next node
-        :param aes_keys: queue of aes keys to encrypt and decrypt the message
+        :param onion: onion layers of the circuit to encrypt and decrypt the message
         :return: Session key of the next node of the next node
         """
-        return self.__communicator.extend(ip_and_port, aes_keys)
+        return self.__communicator.extend(ip_and_port, onion)
 
-    def begin(self, circId: int, ip_and_port: str, aes_keys: SimpleQueue[aes]) -> tuple[int, int] | Commands.Teardown:
+    def begin(self, circId: int, ip_and_port: str, onion: OnionCipher) -> tuple[int, int] | Commands.Teardown:
         """
         Function do `begin` command TOR logic
         :param circId: current circuit ID
         :param ip_and_port: ip and port of the destination user
-        :param aes_keys: queue of aes keys to encrypt and decrypt the message
+        :param onion: onion layers of the circuit to encrypt and decrypt the message
         :return: Stream id of the current conversation
         """
-        return self.__communicator.begin(circId, ip_and_port, aes_keys)
+        return self.__communicator.begin(circId, ip_and_port, onion)
 
-    def end(self, circId: int, stream_id: int, aes_keys: SimpleQueue[aes]) -> None:
-        return self.__communicator.end(circId, stream_id, aes_keys)
+    def end(self, circId: int, stream_id: int, onion: OnionCipher) -> None:
+        return self.__communicator.end(circId, stream_id, onion)
 
-    def data(self, circId: int, stream_id: int, data: str, aes_keys: SimpleQueue[aes]) -> bool:
+    def data(self, circId: int, stream_id: int, data: str, onion: OnionCipher) -> bool:
         """
         Function sends data to the destination user using TOR
         :param circId: Current circuit ID
         :param stream_id: ID of the stream to send data
         :param data: Data to send
-        :param aes_keys: queue of aes keys to encrypt and decrypt the message
+        :param onion: onion layers of the circuit to encrypt and decrypt the message
         :return: The response of the destination user
         """
-        return self.__communicator.data(circId, stream_id, data, aes_keys)
+        return self.__communicator.data(circId, stream_id, data, onion)
+
+    def data_stream(self, circId: int, stream_id: int, chunks: Iterable[str], onion: OnionCipher) -> bool:
+        """
+        Function sends a large data to the destination user chunk by chunk using TOR
+        :param circId: Current circuit ID
+        :param stream_id: ID of the stream to send data
+        :param chunks: Chunks of the data, at most Constants.DATA_CHUNK_SIZE bytes each
+        :param onion: onion layers of the circuit to encrypt and decrypt the messages
+        :return: True - if every chunk was confirmed by the destination user | False - otherwise
+        """
+        return self.__communicator.data_stream(circId, stream_id, chunks, onion)
 
     def get_circId(self) -> int:
         """
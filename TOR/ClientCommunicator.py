@@ -1,31 +1,36 @@
 # Global imports
 import socket
-from queue import SimpleQueue
+from collections.abc import Iterable
 
 # Project imports
 from Commands import Commands
 from Constants import Constants
 from DirectoryServerCommunicator import DirectoryServerCommunicator
 
-from Encryptions.DH import dh
-from Encryptions.AES import aes
-from Encryptions.RSA import rsa
+from Encryptions.Handshake import handshake
+from Encryptions.OnionCipher import OnionCipher
+from Encryptions.RSA import public_key
 
 
 # Classes
 class ClientCommunicator:
 
-    def __init__(self, circId: int, server_port: int, server_address: str):
+    def __init__(self, circId: int, server_port: int, server_address: str, handshake_suites: tuple[str, ...] = None):
         """
         Constructor of the ClientCommunicator class
         :param server_port: server port to connect to
         :param server_address: server ip to connect to
+        :param handshake_suites: handshake suites of the client, in the preference order (None - the default suites)
         """
         self.__address = server_address
         self.__port = server_port
         self.__socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
         self.__connected = False
         self.__circId = circId
+        self.__handshake_suites = handshake.get_default_suites() if (handshake_suites is None) else handshake_suites
+
+        # Session with the directory server for the public keys of the hops - one for the whole circuit construction
+        self.__directory: DirectoryServerCommunicator | None = None
 
     # Socket methods
     def connect(self) -> bool:
@@ -43,157 +48,157 @@ class ClientCommunicator:
         finally:
             return self.__connected
 
-    def send_request(self, data: str) -> bool:
+    def send_request(self, data: bytes | memoryview) -> bool:
         """
         Sends a request to the server
-        :param data: The request data to be sent
+        :param data: The request data to be sent (raw bytes, as they go on the wire)
         :return: True if the request was sent successfully, False otherwise
         """
         if not self.__connected:
             return False
 
         try:
-            self.__socket.sendall(data.encode())
+            self.__socket.sendall(data)
             Constants.print_message(True, True, self.__socket, data)
             return True
 
         except ...:
             return False
 
-    def receive_response(self) -> str:
+    def receive_response(self) -> bytes:
         """
         Receives a response from the server
-        :return: The received response data as bytes or None if an error occurred
+        :return: The received response data as bytes or empty bytes if an error occurred
         """
         if not self.__connected:
-            return ''
+            return b''
 
         try:
-            data = self.__socket.recv(Constants.BUFF_SIZE).decode()
+            data = self.__socket.recv(Constants.BUFF_SIZE)
             Constants.print_message(True, False, self.__socket, data)
 
             return data
 
         except ...:
-            return ''
+            return b''
 
     def disconnect(self) -> None:
         """
         Disconnects from the server
         """
+        self.__end_directory_session()
+
         if self.__connected and self.__socket:
             self.__socket.close()
             self.__connected = False
 
+    def __start_handshake(self, ip: str, port: int) -> handshake:
+        """
+        Asks the directory server for the keys of a node (the session is opened by the first hop), and starts the
+        handshake with it in the first suite of the client that the node offers
+        :param ip: ip of the node
+        :param port: port of the node
+        :return: the handshake with the node
+        """
+        if self.__directory is None:
+            self.__directory = DirectoryServerCommunicator()
+            self.__directory.connect()
+
+        rsa_public_key, x25519_public_key = self.__directory.get_node_keys(ip, port, connect=False, disconnect=False)
+        suite = handshake.choose_suite(self.__handshake_suites, x25519_public_key)
+
+        return handshake(suite, rsa_public_key, x25519_public_key)
+
+    def __end_directory_session(self) -> None:
+        """
+        Ends the session with the directory server (the circuit is constructed)
+        """
+        if self.__directory is not None:
+            self.__directory.disconnect()
+            self.__directory = None
+
     # TOR methods
     def create(self) -> int:
         """
         Function sends TOR's create request, gets `created` response and returns session key with first node
         :return: session key with the first node
         """
-        # Get parameters from the server
-        directory = DirectoryServerCommunicator()
-        parameters = directory.get_dh(disconnect=False)
-
-        # DH logic
-        client_dh = dh(parameters)
-        private_dh_number = dh.generate_private_number()
-        public_dh_key = client_dh.generate_public_key(private_dh_number)
-
-        # RSA logic
-        public_rsa_key = directory.get_public_key(self.__address, self.__port, connect=False)
-        rsa_dh_handshake = rsa.encrypt(public_dh_key, public_rsa_key)
+        # Handshake logic
+        node_handshake = self.__start_handshake(self.__address, self.__port)
 
         # Send request
-        create_request = Commands.Create.compose_request(self.__circId, parameters[0], parameters[1], rsa_dh_handshake)
-        self.send_request(create_request)
+        create_request = Commands.Create.compose_request(self.__circId, node_handshake.get_suite(),
+                                                         node_handshake.get_request())
+        self.send_request(create_request.encode())
 
         # Receive response
-        created_response = self.receive_response()
+        created_response = self.receive_response().decode()
         created = Commands.Created(created_response)
 
         # Session key logic
-        dh_key = client_dh.exchange(created.get_DH_handshake(), private_dh_number)
+        session_key = node_handshake.finish(created.get_DH_handshake())
 
-        assert created.get_key_hash() == Constants.key_hash(dh_key), "Hash and key hash aren't same"
-        return dh_key
+        assert created.get_key_hash() == Constants.key_hash(session_key), "Hash and key hash aren't same"
+        return session_key
 
-    def extend(self, ip_and_port: str, aes_keys_queue: SimpleQueue[aes]) -> int | Commands.Teardown:
+    def extend(self, ip_and_port: str, onion: OnionCipher) -> int | Commands.Teardown:
         """
         Function sends TOR's extend request, gets `extended` response and returns session key with seconds node
         :param ip_and_port: ip and port of the second node
-        :param aes_keys_queue: queue of aes keys to encrypt and decrypt the message
+        :param onion: onion layers of the circuit to encrypt and decrypt the message
         :return: session key with the second node
         """
-        # Get dh from the server
-        directory = DirectoryServerCommunicator()
-        parameters = directory.get_dh(disconnect=False)
-
-        # DH logic
-        client_dh = dh(parameters)
-        private_dh_number = dh.generate_private_number()
-        public_dh_key = client_dh.generate_public_key(private_dh_number)
-
-        # RSA logic
+        # Handshake logic
         last_node_ip, last_node_port = Constants.ip_and_port(ip_and_port)
-        public_rsa_key = directory.get_public_key(last_node_ip, last_node_port, connect=False)
-        rsa_dh_handshake = rsa.encrypt(public_dh_key, public_rsa_key)
+        node_handshake = self.__start_handshake(last_node_ip, last_node_port)
 
         # Send request
-        extend_request = Commands.Extend.compose_request(self.__circId, ip_and_port, parameters[0], parameters[1], rsa_dh_handshake)
-        extend_request, aes_keys_stack = Constants.encrypt_by_aes_chain(extend_request, aes_keys_queue)
-        self.send_request(extend_request)
+        extend_request = Commands.Extend.compose_request(self.__circId, ip_and_port, node_handshake.get_suite(),
+                                                         node_handshake.get_request())
+        self.send_request(onion.wrap(extend_request.encode()))
 
         # Receive response
-        response = self.receive_response()
-        response = Constants.decrypt_by_aes_chain(response, aes_keys_stack)
+        response = onion.unwrap(self.receive_response()).decode()
 
         # Define the type
         command = Commands.get_command(response)
 
-        # If got teardown instead of extended
+        # If got teardown instead of extended (the circuit is constructed again, by a new client)
         if command == Commands.Teardown.REQUEST_CODE:
+            self.__end_directory_session()
             return Commands.Teardown(response)
 
         # If got correct extended
         extended = Commands.Extended(response)
 
         # Session key logic
-        dh_key = client_dh.exchange(extended.get_DH_handshake(), private_dh_number)
+        session_key = node_handshake.finish(extended.get_DH_handshake())
 
-        assert extended.get_key_hash() == Constants.key_hash(dh_key), "Hash and key hash aren't same"
-        return dh_key
+        assert extended.get_key_hash() == Constants.key_hash(session_key), "Hash and key hash aren't same"
+        return session_key
 
-    def begin(self, circId: int, ip_and_port: str, aes_keys_queue: SimpleQueue[aes]) -> tuple[int, int] | Commands.Teardown:
+    def begin(self, circId: int, ip_and_port: str, onion: OnionCipher) -> tuple[int, int] | Commands.Teardown:
         """
         Function sends TOR's begin request, gets `connected` response and returns its stream ID
         :param circId: current circuit ID
         :param ip_and_port: ip and port of destination user
-        :param aes_keys_queue queue of aes keys to encrypt and decrypt the message
+        :param onion: onion layers of the circuit to encrypt and decrypt the message
         :return: stream id of the conversation
         """
-        # Get dh from the server
-        directory = DirectoryServerCommunicator()
-        parameters = directory.get_dh(disconnect=False)
-
-        # DH logic
-        client_dh = dh(parameters)
-        private_dh_number = dh.generate_private_number()
-        public_dh_key = client_dh.generate_public_key(private_dh_number)
-
-        # RSA logic
+        # Handshake logic
         destination_ip, destination_port = Constants.ip_and_port(ip_and_port)
-        public_rsa_key = directory.get_public_key(destination_ip, destination_port, connect=False)
-        rsa_dh_handshake = rsa.encrypt(public_dh_key, public_rsa_key)
+        node_handshake = self.__start_handshake(destination_ip, destination_port)
 
         # Send request
-        begin_request = Commands.Begin.compose_request(circId, ip_and_port, parameters[0], parameters[1], rsa_dh_handshake)
-        begin_request, aes_keys_stack = Constants.encrypt_by_aes_chain(begin_request, aes_keys_queue)
-        self.send_request(begin_request)
+        begin_request = Commands.Begin.compose_request(circId, ip_and_port, node_handshake.get_suite(),
+                                                       node_handshake.get_request())
+        self.send_request(onion.wrap(begin_request.encode()))
 
         # Receive response
-        response = self.receive_response()
-        response = Constants.decrypt_by_aes_chain(response, aes_keys_stack)
+        response = onion.unwrap(self.receive_response()).decode()
+
+        # The last hop - the circuit doesn't need the directory anymore
+        self.__end_directory_session()
 
         # Define the type
         command = Commands.get_command(response)
@@ -206,40 +211,37 @@ class ClientCommunicator:
         connected = Commands.Connected(response)
 
         # Session key logic
-        dh_key = client_dh.exchange(connected.get_DH_handshake(), private_dh_number)
+        session_key = node_handshake.finish(connected.get_DH_handshake())
 
-        assert connected.get_key_hash() == Constants.key_hash(dh_key), "Hash and key hash aren't same"
-        return connected.get_stream_id(), dh_key
+        assert connected.get_key_hash() == Constants.key_hash(session_key), "Hash and key hash aren't same"
+        return connected.get_stream_id(), session_key
 
-    def end(self, circId: int, stream_id: int, aes_keys_queue: SimpleQueue[aes]) -> None:
+    def end(self, circId: int, stream_id: int, onion: OnionCipher) -> None:
         """
         Function sends TOR's end request
         :param circId: circuit id
         :param stream_id: id of the stream
-        :param aes_keys_queue queue of aes keys to encrypt and decrypt the message
+        :param onion: onion layers of the circuit to encrypt the message
         """
         end_request = Commands.End.compose_request(circId, stream_id)
-        end_request, _ = Constants.encrypt_by_aes_chain(end_request, aes_keys_queue)
-        self.send_request(end_request)
+        self.send_request(onion.wrap(end_request.encode()))
 
-    def data(self, circId: int, stream_id: int, data: str, aes_keys_queue: SimpleQueue[aes]) -> bool:
+    def data(self, circId: int, stream_id: int, data: str, onion: OnionCipher) -> bool:
         """
         Function sends data to the destination user
         :param circId: current circuit ID
         :param stream_id: current stream ID to send data
         :param data: data to send
-        :param aes_keys_queue queue of aes keys to encrypt and decrypt the message
+        :param onion: onion layers of the circuit to encrypt and decrypt the message
         :return: Answer of the destination user
         """
 
         # Send data request
         data_request = Commands.Data.compose_request(circId, stream_id, data)
-        data_request, aes_keys_stack = Constants.encrypt_by_aes_chain(data_request, aes_keys_queue)
-        self.send_request(data_request)
+        self.send_request(onion.wrap(data_request.encode()))
 
         # Receive data response (confirm)
-        response = self.receive_response()
-        response = Constants.decrypt_by_aes_chain(response, aes_keys_stack)
+        response = onion.unwrap(self.receive_response()).decode()
 
         # Check if data was successfully sent
         if Commands.get_command(response) == Commands.Confirm.REQUEST_CODE:
@@ -247,6 +249,22 @@ class ClientCommunicator:
             return (confirm.get_status() == 1) and (confirm.get_data() == data)
         return False
 
+    def data_stream(self, circId: int, stream_id: int, chunks: Iterable[str], onion: OnionCipher) -> bool:
+        """
+        Function sends a large data to the destination user chunk by chunk - one data request per chunk, so only one
+        chunk is in memory at a time (see Constants.text_chunks to read the chunks from a file)
+        :param circId: current circuit ID
+        :param stream_id: current stream ID to send data
+        :param chunks: chunks of the data, at most Constants.DATA_CHUNK_SIZE bytes each
+        :param onion: onion layers of the circuit to encrypt and decrypt the messages
+        :return: True - if every chunk was confirmed by the destination user | False - otherwise
+        """
+        for chunk in chunks:
+            if not self.data(circId, stream_id, chunk, onion):
+                return False
+
+        return True
+
     def get_circId(self) -> int:
         """
         Function returns current circuit ID
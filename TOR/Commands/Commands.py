@@ -4,28 +4,24 @@ class Create:
 
     def __init__(self, command_str: str):
         commands = command_str.split('#', 1)[1]
-        commands = commands.split(',', 3)
+        commands = commands.split(',', 2)
 
         self.__circId = int(commands[0])
-        self.__p = int(commands[1])
-        self.__g = int(commands[2])
-        self.__RSA_DH_handshake = int(commands[3])
+        self.__handshake_suite = commands[1]
+        self.__handshake = list(map(int, commands[2].split(',')))
 
     def get_id(self) -> int:
         return self.__circId
 
-    def get_RSA_DH_handshake(self) -> int:
-        return self.__RSA_DH_handshake
+    def get_handshake_suite(self) -> str:
+        return self.__handshake_suite
 
-    def get_dh_p(self) -> int:
-        return self.__p
-
-    def get_dh_g(self) -> int:
-        return self.__g
+    def get_handshake(self) -> list[int]:
+        return self.__handshake
 
     @staticmethod
-    def compose_request(circId: int, p: int, g: int, RSA_DH_handshake: int) -> str:
-        return f'{Create.REQUEST_CODE}#{circId},{p},{g},{RSA_DH_handshake}'
+    def compose_request(circId: int, handshake_suite: str, handshake: list[int]) -> str:
+        return f'{Create.REQUEST_CODE}#{circId},{handshake_suite},{",".join(map(str, handshake))}'
 
 
 class Created:
@@ -93,13 +89,12 @@ class Begin:
 
     def __init__(self, command_str: str):
         commands = command_str.split('#', 1)[-1]
-        commands = commands.split(',', 4)
+        commands = commands.split(',', 3)
 
         self.__circId = int(commands[0])
         self.__user_ip_and_port = commands[1]
-        self.__p = int(commands[2])
-        self.__g = int(commands[3])
-        self.__RSA_DH_handshake = int(commands[4])
+        self.__handshake_suite = commands[2]
+        self.__handshake = list(map(int, commands[3].split(',')))
 
     def get_id(self) -> int:
         return self.__circId
@@ -107,18 +102,15 @@ class Begin:
     def get_user_ip_and_port(self) -> str:
         return self.__user_ip_and_port
 
-    def get_RSA_DH_handshake(self) -> int:
-        return self.__RSA_DH_handshake
+    def get_handshake_suite(self) -> str:
+        return self.__handshake_suite
 
-    def get_dh_p(self) -> int:
-        return self.__p
-
-    def get_dh_g(self) -> int:
-        return self.__g
+    def get_handshake(self) -> list[int]:
+        return self.__handshake
 
     @staticmethod
-    def compose_request(circId: int, ip_and_port: str, p: int, g: int, RSA_DH_handshake: int) -> str:
-        return f"{Begin.REQUEST_CODE}#{circId},{ip_and_port},{p},{g},{RSA_DH_handshake}"
+    def compose_request(circId: int, ip_and_port: str, handshake_suite: str, handshake: list[int]) -> str:
+        return f"{Begin.REQUEST_CODE}#{circId},{ip_and_port},{handshake_suite},{','.join(map(str, handshake))}"
 
 
 class End:
@@ -201,13 +193,12 @@ class Extend:
 
     def __init__(self, command_str: str):
         commands = command_str.split('#', 1)[-1]
-        commands = commands.split(',', 4)
+        commands = commands.split(',', 3)
 
         self.__circId = int(commands[0])
         self.__user_ip_and_port = commands[1]
-        self.__p = int(commands[2])
-        self.__g = int(commands[3])
-        self.__RSA_DH_handshake = int(commands[4])
+        self.__handshake_suite = commands[2]
+        self.__handshake = list(map(int, commands[3].split(',')))
 
     def get_id(self) -> int:
         return self.__circId
@@ -215,18 +206,15 @@ class Extend:
     def get_user_ip_and_port(self) -> str:
         return self.__user_ip_and_port
 
-    def get_dh_p(self) -> int:
-        return self.__p
-
-    def get_dh_g(self) -> int:
-        return self.__g
+    def get_handshake_suite(self) -> str:
+        return self.__handshake_suite
 
-    def get_RSA_DH_handshake(self) -> int:
-        return self.__RSA_DH_handshake
+    def get_handshake(self) -> list[int]:
+        return self.__handshake
 
     @staticmethod
-    def compose_request(circId: int, ip_and_port: str, p: int, g: int, RSA_DH_handshake: int) -> str:
-        return f"{Extend.REQUEST_CODE}#{circId},{ip_and_port},{p},{g},{RSA_DH_handshake}"
+    def compose_request(circId: int, ip_and_port: str, handshake_suite: str, handshake: list[int]) -> str:
+        return f"{Extend.REQUEST_CODE}#{circId},{ip_and_port},{handshake_suite},{','.join(map(str, handshake))}"
 
 
 class Extended:
@@ -1,13 +1,16 @@
+import codecs
 import socket
+from collections.abc import Iterator
 from hashlib import sha256
 
-from queue import SimpleQueue, LifoQueue
-
 
 # Constant variables
 IP = socket.gethostbyname(socket.gethostname())
 BUFF_SIZE = 8192
 
+# Maximal size of the data in one data request of a stream (bytes, leaves room for the header in BUFF_SIZE)
+DATA_CHUNK_SIZE = 4096
+
 
 # Functions
 def key_hash(key: int) -> str:
@@ -28,7 +31,7 @@ def str_hash(string: str) -> str:
     return sha256(string.encode()).hexdigest()
 
 
-def print_message(client: bool, send: bool, sock: socket.socket, data: str) -> None:
+def print_message(client: bool, send: bool, sock: socket.socket, data: str | bytes | memoryview) -> None:
     """
     Function prints message
     :param client: True - Client, False - Server
@@ -36,6 +39,9 @@ def print_message(client: bool, send: bool, sock: socket.socket, data: str) -> N
     :param sock: current socket
     :param data: data that sends/receives
     """
+    if isinstance(data, memoryview):
+        data = data.tobytes()
+
     peer = sock.getpeername()
     print(f"[{'Client' if client else 'Server'} Part {'Send' if send else 'Receive'}]")
     print(f"[{'TO' if send else 'FROM'}: {peer[0]}:{peer[1]}]")
@@ -44,6 +50,26 @@ def print_message(client: bool, send: bool, sock: socket.socket, data: str) -> N
     print("-----------------------\n\n\n")
 
 
+def text_chunks(file, chunk_size: int = DATA_CHUNK_SIZE) -> Iterator[str]:
+    """
+    Function reads a binary file (or socket.makefile('rb')) chunk by chunk and gives it as text - never holds more than
+    one chunk. Characters split between the chunks are kept whole
+    :param file: binary file object to read from
+    :param chunk_size: maximal size of the chunk to read (bytes)
+    :return: generator of the text chunks (every chunk is at most chunk_size + 3 bytes in UTF-8)
+    """
+    decoder = codecs.getincrementaldecoder('utf-8')()
+
+    while chunk := file.read(chunk_size):
+        text = decoder.decode(chunk)
+        if text:
+            yield text
+
+    text = decoder.decode(b'', final=True)
+    if text:
+        yield text
+
+
 def ip_and_port(ip_port: str) -> tuple[str, int]:
     """
     Function converts string of struct {ip:port} to ip and port
@@ -52,21 +78,3 @@ def ip_and_port(ip_port: str) -> tuple[str, int]:
     """
     ip, port = ip_port.split(':')
     return ip, int(port)
-
-
-def encrypt_by_aes_chain(data: str, aes_queue: SimpleQueue) -> tuple[str, LifoQueue]:
-    aes_stack = LifoQueue()
-
-    while not aes_queue.empty():
-        key = aes_queue.get()
-        aes_stack.put(key)
-        data = key.encrypt(data)
-
-    return data, aes_stack
-
-
-def decrypt_by_aes_chain(data: str, aes_stack: LifoQueue) -> str:
-    while not aes_stack.empty():
-        data = aes_stack.get().decrypt(data)
-
-    return data
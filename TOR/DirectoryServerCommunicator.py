@@ -3,7 +3,7 @@ import socket
 
 # Project imports
 from Constants import Constants
-from Encryptions.DH import dh
+from Encryptions.DH import dh, dh_pool
 from Encryptions.AES import aes
 from Encryptions.RSA import public_key
 
@@ -18,6 +18,18 @@ class DirectoryServerCommunicator:
         self.__aes = None
 
     # Socket methods
+    def connect(self) -> None:
+        """
+        Connects to the directory server and establishes the session key ahead of the requests (use connect=False then)
+        """
+        self.__connect()
+
+    def disconnect(self) -> None:
+        """
+        Ends the session with the directory server (after the requests with disconnect=False)
+        """
+        self.__disconnect()
+
     def __connect(self):
         if not self.__connected:
             self.__socket.connect((self.__address, self.__port))
@@ -26,8 +38,8 @@ class DirectoryServerCommunicator:
 
     def __disconnect(self):
         if self.__connected:
-            stop_request = self.__aes.encrypt("stop")
-            self.__socket.sendall(stop_request.encode())
+            stop_request = self.__aes.encrypt_bytes(b"stop")
+            self.__socket.sendall(stop_request)
             self.__address = self.__port = self.__aes = None
             self.__connected = False
 
@@ -42,9 +54,7 @@ class DirectoryServerCommunicator:
         server_public_key = int(response[2])
 
         DH = dh(parameters)
-
-        private_number = dh.generate_private_number()
-        dh_public_key = DH.generate_public_key(private_number)
+        private_number, dh_public_key = dh_pool.get_default().get_key_pair(parameters)
 
         dh_key = DH.exchange(server_public_key, private_number)
         dh_key_hash = Constants.key_hash(dh_key)
@@ -59,23 +69,29 @@ class DirectoryServerCommunicator:
         self.__aes = aes(dh_key)
 
     def __send_and_receive(self, request: str):
-        encrypted_request = self.__aes.encrypt(request)
-        self.__socket.sendall(encrypted_request.encode())
+        encrypted_request = self.__aes.encrypt_bytes(request.encode())
+        self.__socket.sendall(encrypted_request)
 
-        response = self.__socket.recv(Constants.BUFF_SIZE).decode()
-        decrypted_response = self.__aes.decrypt(response)
+        response = self.__socket.recv(Constants.BUFF_SIZE)
+        decrypted_response = self.__aes.decrypt_bytes(response).decode()
 
         return decrypted_response
 
     def __send(self, request: str):
-        encrypted_request = self.__aes.encrypt(request)
-        self.__socket.sendall(encrypted_request.encode())
+        encrypted_request = self.__aes.encrypt_bytes(request.encode())
+        self.__socket.sendall(encrypted_request)
 
-    def append(self, username: str, password: str, rsa_public_key: public_key, ip: str, port: int, allow_be_exit_node: bool = True, connect: bool = True, disconnect: bool = True) -> bool:
+    def append(self, username: str, password: str, rsa_public_key: public_key, ip: str, port: int, allow_be_exit_node: bool = True, x25519_public_key: bytes = None, bandwidth: int = None, connect: bool = True, disconnect: bool = True) -> bool:
         if connect:
             self.__connect()
 
-        append_request = f"append#{username},{password},{rsa_public_key.get_e()},{rsa_public_key.get_n()},{ip},{port},{int(allow_be_exit_node)}"
+        # The static X25519 key (hex) is published only by the users that offer the x25519 handshake suite
+        x25519_public_key = '' if (x25519_public_key is None) else x25519_public_key.hex()
+
+        # The bandwidth (KB/s) - empty for the default bandwidth of the directory server
+        bandwidth = '' if (bandwidth is None) else bandwidth
+
+        append_request = f"append#{username},{password},{rsa_public_key.get_e()},{rsa_public_key.get_n()},{ip},{port},{int(allow_be_exit_node)},{x25519_public_key},{bandwidth}"
         append_response = self.__send_and_receive(append_request)
 
         if disconnect:
@@ -95,6 +111,9 @@ class DirectoryServerCommunicator:
         return tuple(map(int, get_dh_response.split(',')))
 
     def get_public_key(self, ip: str, port: int, connect: bool = True, disconnect: bool = True) -> public_key:
+        return self.get_node_keys(ip, port, connect, disconnect)[0]
+
+    def get_node_keys(self, ip: str, port: int, connect: bool = True, disconnect: bool = True) -> tuple[public_key, bytes | None]:
         if connect:
             self.__connect()
 
@@ -104,8 +123,15 @@ class DirectoryServerCommunicator:
         if disconnect:
             self.__disconnect()
 
-        e, n = map(int, get_public_key_response.split(','))
-        return public_key(e, n)
+        # Unknown node
+        if get_public_key_response == 'error':
+            raise ValueError(f"The directory server doesn't know the node {ip}:{port}")
+
+        # e, n, static X25519 key (hex, empty if the node doesn't offer the x25519 suite)
+        e, n, x25519_public_key = get_public_key_response.split(',')
+        x25519_public_key = bytes.fromhex(x25519_public_key) if x25519_public_key else None
+
+        return public_key(int(e), int(n)), x25519_public_key
 
     def get_circuit(self, source_username: str, destination_username: str, connect: bool = True, disconnect: bool = True) -> tuple[int, list[str]]:
         if connect:
@@ -114,12 +140,16 @@ class DirectoryServerCommunicator:
         construct_request = f"construct#{source_username},{destination_username}"
         construct_response = self.__send_and_receive(construct_request)
 
-        response = construct_response.split(',')
-        circuit_id = int(response[0])
-
         if disconnect:
             self.__disconnect()
 
+        # Unknown users or not enough relays for a circuit
+        if construct_response == 'error':
+            raise ValueError("The directory server can't construct a circuit")
+
+        response = construct_response.split(',')
+        circuit_id = int(response[0])
+
         return circuit_id, response[1:]         # circuitId, user1, user2, ..., userN
 
     def send_teardown(self, not_available_ip: str, port: int, circ_id: int, connect: bool = True, disconnect: bool = False) -> None:
@@ -131,3 +161,14 @@ class DirectoryServerCommunicator:
 
         if disconnect:
             self.__disconnect()
+
+    def send_close(self, circ_id: int, connect: bool = True, disconnect: bool = False) -> None:
+        if connect:
+            self.__connect()
+
+        # The circuit is finished - its relays don't count it anymore
+        close_request = f"close#{circ_id}"
+        self.__send(close_request)
+
+        if disconnect:
+            self.__disconnect()
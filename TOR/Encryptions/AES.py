@@ -1,17 +1,175 @@
 # Libraries
+import os
+import threading
+from array import array
+from collections import OrderedDict
+from collections.abc import Iterable, Iterator
+from functools import lru_cache
+from concurrent.futures import ProcessPoolExecutor
 from hashlib import md5
+from multiprocessing.shared_memory import SharedMemory
+from struct import Struct
+
+from Encryptions.Backend import backend
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
 
 
 # Import settings
-__all__ = ['aes']
+__all__ = ['aes', 'aes_encryptor', 'aes_decryptor', 'aes_ctr', 'aes_ctr_session', 'aes_pool']
+
+
+# Constants
+
+# Count of rounds in encryption (10 for 128 bit)
+_ROUNDS_COUNT = 10
+
+# Size of one block (and of the AES-128 key) in bytes
+_BLOCK_SIZE = 16
+
+# Substitution box of AES algorithm
+_S_BOX = (
+    0x63, 0x7C, 0x77, 0x7B, 0xF2, 0x6B, 0x6F, 0xC5, 0x30, 0x01, 0x67, 0x2B, 0xFE, 0xD7, 0xAB, 0x76,
+    0xCA, 0x82, 0xC9, 0x7D, 0xFA, 0x59, 0x47, 0xF0, 0xAD, 0xD4, 0xA2, 0xAF, 0x9C, 0xA4, 0x72, 0xC0,
+    0xB7, 0xFD, 0x93, 0x26, 0x36, 0x3F, 0xF7, 0xCC, 0x34, 0xA5, 0xE5, 0xF1, 0x71, 0xD8, 0x31, 0x15,
+    0x04, 0xC7, 0x23, 0xC3, 0x18, 0x96, 0x05, 0x9A, 0x07, 0x12, 0x80, 0xE2, 0xEB, 0x27, 0xB2, 0x75,
+    0x09, 0x83, 0x2C, 0x1A, 0x1B, 0x6E, 0x5A, 0xA0, 0x52, 0x3B, 0xD6, 0xB3, 0x29, 0xE3, 0x2F, 0x84,
+    0x53, 0xD1, 0x00, 0xED, 0x20, 0xFC, 0xB1, 0x5B, 0x6A, 0xCB, 0xBE, 0x39, 0x4A, 0x4C, 0x58, 0xCF,
+    0xD0, 0xEF, 0xAA, 0xFB, 0x43, 0x4D, 0x33, 0x85, 0x45, 0xF9, 0x02, 0x7F, 0x50, 0x3C, 0x9F, 0xA8,
+    0x51, 0xA3, 0x40, 0x8F, 0x92, 0x9D, 0x38, 0xF5, 0xBC, 0xB6, 0xDA, 0x21, 0x10, 0xFF, 0xF3, 0xD2,
+    0xCD, 0x0C, 0x13, 0xEC, 0x5F, 0x97, 0x44, 0x17, 0xC4, 0xA7, 0x7E, 0x3D, 0x64, 0x5D, 0x19, 0x73,
+    0x60, 0x81, 0x4F, 0xDC, 0x22, 0x2A, 0x90, 0x88, 0x46, 0xEE, 0xB8, 0x14, 0xDE, 0x5E, 0x0B, 0xDB,
+    0xE0, 0x32, 0x3A, 0x0A, 0x49, 0x06, 0x24, 0x5C, 0xC2, 0xD3, 0xAC, 0x62, 0x91, 0x95, 0xE4, 0x79,
+    0xE7, 0xC8, 0x37, 0x6D, 0x8D, 0xD5, 0x4E, 0xA9, 0x6C, 0x56, 0xF4, 0xEA, 0x65, 0x7A, 0xAE, 0x08,
+    0xBA, 0x78, 0x25, 0x2E, 0x1C, 0xA6, 0xB4, 0xC6, 0xE8, 0xDD, 0x74, 0x1F, 0x4B, 0xBD, 0x8B, 0x8A,
+    0x70, 0x3E, 0xB5, 0x66, 0x48, 0x03, 0xF6, 0x0E, 0x61, 0x35, 0x57, 0xB9, 0x86, 0xC1, 0x1D, 0x9E,
+    0xE1, 0xF8, 0x98, 0x11, 0x69, 0xD9, 0x8E, 0x94, 0x9B, 0x1E, 0x87, 0xE9, 0xCE, 0x55, 0x28, 0xDF,
+    0x8C, 0xA1, 0x89, 0x0D, 0xBF, 0xE6, 0x42, 0x68, 0x41, 0x99, 0x2D, 0x0F, 0xB0, 0x54, 0xBB, 0x16
+)
+
+# Inverse substitution box of AES algorithm
+_INVERSE_S_BOX = (
+    0x52, 0x09, 0x6A, 0xD5, 0x30, 0x36, 0xA5, 0x38, 0xBF, 0x40, 0xA3, 0x9E, 0x81, 0xF3, 0xD7, 0xFB,
+    0x7C, 0xE3, 0x39, 0x82, 0x9B, 0x2F, 0xFF, 0x87, 0x34, 0x8E, 0x43, 0x44, 0xC4, 0xDE, 0xE9, 0xCB,
+    0x54, 0x7B, 0x94, 0x32, 0xA6, 0xC2, 0x23, 0x3D, 0xEE, 0x4C, 0x95, 0x0B, 0x42, 0xFA, 0xC3, 0x4E,
+    0x08, 0x2E, 0xA1, 0x66, 0x28, 0xD9, 0x24, 0xB2, 0x76, 0x5B, 0xA2, 0x49, 0x6D, 0x8B, 0xD1, 0x25,
+    0x72, 0xF8, 0xF6, 0x64, 0x86, 0x68, 0x98, 0x16, 0xD4, 0xA4, 0x5C, 0xCC, 0x5D, 0x65, 0xB6, 0x92,
+    0x6C, 0x70, 0x48, 0x50, 0xFD, 0xED, 0xB9, 0xDA, 0x5E, 0x15, 0x46, 0x57, 0xA7, 0x8D, 0x9D, 0x84,
+    0x90, 0xD8, 0xAB, 0x00, 0x8C, 0xBC, 0xD3, 0x0A, 0xF7, 0xE4, 0x58, 0x05, 0xB8, 0xB3, 0x45, 0x06,
+    0xD0, 0x2C, 0x1E, 0x8F, 0xCA, 0x3F, 0x0F, 0x02, 0xC1, 0xAF, 0xBD, 0x03, 0x01, 0x13, 0x8A, 0x6B,
+    0x3A, 0x91, 0x11, 0x41, 0x4F, 0x67, 0xDC, 0xEA, 0x97, 0xF2, 0xCF, 0xCE, 0xF0, 0xB4, 0xE6, 0x73,
+    0x96, 0xAC, 0x74, 0x22, 0xE7, 0xAD, 0x35, 0x85, 0xE2, 0xF9, 0x37, 0xE8, 0x1C, 0x75, 0xDF, 0x6E,
+    0x47, 0xF1, 0x1A, 0x71, 0x1D, 0x29, 0xC5, 0x89, 0x6F, 0xB7, 0x62, 0x0E, 0xAA, 0x18, 0xBE, 0x1B,
+    0xFC, 0x56, 0x3E, 0x4B, 0xC6, 0xD2, 0x79, 0x20, 0x9A, 0xDB, 0xC0, 0xFE, 0x78, 0xCD, 0x5A, 0xF4,
+    0x1F, 0xDD, 0xA8, 0x33, 0x88, 0x07, 0xC7, 0x31, 0xB1, 0x12, 0x10, 0x59, 0x27, 0x80, 0xEC, 0x5F,
+    0x60, 0x51, 0x7F, 0xA9, 0x19, 0xB5, 0x4A, 0x0D, 0x2D, 0xE5, 0x7A, 0x9F, 0x93, 0xC9, 0x9C, 0xEF,
+    0xA0, 0xE0, 0x3B, 0x4D, 0xAE, 0x2A, 0xF5, 0xB0, 0xC8, 0xEB, 0xBB, 0x3C, 0x83, 0x53, 0x99, 0x61,
+    0x17, 0x2B, 0x04, 0x7E, 0xBA, 0x77, 0xD6, 0x26, 0xE1, 0x69, 0x14, 0x63, 0x55, 0x21, 0x0C, 0x7D
+)
+
+# RCON table used for key expansion of AES algorithm
+_RCON_TABLE = (
+    0x00, 0x01, 0x02, 0x04, 0x08, 0x10, 0x20, 0x40, 0x80, 0x1B, 0x36, 0x6C, 0xD8, 0xAB, 0x4D, 0x9A, 0x2F, 0x5E,
+    0xBC, 0x63, 0xC6, 0x97, 0x35, 0x6A, 0xD4, 0xB3, 0x7D, 0xFA, 0xEF, 0xC5, 0x91, 0x39
+)
+
+
+# Functions
+def _xtime(val: int) -> int:
+    """
+    Multiplies the byte by x (by 2) in the Rijndael field GF(2^8)
+    :param val: byte to multiply
+    :return: the product (byte)
+    """
+    if val & 0x80:
+        return ((val << 1) ^ 0x1b) & 0xFF
+    return val << 1
+
+
+def _gf_multiply(val: int, factor: int) -> int:
+    """
+    Multiplies the byte by a small factor in the Rijndael field GF(2^8)
+    :param val: byte to multiply
+    :param factor: the factor (MixColumns coefficient)
+    :return: the product (byte)
+    """
+    result = 0
+
+    while factor:
+        if factor & 1:
+            result ^= val
+        val = _xtime(val)
+        factor >>= 1
+
+    return result
+
+
+def _build_tables(box: tuple, factors: tuple[int, int, int, int]) -> tuple[tuple[int, ...], ...]:
+    """
+    Builds four 32-bit lookup tables that merge the substitution with the (inverse) MixColumns step.
+    Table i is table 0 rotated right by 8 * i bits
+    :param box: substitution box (S-Box or Inverse S-Box)
+    :param factors: column of the (inverse) MixColumns matrix
+    :return: tuple of four tables by 256 words each
+    """
+    table = tuple(
+        (_gf_multiply(value, factors[0]) << 24) | (_gf_multiply(value, factors[1]) << 16) |
+        (_gf_multiply(value, factors[2]) << 8) | _gf_multiply(value, factors[3])
+        for value in box
+    )
+
+    return tuple(
+        tuple(((word >> (8 * i)) | (word << (32 - 8 * i))) & 0xFFFFFFFF for word in table)
+        for i in range(4)
+    )
+
+
+def _expand_key(key: bytes) -> bytes:
+    """
+    Expands the initial key into round keys (AES-128 key schedule)
+    :param key: 16 bytes of the session key
+    :return: 176 bytes - 11 round keys by 16 bytes, every round key has the same byte order as a block
+    """
+    words = [int.from_bytes(key[i:i + 4], 'big') for i in range(0, _BLOCK_SIZE, 4)]
+
+    for i in range(4, (_ROUNDS_COUNT + 1) * 4):
+        word = words[-1]
+
+        if i % 4 == 0:
+            word = ((_S_BOX[(word >> 16) & 0xFF] << 24) | (_S_BOX[(word >> 8) & 0xFF] << 16) |
+                    (_S_BOX[word & 0xFF] << 8) | _S_BOX[word >> 24]) ^ (_RCON_TABLE[i // 4] << 24)
+
+        words.append(words[-4] ^ word)
+
+    return b''.join(word.to_bytes(4, 'big') for word in words)
+
+
+# T-tables of the cipher and of the equivalent inverse cipher
+_TE0, _TE1, _TE2, _TE3 = _build_tables(_S_BOX, (2, 1, 1, 3))
+_TD0, _TD1, _TD2, _TD3 = _build_tables(_INVERSE_S_BOX, (14, 9, 13, 11))
+
+# Count of the column words of the round keys (4 per round key)
+_ROUND_KEYS_WORDS = (_ROUNDS_COUNT + 1) * 4
+
+# Array type code of the unsigned 32-bit words
+_WORD_TYPE = 'I' if array('I').itemsize >= 4 else 'L'
+
+# Writes the 16 bytes of a block into a buffer without creating objects
+_PACK_BLOCK = Struct(f'{_BLOCK_SIZE}B').pack_into
 
 
 # Matrix Class
 class _Matrix:
     """
     A class representing a 4x4 matrix of byte integers used in the AES algorithm.
+    Stored compactly as 16 bytes, byte 4 * row + col is matrix[row][col]
     """
 
+    __slots__ = ('__data',)
+
     # Maximum value of 1 byte
     MAX_ITEM_VALUE = 256
 
@@ -25,30 +183,26 @@ class _Matrix:
     MATRIX_SIZE = ROW_COUNT * COL_COUNT
 
     # Constructor
-    def __init__(self, data: str | int | list[list[int]]):
+    def __init__(self, data: str | int | list[list[int]] | bytes | bytearray | memoryview):
         """
         Initializes the matrix with data provided in different formats
-        :param data: Either a string, integer, or list to initialize the matrix.
-        If string - length must be a 16, if list - 4x4 matrix, if int - 16 bytes length
+        :param data: Either a string, integer, list or bytes to initialize the matrix.
+        If string - length must be a 16, if list - 4x4 matrix, if int - 16 bytes length, if bytes - 16 bytes
         """
-        matrix = []
-
         if isinstance(data, str) and len(data) == self.MATRIX_SIZE:
-            matrix = [[ord(data[i]) % self.MAX_ITEM_VALUE for i in range(j, j + self.COL_COUNT)]
-                      for j in range(0, self.MATRIX_SIZE, self.COL_COUNT)]
+            self.__data = bytearray(ord(ch) % self.MAX_ITEM_VALUE for ch in data)
 
         elif isinstance(data, int):
-            for _ in range(self.ROW_COUNT):
-                row = []
-                for _ in range(self.COL_COUNT):
-                    row.insert(0, data % self.MAX_ITEM_VALUE)
-                    data >>= 8
-                matrix.insert(0, row)
+            self.__data = bytearray((data % (1 << (8 * self.MATRIX_SIZE))).to_bytes(self.MATRIX_SIZE, 'big'))
 
         elif isinstance(data, list) and len(data) == _Matrix.ROW_COUNT and len(data[0]) == _Matrix.COL_COUNT:
-            matrix = data
+            self.__data = bytearray(item for row in data for item in row)
 
-        self.__matrix = matrix
+        elif isinstance(data, (bytes, bytearray, memoryview)) and len(data) == self.MATRIX_SIZE:
+            self.__data = bytearray(data)
+
+        else:
+            self.__data = bytearray(self.MATRIX_SIZE)
 
     def __getitem__(self, coordinates: tuple[int, int]) -> int:
         """
@@ -58,7 +212,7 @@ class _Matrix:
         """
         row, col = coordinates
         if (0 <= row < self.ROW_COUNT) and (0 <= col < self.COL_COUNT):
-            return self.__matrix[row][col]
+            return self.__data[row * self.COL_COUNT + col]
         return -1
 
     def __setitem__(self, coordinates: tuple[int, int], value: int) -> None:
@@ -68,8 +222,8 @@ class _Matrix:
         :param value: new value to set
         """
         row, col = coordinates
-        if (0 <= row < self.ROW_COUNT) and (0 <= col < self.COL_COUNT) and (0 <= value <= self.MAX_ITEM_VALUE):
-            self.__matrix[row][col] = value
+        if (0 <= row < self.ROW_COUNT) and (0 <= col < self.COL_COUNT) and (0 <= value < self.MAX_ITEM_VALUE):
+            self.__data[row * self.COL_COUNT + col] = value
 
     def get_row(self, row: int) -> list[int]:
         """
@@ -77,8 +231,8 @@ class _Matrix:
         :param row: row index
         :return: specific row in the matrix
         """
-        if 0 <= row <= self.ROW_COUNT:
-            return self.__matrix[row]
+        if 0 <= row < self.ROW_COUNT:
+            return list(self.__data[row * self.COL_COUNT:(row + 1) * self.COL_COUNT])
 
     def get_col(self, col: int) -> list[int]:
         """
@@ -86,8 +240,8 @@ class _Matrix:
         :param col: column index
         :return: specific column in the matrix
         """
-        if 0 <= col <= self.COL_COUNT:
-            return [self.__matrix[i][col] for i in range(self.ROW_COUNT)]
+        if 0 <= col < self.COL_COUNT:
+            return list(self.__data[col::self.COL_COUNT])
 
     def set_row(self, row: int, new_row: list) -> None:
         """
@@ -95,8 +249,8 @@ class _Matrix:
         :param row: row index
         :param new_row: new row to set
         """
-        if (0 <= row <= self.ROW_COUNT) and (len(new_row) == self.ROW_COUNT):
-            self.__matrix[row] = new_row
+        if (0 <= row < self.ROW_COUNT) and (len(new_row) == self.COL_COUNT):
+            self.__data[row * self.COL_COUNT:(row + 1) * self.COL_COUNT] = bytes(new_row)
 
     def set_col(self, col: int, new_col: list) -> None:
         """
@@ -104,146 +258,88 @@ class _Matrix:
         :param col: column index
         :param new_col: new column to set
         """
-        if (0 <= col <= self.COL_COUNT) and (len(new_col) == self.COL_COUNT):
-            for i in range(self.ROW_COUNT):
-                self.__matrix[i][col] = new_col[i]
+        if (0 <= col < self.COL_COUNT) and (len(new_col) == self.ROW_COUNT):
+            self.__data[col::self.COL_COUNT] = bytes(new_col)
+
+    def set_bytes(self, data: bytes | bytearray | memoryview) -> None:
+        """
+        Replaces all the matrix by 16 bytes (without a new matrix)
+        :param data: 16 bytes, byte 4 * row + col is matrix[row][col]
+        """
+        self.__data[:] = data
+
+    def get_bytes(self) -> bytearray:
+        """
+        Returns the bytes of the matrix (not a copy)
+        :return: 16 bytes, byte 4 * row + col is matrix[row][col]
+        """
+        return self.__data
 
     def get_copy(self):
         """
         Function returns a copy of a matrix instance
         :rtype: _Matrix
-        :return: a deep copy of an instance (self) matrix
+        :return: a copy of an instance (self) matrix
         """
-        return _Matrix([[self.__matrix[i][j] for j in range(self.COL_COUNT)] for i in range(self.ROW_COUNT)])
+        return _Matrix(self.__data)
 
     def get_matrix(self) -> list[list[int]]:
         """
         Function returns instance matrix (list of lists)
         :return: list of 4 lists of ints, the initial matrix
         """
-        return self.__matrix
+        return [self.get_row(row) for row in range(self.ROW_COUNT)]
 
     def get_string(self) -> str:
         """
         Method converts matrix to the string
         :return: str by 16 length, converted from the matrix. (ASCII used)
         """
-        return ''.join(chr(ch) for row in self.__matrix for ch in row)
+        return self.__data.decode('latin-1')
 
 
-# Main AES class
-class aes:
+# Engines
+class _MatrixEngine:
+    """
+    Reference AES-128 engine. Runs every round step byte by byte over a _Matrix state.
+    Slow, but follows the algorithm description one to one - used to verify the other engines
     """
-    Advanced Encryption Standard (AES) implementation.
-
-    Attributes:
-    - rounds_count (int): The number of rounds in the AES algorithm. For the AES-128 default is 10.
-    """
-
-    # Static fields
-
-    # Count of rounds in encryption (10 for 128 bit)
-    __ROUNDS_COUNT = 10
-
-    # Substitution box of AES algorithm
-    __S_BOX = (
-        0x63, 0x7C, 0x77, 0x7B, 0xF2, 0x6B, 0x6F, 0xC5, 0x30, 0x01, 0x67, 0x2B, 0xFE, 0xD7, 0xAB, 0x76,
-        0xCA, 0x82, 0xC9, 0x7D, 0xFA, 0x59, 0x47, 0xF0, 0xAD, 0xD4, 0xA2, 0xAF, 0x9C, 0xA4, 0x72, 0xC0,
-        0xB7, 0xFD, 0x93, 0x26, 0x36, 0x3F, 0xF7, 0xCC, 0x34, 0xA5, 0xE5, 0xF1, 0x71, 0xD8, 0x31, 0x15,
-        0x04, 0xC7, 0x23, 0xC3, 0x18, 0x96, 0x05, 0x9A, 0x07, 0x12, 0x80, 0xE2, 0xEB, 0x27, 0xB2, 0x75,
-        0x09, 0x83, 0x2C, 0x1A, 0x1B, 0x6E, 0x5A, 0xA0, 0x52, 0x3B, 0xD6, 0xB3, 0x29, 0xE3, 0x2F, 0x84,
-        0x53, 0xD1, 0x00, 0xED, 0x20, 0xFC, 0xB1, 0x5B, 0x6A, 0xCB, 0xBE, 0x39, 0x4A, 0x4C, 0x58, 0xCF,
-        0xD0, 0xEF, 0xAA, 0xFB, 0x43, 0x4D, 0x33, 0x85, 0x45, 0xF9, 0x02, 0x7F, 0x50, 0x3C, 0x9F, 0xA8,
-        0x51, 0xA3, 0x40, 0x8F, 0x92, 0x9D, 0x38, 0xF5, 0xBC, 0xB6, 0xDA, 0x21, 0x10, 0xFF, 0xF3, 0xD2,
-        0xCD, 0x0C, 0x13, 0xEC, 0x5F, 0x97, 0x44, 0x17, 0xC4, 0xA7, 0x7E, 0x3D, 0x64, 0x5D, 0x19, 0x73,
-        0x60, 0x81, 0x4F, 0xDC, 0x22, 0x2A, 0x90, 0x88, 0x46, 0xEE, 0xB8, 0x14, 0xDE, 0x5E, 0x0B, 0xDB,
-        0xE0, 0x32, 0x3A, 0x0A, 0x49, 0x06, 0x24, 0x5C, 0xC2, 0xD3, 0xAC, 0x62, 0x91, 0x95, 0xE4, 0x79,
-        0xE7, 0xC8, 0x37, 0x6D, 0x8D, 0xD5, 0x4E, 0xA9, 0x6C, 0x56, 0xF4, 0xEA, 0x65, 0x7A, 0xAE, 0x08,
-        0xBA, 0x78, 0x25, 0x2E, 0x1C, 0xA6, 0xB4, 0xC6, 0xE8, 0xDD, 0x74, 0x1F, 0x4B, 0xBD, 0x8B, 0x8A,
-        0x70, 0x3E, 0xB5, 0x66, 0x48, 0x03, 0xF6, 0x0E, 0x61, 0x35, 0x57, 0xB9, 0x86, 0xC1, 0x1D, 0x9E,
-        0xE1, 0xF8, 0x98, 0x11, 0x69, 0xD9, 0x8E, 0x94, 0x9B, 0x1E, 0x87, 0xE9, 0xCE, 0x55, 0x28, 0xDF,
-        0x8C, 0xA1, 0x89, 0x0D, 0xBF, 0xE6, 0x42, 0x68, 0x41, 0x99, 0x2D, 0x0F, 0xB0, 0x54, 0xBB, 0x16
-    )
-
-    # Inverse substitution box of AES algorithm
-    __INVERSE_S_BOX = (
-        0x52, 0x09, 0x6A, 0xD5, 0x30, 0x36, 0xA5, 0x38, 0xBF, 0x40, 0xA3, 0x9E, 0x81, 0xF3, 0xD7, 0xFB,
-        0x7C, 0xE3, 0x39, 0x82, 0x9B, 0x2F, 0xFF, 0x87, 0x34, 0x8E, 0x43, 0x44, 0xC4, 0xDE, 0xE9, 0xCB,
-        0x54, 0x7B, 0x94, 0x32, 0xA6, 0xC2, 0x23, 0x3D, 0xEE, 0x4C, 0x95, 0x0B, 0x42, 0xFA, 0xC3, 0x4E,
-        0x08, 0x2E, 0xA1, 0x66, 0x28, 0xD9, 0x24, 0xB2, 0x76, 0x5B, 0xA2, 0x49, 0x6D, 0x8B, 0xD1, 0x25,
-        0x72, 0xF8, 0xF6, 0x64, 0x86, 0x68, 0x98, 0x16, 0xD4, 0xA4, 0x5C, 0xCC, 0x5D, 0x65, 0xB6, 0x92,
-        0x6C, 0x70, 0x48, 0x50, 0xFD, 0xED, 0xB9, 0xDA, 0x5E, 0x15, 0x46, 0x57, 0xA7, 0x8D, 0x9D, 0x84,
-        0x90, 0xD8, 0xAB, 0x00, 0x8C, 0xBC, 0xD3, 0x0A, 0xF7, 0xE4, 0x58, 0x05, 0xB8, 0xB3, 0x45, 0x06,
-        0xD0, 0x2C, 0x1E, 0x8F, 0xCA, 0x3F, 0x0F, 0x02, 0xC1, 0xAF, 0xBD, 0x03, 0x01, 0x13, 0x8A, 0x6B,
-        0x3A, 0x91, 0x11, 0x41, 0x4F, 0x67, 0xDC, 0xEA, 0x97, 0xF2, 0xCF, 0xCE, 0xF0, 0xB4, 0xE6, 0x73,
-        0x96, 0xAC, 0x74, 0x22, 0xE7, 0xAD, 0x35, 0x85, 0xE2, 0xF9, 0x37, 0xE8, 0x1C, 0x75, 0xDF, 0x6E,
-        0x47, 0xF1, 0x1A, 0x71, 0x1D, 0x29, 0xC5, 0x89, 0x6F, 0xB7, 0x62, 0x0E, 0xAA, 0x18, 0xBE, 0x1B,
-        0xFC, 0x56, 0x3E, 0x4B, 0xC6, 0xD2, 0x79, 0x20, 0x9A, 0xDB, 0xC0, 0xFE, 0x78, 0xCD, 0x5A, 0xF4,
-        0x1F, 0xDD, 0xA8, 0x33, 0x88, 0x07, 0xC7, 0x31, 0xB1, 0x12, 0x10, 0x59, 0x27, 0x80, 0xEC, 0x5F,
-        0x60, 0x51, 0x7F, 0xA9, 0x19, 0xB5, 0x4A, 0x0D, 0x2D, 0xE5, 0x7A, 0x9F, 0x93, 0xC9, 0x9C, 0xEF,
-        0xA0, 0xE0, 0x3B, 0x4D, 0xAE, 0x2A, 0xF5, 0xB0, 0xC8, 0xEB, 0xBB, 0x3C, 0x83, 0x53, 0x99, 0x61,
-        0x17, 0x2B, 0x04, 0x7E, 0xBA, 0x77, 0xD6, 0x26, 0xE1, 0x69, 0x14, 0x63, 0x55, 0x21, 0x0C, 0x7D
-    )
-
-    # RCON table used for key expansion of AES algorithm
-    __RCON_TABLE = (
-        0x00, 0x01, 0x02, 0x04, 0x08, 0x10, 0x20, 0x40, 0x80, 0x1B, 0x36, 0x6C, 0xD8, 0xAB, 0x4D, 0x9A, 0x2F, 0x5E,
-        0xBC, 0x63, 0xC6, 0x97, 0x35, 0x6A, 0xD4, 0xB3, 0x7D, 0xFA, 0xEF, 0xC5, 0x91, 0x39
-    )
-
-    # Constructor
-    def __init__(self, dh_key: int) -> None:
-        """
-        Initializes the AES object with a session key (based on Diffie-Hellman key). Also initialize round keys
-        :param dh_key: he Diffie-Hellman key used to derive the AES key.
-        """
-        dh_bytes = dh_key.to_bytes(256, byteorder='big')
-        aes_key = int(md5(dh_bytes).hexdigest(), 16)
-
-        self.__session_key = _Matrix(aes_key)
-        self.__round_keys = aes.__key_expansion(self.__session_key)
 
     @staticmethod
-    def __key_expansion(session_key: _Matrix) -> list[_Matrix]:
+    def expand_key(key: bytes) -> tuple[_Matrix, ...]:
         """
         Expands the initial key into round keys.
-        :return: List of round keys
+        :param key: 16 bytes of the session key
+        :return: Tuple of round keys
         """
-        key_columns = session_key.get_matrix().copy()
+        key_columns = [list(key[i:i + _Matrix.COL_COUNT]) for i in range(0, _BLOCK_SIZE, _Matrix.COL_COUNT)]
         iteration_size = 4
 
         i = 1
-        while len(key_columns) < (aes.__ROUNDS_COUNT + 1) * 4:
+        while len(key_columns) < (_ROUNDS_COUNT + 1) * 4:
             word = key_columns[-1].copy()
 
             if len(key_columns) % iteration_size == 0:
                 word.append(word.pop(0))
-                word = [aes.__S_BOX[b] for b in word]
-                word[0] ^= aes.__RCON_TABLE[i]
+                word = [_S_BOX[b] for b in word]
+                word[0] ^= _RCON_TABLE[i]
                 i += 1
 
             last = key_columns[-iteration_size].copy()
             key_columns.append([word[i] ^ last[i] for i in range(_Matrix.ROW_COUNT)])
 
-        return [
+        return tuple(
             _Matrix(key_columns[4 * i:4 * (i + 1)])
             for i in range(len(key_columns) // iteration_size)
-        ]
+        )
 
-    def __add_round_key(self, data: _Matrix, round_index: int) -> None:
+    @staticmethod
+    def __add_round_key(data: _Matrix, round_key: _Matrix) -> None:
         """
         Adds round key to the data. Do xor byte by byte with round key and current state.
         :param data: [reference] The current state
-        :param round_index: The index of the round key to be added
+        :param round_key: The round key to be added
         """
-        if round_index == -1:
-            round_index = aes.__ROUNDS_COUNT
-
-        if round_index < 0 or round_index > aes.__ROUNDS_COUNT:
-            raise Exception("Round index is not valid")
-
-        round_key = self.__round_keys[round_index]
-
         for i in range(_Matrix.ROW_COUNT):
             for j in range(_Matrix.COL_COUNT):
                 data_value = data[i, j]
@@ -258,7 +354,7 @@ class aes:
         """
         for i in range(_Matrix.ROW_COUNT):
             for j in range(_Matrix.COL_COUNT):
-                data[i, j] = aes.__S_BOX[data[i, j]]
+                data[i, j] = _S_BOX[data[i, j]]
 
     @staticmethod
     def __inverse_sub_bytes(data: _Matrix) -> None:
@@ -268,7 +364,7 @@ class aes:
         """
         for i in range(_Matrix.ROW_COUNT):
             for j in range(_Matrix.COL_COUNT):
-                data[i, j] = aes.__INVERSE_S_BOX[data[i, j]]
+                data[i, j] = _INVERSE_S_BOX[data[i, j]]
 
     @staticmethod
     def __shift_rows(data: _Matrix) -> None:
@@ -289,37 +385,31 @@ class aes:
             shift = _Matrix.ROW_COUNT - i
             data.set_row(i, data.get_row(i)[shift:] + data.get_row(i)[:shift])
 
-    @staticmethod
-    def __xtime(val: int) -> int:
-        if val & 0x80:
-            return ((val << 1) ^ 0x1b) % _Matrix.MAX_ITEM_VALUE
-        return val << 1
-
     @staticmethod
     def __xtimes_0e(val: int) -> int:
-        return aes.__xtime(aes.__xtime(aes.__xtime(val) ^ val) ^ val)
+        return _xtime(_xtime(_xtime(val) ^ val) ^ val)
 
     @staticmethod
     def __xtimes_0b(val: int) -> int:
-        return aes.__xtime(aes.__xtime(aes.__xtime(val)) ^ val) ^ val
+        return _xtime(_xtime(_xtime(val)) ^ val) ^ val
 
     @staticmethod
     def __xtimes_0d(val: int) -> int:
-        return aes.__xtime(aes.__xtime(aes.__xtime(val) ^ val)) ^ val
+        return _xtime(_xtime(_xtime(val) ^ val)) ^ val
 
     @staticmethod
     def __xtimes_09(val: int) -> int:
-        return aes.__xtime(aes.__xtime(aes.__xtime(val))) ^ val
+        return _xtime(_xtime(_xtime(val))) ^ val
 
     @staticmethod
     def __mix_column(col: list[int]) -> None:
         c_0 = col[0]
         all_xor = col[0] ^ col[1] ^ col[2] ^ col[3]
 
-        col[0] ^= all_xor ^ aes.__xtime(col[0] ^ col[1])
-        col[1] ^= all_xor ^ aes.__xtime(col[1] ^ col[2])
-        col[2] ^= all_xor ^ aes.__xtime(col[2] ^ col[3])
-        col[3] ^= all_xor ^ aes.__xtime(c_0 ^ col[3])
+        col[0] ^= all_xor ^ _xtime(col[0] ^ col[1])
+        col[1] ^= all_xor ^ _xtime(col[1] ^ col[2])
+        col[2] ^= all_xor ^ _xtime(col[2] ^ col[3])
+        col[3] ^= all_xor ^ _xtime(c_0 ^ col[3])
 
     @staticmethod
     def __mix_columns(data: _Matrix) -> None:
@@ -329,16 +419,16 @@ class aes:
         """
         for i in range(_Matrix.COL_COUNT):
             col = data.get_col(i)
-            aes.__mix_column(col)
+            _MatrixEngine.__mix_column(col)
             data.set_col(i, col)
 
     @staticmethod
     def __inverse_mix_column(col: list[int]) -> None:
         c_0, c_1, c_2, c_3 = col
-        col[0] = aes.__xtimes_0e(c_0) ^ aes.__xtimes_0b(c_1) ^ aes.__xtimes_0d(c_2) ^ aes.__xtimes_09(c_3)
-        col[1] = aes.__xtimes_09(c_0) ^ aes.__xtimes_0e(c_1) ^ aes.__xtimes_0b(c_2) ^ aes.__xtimes_0d(c_3)
-        col[2] = aes.__xtimes_0d(c_0) ^ aes.__xtimes_09(c_1) ^ aes.__xtimes_0e(c_2) ^ aes.__xtimes_0b(c_3)
-        col[3] = aes.__xtimes_0b(c_0) ^ aes.__xtimes_0d(c_1) ^ aes.__xtimes_09(c_2) ^ aes.__xtimes_0e(c_3)
+        col[0] = _MatrixEngine.__xtimes_0e(c_0) ^ _MatrixEngine.__xtimes_0b(c_1) ^ _MatrixEngine.__xtimes_0d(c_2) ^ _MatrixEngine.__xtimes_09(c_3)
+        col[1] = _MatrixEngine.__xtimes_09(c_0) ^ _MatrixEngine.__xtimes_0e(c_1) ^ _MatrixEngine.__xtimes_0b(c_2) ^ _MatrixEngine.__xtimes_0d(c_3)
+        col[2] = _MatrixEngine.__xtimes_0d(c_0) ^ _MatrixEngine.__xtimes_09(c_1) ^ _MatrixEngine.__xtimes_0e(c_2) ^ _MatrixEngine.__xtimes_0b(c_3)
+        col[3] = _MatrixEngine.__xtimes_0b(c_0) ^ _MatrixEngine.__xtimes_0d(c_1) ^ _MatrixEngine.__xtimes_09(c_2) ^ _MatrixEngine.__xtimes_0e(c_3)
 
     @staticmethod
     def __inverse_mix_columns(data: _Matrix) -> None:
@@ -348,105 +438,1697 @@ class aes:
         """
         for i in range(_Matrix.COL_COUNT):
             col = data.get_col(i)
-            aes.__inverse_mix_column(col)
+            _MatrixEngine.__inverse_mix_column(col)
             data.set_col(i, col)
 
     @staticmethod
-    def __divide_into_blocks(data: str) -> list[str]:
+    def __encrypt_block(state: _Matrix, round_keys: list[_Matrix]) -> None:
         """
-        Divides the input data into blocks for encryption (by 16 bytes)
-        :param data: The input data to be divided
-        :return: List of data blocks by length of 16
+        Encrypts a single block of data
+        :param state: [reference] The text block to be encrypted, becomes the encrypted block
+        :param round_keys: The expanded key
         """
-        block_size = _Matrix.MATRIX_SIZE
-        num_blocks = (len(data) + block_size - 1) // block_size
-        padded_data = data + (block_size - len(data) % block_size) * chr(0)
+        # Initial Round
+        _MatrixEngine.__add_round_key(state, round_keys[0])
 
-        blocks = [
-            padded_data[i * block_size:(i + 1) * block_size]
-            for i in range(num_blocks)
-        ]
+        # Main Rounds
+        for i in range(1, _ROUNDS_COUNT):
+            _MatrixEngine.__sub_bytes(state)
+            _MatrixEngine.__shift_rows(state)
+            _MatrixEngine.__mix_columns(state)
+            _MatrixEngine.__add_round_key(state, round_keys[i])
 
-        return blocks
+        # Final Round
+        _MatrixEngine.__sub_bytes(state)
+        _MatrixEngine.__shift_rows(state)
+        _MatrixEngine.__add_round_key(state, round_keys[-1])
 
-    def __encrypt_block(self, input_matrix: _Matrix) -> _Matrix:
+    @staticmethod
+    def __decrypt_block(state: _Matrix, round_keys: list[_Matrix]) -> None:
         """
-        Encrypts a single block of data
-        :param input_matrix: The text block to be encrypted
-        :return: The encrypted data block (Matrix)
+        Decrypts a single block of encrypted data
+        :param state: [reference] The block of encrypted data to be decrypted, becomes the original block
+        :param round_keys: The expanded key
+        """
+        # Initial Round
+        _MatrixEngine.__add_round_key(state, round_keys[-1])
+        _MatrixEngine.__inverse_shift_rows(state)
+        _MatrixEngine.__inverse_sub_bytes(state)
+
+        # Main Rounds in reverse order
+        for i in range(_ROUNDS_COUNT - 1, 0, -1):
+            _MatrixEngine.__add_round_key(state, round_keys[i])
+            _MatrixEngine.__inverse_mix_columns(state)
+            _MatrixEngine.__inverse_shift_rows(state)
+            _MatrixEngine.__inverse_sub_bytes(state)
+
+        # Final Round
+        _MatrixEngine.__add_round_key(state, round_keys[0])
+
+    @staticmethod
+    def encrypt_into(data: memoryview, output: memoryview, round_keys: list[_Matrix]) -> None:
+        """
+        Encrypts the blocks of the data one by one
+        :param data: data to encrypt, length must be a multiple of 16
+        :param output: [reference] buffer to write the encrypted data to (same length as the data)
+        :param round_keys: The expanded key
+        """
+        state = _Matrix(bytes(_BLOCK_SIZE))
+
+        for i in range(0, len(data), _BLOCK_SIZE):
+            state.set_bytes(data[i:i + _BLOCK_SIZE])
+            _MatrixEngine.__encrypt_block(state, round_keys)
+            output[i:i + _BLOCK_SIZE] = state.get_bytes()
+
+    @staticmethod
+    def decrypt_into(data: memoryview, output: memoryview, round_keys: list[_Matrix]) -> None:
+        """
+        Decrypts the blocks of the data one by one
+        :param data: data to decrypt, length must be a multiple of 16
+        :param output: [reference] buffer to write the decrypted data to (same length as the data)
+        :param round_keys: The expanded key
+        """
+        state = _Matrix(bytes(_BLOCK_SIZE))
+
+        for i in range(0, len(data), _BLOCK_SIZE):
+            state.set_bytes(data[i:i + _BLOCK_SIZE])
+            _MatrixEngine.__decrypt_block(state, round_keys)
+            output[i:i + _BLOCK_SIZE] = state.get_bytes()
+
+
+class _TableEngine:
+    """
+    Table driven AES-128 engine.
+    The state is held as four 32-bit column words and every round is 16 lookups into the precomputed T-tables,
+    decryption uses the equivalent inverse cipher. Round keys are stored as one bytes object of column words (not
+    tracked by the GC), and the blocks are written straight into the output - nothing is allocated per block
+    """
+
+    @staticmethod
+    def expand_key(key: bytes) -> bytes:
+        """
+        Expands the initial key into round keys of the cipher and of the equivalent inverse cipher
+        :param key: 16 bytes of the session key
+        :return: 88 column words (native 32-bit) - 44 of the encryption round keys, then 44 of the decryption ones
+        """
+        expanded_key = _expand_key(key)
+        words = [int.from_bytes(expanded_key[i:i + 4], 'big') for i in range(0, len(expanded_key), 4)]
+
+        # The key words are rows of the state matrix - transpose every round key into column words
+        encryption_keys = []
+        for i in range(0, len(words), 4):
+            w_0, w_1, w_2, w_3 = words[i:i + 4]
+            for shift in (24, 16, 8, 0):
+                encryption_keys.append((((w_0 >> shift) & 0xFF) << 24) | (((w_1 >> shift) & 0xFF) << 16) |
+                                       (((w_2 >> shift) & 0xFF) << 8) | ((w_3 >> shift) & 0xFF))
+
+        # Equivalent inverse cipher - reversed rounds, inverse MixColumns applied on the middle round keys
+        decryption_keys = list(encryption_keys[-4:])
+        for i in range(_ROUNDS_COUNT - 1, 0, -1):
+            for word in encryption_keys[4 * i:4 * (i + 1)]:
+                decryption_keys.append(_TD0[_S_BOX[word >> 24]] ^ _TD1[_S_BOX[(word >> 16) & 0xFF]] ^
+                                       _TD2[_S_BOX[(word >> 8) & 0xFF]] ^ _TD3[_S_BOX[word & 0xFF]])
+        decryption_keys.extend(encryption_keys[:4])
+
+        return array(_WORD_TYPE, encryption_keys + decryption_keys).tobytes()
+
+    @staticmethod
+    def encrypt_into(data: memoryview, output: memoryview, round_keys: bytes) -> None:
+        """
+        Encrypts the blocks of the data
+        :param data: data to encrypt, length must be a multiple of 16
+        :param output: [reference] buffer to write the encrypted data to (same length as the data)
+        :param round_keys: The expanded key
+        """
+        keys = memoryview(round_keys).cast(_WORD_TYPE)[:_ROUND_KEYS_WORDS].tolist()
+        te0, te1, te2, te3, s_box, pack_block = _TE0, _TE1, _TE2, _TE3, _S_BOX, _PACK_BLOCK
+        k_0, k_1, k_2, k_3 = keys[:4]
+        f_0, f_1, f_2, f_3 = keys[-4:]
+        middle_rounds = [keys[i:i + 4] for i in range(4, _ROUNDS_COUNT * 4, 4)]
+
+        for i in range(0, len(data), _BLOCK_SIZE):
+            # Load the column words (byte 4 * row + col is state[row][col])
+            s_0 = ((data[i] << 24) | (data[i + 4] << 16) | (data[i + 8] << 8) | data[i + 12]) ^ k_0
+            s_1 = ((data[i + 1] << 24) | (data[i + 5] << 16) | (data[i + 9] << 8) | data[i + 13]) ^ k_1
+            s_2 = ((data[i + 2] << 24) | (data[i + 6] << 16) | (data[i + 10] << 8) | data[i + 14]) ^ k_2
+            s_3 = ((data[i + 3] << 24) | (data[i + 7] << 16) | (data[i + 11] << 8) | data[i + 15]) ^ k_3
+
+            # Main Rounds
+            for r_0, r_1, r_2, r_3 in middle_rounds:
+                s_0, s_1, s_2, s_3 = (
+                    te0[s_0 >> 24] ^ te1[(s_1 >> 16) & 0xFF] ^ te2[(s_2 >> 8) & 0xFF] ^ te3[s_3 & 0xFF] ^ r_0,
+                    te0[s_1 >> 24] ^ te1[(s_2 >> 16) & 0xFF] ^ te2[(s_3 >> 8) & 0xFF] ^ te3[s_0 & 0xFF] ^ r_1,
+                    te0[s_2 >> 24] ^ te1[(s_3 >> 16) & 0xFF] ^ te2[(s_0 >> 8) & 0xFF] ^ te3[s_1 & 0xFF] ^ r_2,
+                    te0[s_3 >> 24] ^ te1[(s_0 >> 16) & 0xFF] ^ te2[(s_1 >> 8) & 0xFF] ^ te3[s_2 & 0xFF] ^ r_3
+                )
+
+            # Final Round
+            pack_block(
+                output, i,
+                s_box[s_0 >> 24] ^ (f_0 >> 24), s_box[s_1 >> 24] ^ (f_1 >> 24),
+                s_box[s_2 >> 24] ^ (f_2 >> 24), s_box[s_3 >> 24] ^ (f_3 >> 24),
+                s_box[(s_1 >> 16) & 0xFF] ^ ((f_0 >> 16) & 0xFF), s_box[(s_2 >> 16) & 0xFF] ^ ((f_1 >> 16) & 0xFF),
+                s_box[(s_3 >> 16) & 0xFF] ^ ((f_2 >> 16) & 0xFF), s_box[(s_0 >> 16) & 0xFF] ^ ((f_3 >> 16) & 0xFF),
+                s_box[(s_2 >> 8) & 0xFF] ^ ((f_0 >> 8) & 0xFF), s_box[(s_3 >> 8) & 0xFF] ^ ((f_1 >> 8) & 0xFF),
+                s_box[(s_0 >> 8) & 0xFF] ^ ((f_2 >> 8) & 0xFF), s_box[(s_1 >> 8) & 0xFF] ^ ((f_3 >> 8) & 0xFF),
+                s_box[s_3 & 0xFF] ^ (f_0 & 0xFF), s_box[s_0 & 0xFF] ^ (f_1 & 0xFF),
+                s_box[s_1 & 0xFF] ^ (f_2 & 0xFF), s_box[s_2 & 0xFF] ^ (f_3 & 0xFF)
+            )
+
+    @staticmethod
+    def decrypt_into(data: memoryview, output: memoryview, round_keys: bytes) -> None:
+        """
+        Decrypts the blocks of the data by the equivalent inverse cipher
+        :param data: data to decrypt, length must be a multiple of 16
+        :param output: [reference] buffer to write the decrypted data to (same length as the data)
+        :param round_keys: The expanded key
+        """
+        keys = memoryview(round_keys).cast(_WORD_TYPE)[_ROUND_KEYS_WORDS:].tolist()
+        td0, td1, td2, td3, s_box, pack_block = _TD0, _TD1, _TD2, _TD3, _INVERSE_S_BOX, _PACK_BLOCK
+        k_0, k_1, k_2, k_3 = keys[:4]
+        f_0, f_1, f_2, f_3 = keys[-4:]
+        middle_rounds = [keys[i:i + 4] for i in range(4, _ROUNDS_COUNT * 4, 4)]
+
+        for i in range(0, len(data), _BLOCK_SIZE):
+            # Load the column words (byte 4 * row + col is state[row][col])
+            s_0 = ((data[i] << 24) | (data[i + 4] << 16) | (data[i + 8] << 8) | data[i + 12]) ^ k_0
+            s_1 = ((data[i + 1] << 24) | (data[i + 5] << 16) | (data[i + 9] << 8) | data[i + 13]) ^ k_1
+            s_2 = ((data[i + 2] << 24) | (data[i + 6] << 16) | (data[i + 10] << 8) | data[i + 14]) ^ k_2
+            s_3 = ((data[i + 3] << 24) | (data[i + 7] << 16) | (data[i + 11] << 8) | data[i + 15]) ^ k_3
+
+            # Main Rounds in reverse order
+            for r_0, r_1, r_2, r_3 in middle_rounds:
+                s_0, s_1, s_2, s_3 = (
+                    td0[s_0 >> 24] ^ td1[(s_3 >> 16) & 0xFF] ^ td2[(s_2 >> 8) & 0xFF] ^ td3[s_1 & 0xFF] ^ r_0,
+                    td0[s_1 >> 24] ^ td1[(s_0 >> 16) & 0xFF] ^ td2[(s_3 >> 8) & 0xFF] ^ td3[s_2 & 0xFF] ^ r_1,
+                    td0[s_2 >> 24] ^ td1[(s_1 >> 16) & 0xFF] ^ td2[(s_0 >> 8) & 0xFF] ^ td3[s_3 & 0xFF] ^ r_2,
+                    td0[s_3 >> 24] ^ td1[(s_2 >> 16) & 0xFF] ^ td2[(s_1 >> 8) & 0xFF] ^ td3[s_0 & 0xFF] ^ r_3
+                )
+
+            # Final Round
+            pack_block(
+                output, i,
+                s_box[s_0 >> 24] ^ (f_0 >> 24), s_box[s_1 >> 24] ^ (f_1 >> 24),
+                s_box[s_2 >> 24] ^ (f_2 >> 24), s_box[s_3 >> 24] ^ (f_3 >> 24),
+                s_box[(s_3 >> 16) & 0xFF] ^ ((f_0 >> 16) & 0xFF), s_box[(s_0 >> 16) & 0xFF] ^ ((f_1 >> 16) & 0xFF),
+                s_box[(s_1 >> 16) & 0xFF] ^ ((f_2 >> 16) & 0xFF), s_box[(s_2 >> 16) & 0xFF] ^ ((f_3 >> 16) & 0xFF),
+                s_box[(s_2 >> 8) & 0xFF] ^ ((f_0 >> 8) & 0xFF), s_box[(s_3 >> 8) & 0xFF] ^ ((f_1 >> 8) & 0xFF),
+                s_box[(s_0 >> 8) & 0xFF] ^ ((f_2 >> 8) & 0xFF), s_box[(s_1 >> 8) & 0xFF] ^ ((f_3 >> 8) & 0xFF),
+                s_box[s_1 & 0xFF] ^ (f_0 & 0xFF), s_box[s_2 & 0xFF] ^ (f_1 & 0xFF),
+                s_box[s_3 & 0xFF] ^ (f_2 & 0xFF), s_box[s_0 & 0xFF] ^ (f_3 & 0xFF)
+            )
+
+
+class _NumpyEngine:
+    """
+    Vectorized AES-128 engine over NumPy arrays (available only when NumPy is installed).
+    Processes a whole (N, 16) array of blocks in one call: every step is a table lookup through fancy indexing or a
+    fixed byte permutation. Round keys are an (11, 16) array, or an (N, 11, 16) array - own round keys for every block
+    """
+
+    # Byte permutations of ShiftRows and of its inverse (byte 4 * row + col is state[row][col])
+    SHIFT_ROWS = [4 * row + (col + row) % 4 for row in range(4) for col in range(4)]
+    INVERSE_SHIFT_ROWS = [4 * row + (col - row) % 4 for row in range(4) for col in range(4)]
+
+    # Byte permutations that bring row (row + i) of every column to the place of the row (for MixColumns)
+    ROTATE_ROWS = [[4 * ((row + i) % 4) + col for row in range(4) for col in range(4)] for i in range(4)]
+
+    # Lookup tables
+    if np is not None:
+        S_BOX = np.array(_S_BOX, dtype=np.uint8)
+        INVERSE_S_BOX = np.array(_INVERSE_S_BOX, dtype=np.uint8)
+        MULTIPLY = {
+            factor: np.array([_gf_multiply(value, factor) for value in range(256)], dtype=np.uint8)
+            for factor in (2, 9, 11, 13, 14)
+        }
+
+    @staticmethod
+    def expand_key(key: bytes) -> 'np.ndarray':
+        """
+        Expands the initial key into round keys
+        :param key: 16 bytes of the session key
+        :return: (11, 16) uint8 array of the round keys
+        """
+        return np.frombuffer(_expand_key(key), dtype=np.uint8).reshape(_ROUNDS_COUNT + 1, _BLOCK_SIZE)
+
+    @staticmethod
+    def __mix_columns(state: 'np.ndarray') -> 'np.ndarray':
+        """
+        Mixes the columns of all the states by Rijndael algorithm
+        :param state: (N, 16) array of the states
+        :return: (N, 16) array of the mixed states
+        """
+        rotate = _NumpyEngine.ROTATE_ROWS
+        doubled = _NumpyEngine.MULTIPLY[2][state]
+        tripled = doubled ^ state
+
+        return doubled ^ tripled[:, rotate[1]] ^ state[:, rotate[2]] ^ state[:, rotate[3]]
+
+    @staticmethod
+    def __inverse_mix_columns(state: 'np.ndarray') -> 'np.ndarray':
+        """
+        Mixes the columns of all the states in reverse order by Rijndael algorithm
+        :param state: (N, 16) array of the states
+        :return: (N, 16) array of the mixed states
         """
-        state = _Matrix.get_copy(input_matrix)
+        rotate = _NumpyEngine.ROTATE_ROWS
+        multiply = _NumpyEngine.MULTIPLY
+
+        return (multiply[14][state] ^ multiply[11][state][:, rotate[1]] ^
+                multiply[13][state][:, rotate[2]] ^ multiply[9][state][:, rotate[3]])
+
+    @staticmethod
+    def encrypt_blocks(blocks: 'np.ndarray', round_keys: 'np.ndarray') -> 'np.ndarray':
+        """
+        Encrypts all the blocks
+        :param blocks: (N, 16) uint8 array of the blocks
+        :param round_keys: (11, 16) or (N, 11, 16) uint8 array of the round keys
+        :return: (N, 16) uint8 array of the encrypted blocks
+        """
+        s_box, shift_rows = _NumpyEngine.S_BOX, _NumpyEngine.SHIFT_ROWS
 
         # Initial Round
-        self.__add_round_key(state, 0)
+        state = blocks ^ round_keys[..., 0, :]
 
         # Main Rounds
-        for i in range(1, aes.__ROUNDS_COUNT):
-            aes.__sub_bytes(state)
-            aes.__shift_rows(state)
-            aes.__mix_columns(state)
-            self.__add_round_key(state, i)
+        for i in range(1, _ROUNDS_COUNT):
+            state = _NumpyEngine.__mix_columns(s_box[state[:, shift_rows]]) ^ round_keys[..., i, :]
 
         # Final Round
-        aes.__sub_bytes(state)
-        aes.__shift_rows(state)
-        self.__add_round_key(state, -1)
-
-        return state
+        return s_box[state[:, shift_rows]] ^ round_keys[..., _ROUNDS_COUNT, :]
 
-    def __decrypt_block(self, encrypted_block: _Matrix) -> _Matrix:
+    @staticmethod
+    def decrypt_blocks(blocks: 'np.ndarray', round_keys: 'np.ndarray') -> 'np.ndarray':
         """
-        Decrypts a single block of encrypted data
-        :param encrypted_block: The block of encrypted data to be decrypted
-        :return: The decrypted original text (in Matrix)
+        Decrypts all the blocks
+        :param blocks: (N, 16) uint8 array of the encrypted blocks
+        :param round_keys: (11, 16) or (N, 11, 16) uint8 array of the round keys
+        :return: (N, 16) uint8 array of the decrypted blocks
         """
-        state = _Matrix.get_copy(encrypted_block)
+        inverse_s_box, inverse_shift_rows = _NumpyEngine.INVERSE_S_BOX, _NumpyEngine.INVERSE_SHIFT_ROWS
 
         # Initial Round
-        self.__add_round_key(state, -1)
-        aes.__inverse_shift_rows(state)
-        aes.__inverse_sub_bytes(state)
+        state = inverse_s_box[(blocks ^ round_keys[..., _ROUNDS_COUNT, :])[:, inverse_shift_rows]]
 
         # Main Rounds in reverse order
-        for i in range(aes.__ROUNDS_COUNT - 1, 0, -1):
-            self.__add_round_key(state, i)
-            aes.__inverse_mix_columns(state)
-            aes.__inverse_shift_rows(state)
-            aes.__inverse_sub_bytes(state)
+        for i in range(_ROUNDS_COUNT - 1, 0, -1):
+            state = inverse_s_box[_NumpyEngine.__inverse_mix_columns(state ^ round_keys[..., i, :])[:, inverse_shift_rows]]
 
         # Final Round
-        self.__add_round_key(state, 0)
+        return state ^ round_keys[..., 0, :]
 
-        return state
+    @staticmethod
+    def encrypt_into(data: memoryview, output: memoryview, round_keys: 'np.ndarray') -> None:
+        """
+        Encrypts the blocks of the data
+        :param data: data to encrypt, length must be a multiple of 16
+        :param output: [reference] buffer to write the encrypted data to (same length as the data)
+        :param round_keys: The expanded key
+        """
+        blocks = np.frombuffer(data, dtype=np.uint8).reshape(-1, _BLOCK_SIZE)
+        output[:] = _NumpyEngine.encrypt_blocks(blocks, round_keys).tobytes()
 
-    def encrypt(self, plain_text: str) -> str:
+    @staticmethod
+    def decrypt_into(data: memoryview, output: memoryview, round_keys: 'np.ndarray') -> None:
         """
-        Encrypts the input text using AES-128
-        :param plain_text: The text to be encrypted
-        :return: List of encrypted data blocks
+        Decrypts the blocks of the data
+        :param data: data to decrypt, length must be a multiple of 16
+        :param output: [reference] buffer to write the decrypted data to (same length as the data)
+        :param round_keys: The expanded key
         """
-        blocks = aes.__divide_into_blocks(plain_text)
-        encrypted_list = []
+        blocks = np.frombuffer(data, dtype=np.uint8).reshape(-1, _BLOCK_SIZE)
+        output[:] = _NumpyEngine.decrypt_blocks(blocks, round_keys).tobytes()
+
 
-        for block in blocks:
-            encrypted_list.append(self.__encrypt_block(_Matrix(block)).get_string())
+class _BitsliceMasks:
+    """
+    Byte masks of the bitsliced engine for one batch size (the masks are repeated in every block of the planes)
+    """
 
-        return ''.join(encrypted_list)
+    __slots__ = ('ones', 'full', 'repeat', 'first_row', 'shift_rows', 'inverse_shift_rows', 'rotate_1', 'rotate_2')
 
-    def decrypt(self, encrypted_text: str) -> str:
+    def __init__(self, blocks_count: int):
         """
-        Decrypts the cipher list into the original text using AES-128
-        :param encrypted_text: encrypted data
-        :return: The decrypted original text
+        Builds the masks
+        :param blocks_count: count of the 16 bytes blocks in the planes
+        """
+        def pattern(positions) -> int:
+            return int.from_bytes(bytes(0xFF if p in positions else 0 for p in range(_BLOCK_SIZE)) * blocks_count,
+                                  'little')
+
+        # 0x01 in every byte, all ones, and 1 in the lowest bit of every block (multiplier to repeat a 128-bit pattern)
+        self.ones = int.from_bytes(b'\x01' * (_BLOCK_SIZE * blocks_count), 'little')
+        self.full = (1 << (8 * _BLOCK_SIZE * blocks_count)) - 1
+        self.repeat = int.from_bytes((b'\x01' + bytes(_BLOCK_SIZE - 1)) * blocks_count, 'little')
+
+        # Byte 4 * row + col is state[row][col]. The first row stays, row r: (mask, right shift, mask, left shift) in bits
+        self.first_row = pattern(range(4))
+        self.shift_rows = [(pattern({4 * row + col for col in range(row, 4)}), 8 * row,
+                            pattern({4 * row + col for col in range(row)}), 8 * (4 - row)) for row in range(1, 4)]
+        self.inverse_shift_rows = [(pattern({4 * row + col for col in range(4 - row, 4)}), 8 * (4 - row),
+                                    pattern({4 * row + col for col in range(4 - row)}), 8 * row) for row in range(1, 4)]
+
+        # Row r gets row r + k of the same column: (mask, right shift, mask, left shift) in bits
+        self.rotate_1 = (pattern(range(4, 16)), 32, pattern(range(4)), 96)
+        self.rotate_2 = (pattern(range(8, 16)), 64, pattern(range(8)), 64)
+
+
+@lru_cache(maxsize=64)
+def _bitslice_masks(blocks_count: int) -> _BitsliceMasks:
+    """
+    Gives the masks of the bitsliced engine for the batch size (cached)
+    :param blocks_count: count of the 16 bytes blocks in the planes
+    :return: the masks
+    """
+    return _BitsliceMasks(blocks_count)
+
+
+class _BitslicedEngine:
+    """
+    Bitsliced AES-128 engine over Python big integers - for wide batches without NumPy.
+    Bit b of every byte of all the blocks is gathered into one int (bit plane b), so one bitwise operation works on all
+    the blocks at once: SubBytes is a boolean circuit (inversion in GF(2^8) and the affine transform), ShiftRows and
+    MixColumns are masks and shifts of whole bytes. The blocks are split to 8 groups and group g is held in bit g of
+    every byte of the planes - packing is 64 shifts and masks, and no bit of the planes is wasted.
+    The circuit costs the same for 1 block and for hundreds, so it's slow for short data
+    """
+
+    # Bits in a byte - count of the planes and of the block groups
+    PLANES_COUNT = 8
+
+    @staticmethod
+    def expand_key(key: bytes) -> bytes:
+        """
+        Expands the initial key into the byte masks of the round keys
+        :param key: 16 bytes of the session key
+        :return: 11 * 8 patterns of 16 bytes - pattern of round key i and bit b has 0xFF in the bytes of the round key
+        where bit b is set
+        """
+        expanded_key = _expand_key(key)
+
+        return bytes(0xFF if (expanded_key[_BLOCK_SIZE * i + position] >> bit) & 1 else 0
+                     for i in range(_ROUNDS_COUNT + 1)
+                     for bit in range(_BitslicedEngine.PLANES_COUNT)
+                     for position in range(_BLOCK_SIZE))
+
+    @staticmethod
+    def __reduce(product: list[int]) -> list[int]:
+        """
+        Reduces the polynomial modulo the AES polynomial (x^8 + x^4 + x^3 + x + 1)
+        :param product: planes of the coefficients of x^0 .. x^14
+        :return: planes of the 8 bits of the result
+        """
+        for k in range(14, 7, -1):
+            high = product[k]
+            product[k - 4] ^= high
+            product[k - 5] ^= high
+            product[k - 7] ^= high
+            product[k - 8] ^= high
+
+        return product[:8]
+
+    @staticmethod
+    def __multiply(a: list[int], b: list[int]) -> list[int]:
+        """
+        Multiplies in GF(2^8) all the bytes at once
+        :param a: planes of the first factors
+        :param b: planes of the second factors
+        :return: planes of the products
+        """
+        product = [0] * 15
+
+        for i, a_i in enumerate(a):
+            for j, b_j in enumerate(b):
+                product[i + j] ^= a_i & b_j
+
+        return _BitslicedEngine.__reduce(product)
+
+    @staticmethod
+    def __square(a: list[int], times: int = 1) -> list[int]:
+        """
+        Squares in GF(2^8) all the bytes at once (linear - no AND at all)
+        :param a: planes of the bytes
+        :param times: count of the squarings
+        :return: planes of a^(2^times)
+        """
+        for _ in range(times):
+            product = [0] * 15
+            product[0:15:2] = a
+            a = _BitslicedEngine.__reduce(product)
+
+        return a
+
+    @staticmethod
+    def __inverse(x: list[int]) -> list[int]:
+        """
+        Inverts in GF(2^8) all the bytes at once - x^254 (0 stays 0)
+        :param x: planes of the bytes
+        :return: planes of the inverses
+        """
+        x_2 = _BitslicedEngine.__square(x)
+        x_3 = _BitslicedEngine.__multiply(x_2, x)
+        x_12 = _BitslicedEngine.__square(x_3, 2)
+        x_14 = _BitslicedEngine.__multiply(x_12, x_2)
+        x_15 = _BitslicedEngine.__multiply(x_12, x_3)
+        x_240 = _BitslicedEngine.__square(x_15, 4)
+
+        return _BitslicedEngine.__multiply(x_240, x_14)
+
+    @staticmethod
+    def __sub_bytes(planes: list[int], full: int) -> list[int]:
+        """
+        Substitutes all the bytes by the S-Box: inversion, then the affine transform (constant 0x63)
+        :param planes: planes of the state
+        :param full: all ones mask (adds 1 bits of the constant)
+        :return: planes of the new state
+        """
+        b = _BitslicedEngine.__inverse(planes)
+
+        return [b[i] ^ b[(i + 4) % 8] ^ b[(i + 5) % 8] ^ b[(i + 6) % 8] ^ b[(i + 7) % 8] ^ (full if (0x63 >> i) & 1 else 0)
+                for i in range(8)]
+
+    @staticmethod
+    def __inverse_sub_bytes(planes: list[int], full: int) -> list[int]:
+        """
+        Substitutes all the bytes by the Inverse S-Box: inverse affine transform (constant 0x05), then inversion
+        :param planes: planes of the state
+        :param full: all ones mask (adds 1 bits of the constant)
+        :return: planes of the new state
+        """
+        s = planes
+        b = [s[(i + 2) % 8] ^ s[(i + 5) % 8] ^ s[(i + 7) % 8] ^ (full if (0x05 >> i) & 1 else 0) for i in range(8)]
+
+        return _BitslicedEngine.__inverse(b)
+
+    @staticmethod
+    def __shift_rows(planes: list[int], keep: int, moves: list[tuple[int, int, int, int]]) -> list[int]:
+        """
+        Shifts the rows of all the states
+        :param planes: planes of the state
+        :param keep: mask of the not moving bytes (the first row)
+        :param moves: masks and shifts of the other rows (see _BitsliceMasks)
+        :return: planes of the new state
+        """
+        result = []
+
+        for plane in planes:
+            shifted = plane & keep
+            for right_mask, right_shift, left_mask, left_shift in moves:
+                shifted |= ((plane & right_mask) >> right_shift) | ((plane & left_mask) << left_shift)
+            result.append(shifted)
+
+        return result
+
+    @staticmethod
+    def __rotate(plane: int, rotation: tuple[int, int, int, int]) -> int:
+        """
+        Gives every row the row below it (k rows down, cyclic) in every column of all the states
+        :param plane: the plane
+        :param rotation: masks and shifts of the rotation (see _BitsliceMasks)
+        :return: rotated plane
+        """
+        high_mask, right_shift, low_mask, left_shift = rotation
+        return ((plane & high_mask) >> right_shift) | ((plane & low_mask) << left_shift)
+
+    @staticmethod
+    def __xtime(a: list[int]) -> list[int]:
+        """
+        Multiplies all the bytes by x (2) in GF(2^8)
+        :param a: planes of the bytes
+        :return: planes of the products
+        """
+        return [a[7], a[0] ^ a[7], a[1], a[2] ^ a[7], a[3] ^ a[7], a[4], a[5], a[6]]
+
+    @staticmethod
+    def __mix_columns(planes: list[int], masks: _BitsliceMasks) -> list[int]:
+        """
+        Mixes the columns of all the states: `2 * (a[r] ^ a[r + 1]) ^ a[r + 1] ^ a[r + 2] ^ a[r + 3]`
+        :param planes: planes of the state
+        :param masks: masks of the batch
+        :return: planes of the new state
+        """
+        rotate = _BitslicedEngine.__rotate
+        rotated = [rotate(plane, masks.rotate_1) for plane in planes]
+        sums = [plane ^ rotated_plane for plane, rotated_plane in zip(planes, rotated)]
+        doubled = _BitslicedEngine.__xtime(sums)
+
+        return [doubled[i] ^ rotated[i] ^ rotate(sums[i], masks.rotate_2) for i in range(8)]
+
+    @staticmethod
+    def __inverse_mix_columns(planes: list[int], masks: _BitsliceMasks) -> list[int]:
+        """
+        Mixes the columns of all the states in reverse: `a[r] ^= 4 * (a[r] ^ a[r + 2])`, then MixColumns
+        :param planes: planes of the state
+        :param masks: masks of the batch
+        :return: planes of the new state
+        """
+        rotate, xtime = _BitslicedEngine.__rotate, _BitslicedEngine.__xtime
+        quadrupled = xtime(xtime([plane ^ rotate(plane, masks.rotate_2) for plane in planes]))
+
+        return _BitslicedEngine.__mix_columns([plane ^ quad for plane, quad in zip(planes, quadrupled)], masks)
+
+    @staticmethod
+    def __process_into(data: memoryview, output: memoryview, round_keys: bytes, encrypt: bool) -> None:
+        """
+        Packs the blocks into the planes, runs the cipher on all of them and unpacks the result into the output
+        :param data: data to process, length must be a multiple of 16
+        :param output: [reference] buffer to write the result to (same length as the data)
+        :param round_keys: The expanded key (patterns of expand_key)
+        :param encrypt: True - encrypt | False - decrypt
+        """
+        if not len(data):
+            return
+
+        groups_count = _BitslicedEngine.PLANES_COUNT
+        blocks_count = len(data) // _BLOCK_SIZE
+        group_size = -(-blocks_count // groups_count)
+        group_length = _BLOCK_SIZE * group_size
+
+        masks = _bitslice_masks(group_size)
+        ones, full = masks.ones, masks.full
+
+        # Pack - group g of blocks into bit g of every byte of the planes
+        padded = bytes(data) + bytes(groups_count * group_length - len(data))
+        groups = [int.from_bytes(padded[g * group_length:(g + 1) * group_length], 'little') for g in range(groups_count)]
+        planes = [0] * 8
+        for bit in range(8):
+            for g, group in enumerate(groups):
+                planes[bit] |= ((group >> bit) & ones) << g
+
+        def round_key(i: int) -> list[int]:
+            start = 8 * _BLOCK_SIZE * i
+            return [int.from_bytes(round_keys[start + _BLOCK_SIZE * bit:start + _BLOCK_SIZE * (bit + 1)], 'little') *
+                    masks.repeat for bit in range(8)]
+
+        def add_round_key(i: int) -> None:
+            for bit, key in enumerate(round_key(i)):
+                planes[bit] ^= key
+
+        if encrypt:
+            add_round_key(0)
+
+            for i in range(1, _ROUNDS_COUNT + 1):
+                planes = _BitslicedEngine.__sub_bytes(planes, full)
+                planes = _BitslicedEngine.__shift_rows(planes, masks.first_row, masks.shift_rows)
+                if i != _ROUNDS_COUNT:
+                    planes = _BitslicedEngine.__mix_columns(planes, masks)
+                add_round_key(i)
+        else:
+            add_round_key(_ROUNDS_COUNT)
+
+            for i in range(_ROUNDS_COUNT - 1, -1, -1):
+                planes = _BitslicedEngine.__shift_rows(planes, masks.first_row, masks.inverse_shift_rows)
+                planes = _BitslicedEngine.__inverse_sub_bytes(planes, full)
+                add_round_key(i)
+                if i:
+                    planes = _BitslicedEngine.__inverse_mix_columns(planes, masks)
+
+        # Unpack
+        groups = [0] * groups_count
+        for bit, plane in enumerate(planes):
+            for g in range(groups_count):
+                groups[g] |= ((plane >> g) & ones) << bit
+
+        output[:len(data)] = b''.join(group.to_bytes(group_length, 'little') for group in groups)[:len(data)]
+
+    @staticmethod
+    def encrypt_into(data: memoryview, output: memoryview, round_keys: bytes) -> None:
+        """
+        Encrypts all the blocks of the data at once
+        :param data: data to encrypt, length must be a multiple of 16
+        :param output: [reference] buffer to write the encrypted data to (same length as the data)
+        :param round_keys: The expanded key
+        """
+        _BitslicedEngine.__process_into(data, output, round_keys, encrypt=True)
+
+    @staticmethod
+    def decrypt_into(data: memoryview, output: memoryview, round_keys: bytes) -> None:
+        """
+        Decrypts all the blocks of the data at once
+        :param data: data to decrypt, length must be a multiple of 16
+        :param output: [reference] buffer to write the decrypted data to (same length as the data)
+        :param round_keys: The expanded key
+        """
+        _BitslicedEngine.__process_into(data, output, round_keys, encrypt=False)
+
+
+# Key schedule classes
+class _KeySchedule:
+    """
+    Expanded session key: the round keys in the standard byte layout and in the format of the engine.
+    Immutable - one instance is shared by all the aes instances (and threads) with the same key
+    """
+
+    __slots__ = ('__expanded_key', '__round_keys')
+
+    def __init__(self, key: bytes, engine):
+        """
+        Expands the session key
+        :param key: 16 bytes of the session key
+        :param engine: engine class to prepare round keys for
+        """
+        self.__expanded_key: bytes = _expand_key(key)
+        self.__round_keys = engine.expand_key(key)
+
+    def get_expanded_key(self) -> bytes:
+        """
+        Getter for the round keys in the standard byte layout
+        :return: 176 bytes - 11 round keys by 16 bytes
+        """
+        return self.__expanded_key
+
+    def get_round_keys(self):
+        """
+        Getter for the round keys in the format of the engine
+        :return: round keys of the engine
         """
-        blocks = aes.__divide_into_blocks(encrypted_text)
-        decrypted_list = []
+        return self.__round_keys
+
+
+class _KeyScheduleCache:
+    """
+    Bounded LRU cache of the key schedules, keyed by the derived 128-bit key (and the engine).
+    Thread safe, counts hits and misses
+    """
+
+    def __init__(self, max_size: int):
+        """
+        Initializes an empty cache
+        :param max_size: maximum count of the cached schedules
+        """
+        self.__max_size = max_size
+        self.__schedules: OrderedDict[tuple[bytes, str], _KeySchedule] = OrderedDict()
+        self.__mutex = threading.Lock()
+
+        self.__hits = 0
+        self.__misses = 0
+
+    def get(self, key: bytes, engine_name: str, engine) -> _KeySchedule:
+        """
+        Gives the schedule of the key - from the cache, or expands the key and caches it
+        :param key: 16 bytes of the session key
+        :param engine_name: name of the engine
+        :param engine: engine class
+        :return: the key schedule
+        """
+        cache_key = (key, engine_name)
+
+        with self.__mutex:
+            schedule = self.__schedules.get(cache_key)
+
+            if schedule is not None:
+                self.__schedules.move_to_end(cache_key)
+                self.__hits += 1
+                return schedule
+
+            self.__misses += 1
+
+        # Expand out of the lock - in the worst case two threads expand the same key
+        schedule = _KeySchedule(key, engine)
+
+        with self.__mutex:
+            self.__schedules[cache_key] = schedule
+            self.__schedules.move_to_end(cache_key)
 
-        for block in blocks:
-            decrypted_list.append(self.__decrypt_block(_Matrix(block)).get_string())
+            while len(self.__schedules) > self.__max_size:
+                self.__schedules.popitem(last=False)
 
-        while decrypted_list[-1][-1] == chr(0):
-            decrypted_list[-1] = decrypted_list[-1][:-1]
+        return schedule
+
+    def set_max_size(self, max_size: int) -> None:
+        """
+        Changes the maximum count of the cached schedules (drops the least recently used if needed)
+        :param max_size: new maximum count of the cached schedules
+        """
+        if max_size < 0:
+            raise ValueError("Cache size must be non negative")
+
+        with self.__mutex:
+            self.__max_size = max_size
+
+            while len(self.__schedules) > self.__max_size:
+                self.__schedules.popitem(last=False)
+
+    def clear(self) -> None:
+        """
+        Drops all the cached schedules and resets the counters
+        """
+        with self.__mutex:
+            self.__schedules.clear()
+            self.__hits = self.__misses = 0
+
+    def get_stats(self) -> dict[str, int]:
+        """
+        Gives the counters of the cache
+        :return: dict with hits, misses, size and max_size of the cache
+        """
+        with self.__mutex:
+            return {
+                'hits': self.__hits,
+                'misses': self.__misses,
+                'size': len(self.__schedules),
+                'max_size': self.__max_size
+            }
+
+
+# Main AES class
+class aes:
+    """
+    Advanced Encryption Standard (AES) implementation.
+
+    Attributes:
+    - ENGINES (dict): The available block engines by name. The default is the table driven engine
+    - KEY_CACHE_SIZE (int): Default maximum count of the cached key schedules (shared by all the instances)
+    - BITSLICE_BATCH_SIZE (int): Minimal count of the blocks of one key for the bitsliced batch (without NumPy)
+    """
+
+    __slots__ = ('__engine_name', '__engine', '__round_keys', '__expanded_key')
+
+    # Block engines by their names
+    ENGINES = {
+        'table': _TableEngine,
+        'matrix': _MatrixEngine,
+        'bitslice': _BitslicedEngine
+    }
+
+    # Vectorized engine - only with NumPy
+    if np is not None:
+        ENGINES['numpy'] = _NumpyEngine
+
+    # Reference engine (the engine used by default is chosen by the crypto backend)
+    DEFAULT_ENGINE = 'table'
+
+    # Without NumPy, a batch of one key from this size runs on the bitsliced engine (see benchmarks/bench_aes_bitslice.py)
+    BITSLICE_BATCH_SIZE = 64
+
+    # Key schedules shared by all the instances of the process
+    KEY_CACHE_SIZE = 1024
+    __KEY_CACHE = _KeyScheduleCache(KEY_CACHE_SIZE)
+
+    # Constructor
+    def __init__(self, dh_key: int, engine: str = None) -> None:
+        """
+        Initializes the AES object with a session key (based on Diffie-Hellman key). Also initialize round keys
+        :param dh_key: he Diffie-Hellman key used to derive the AES key.
+        :param engine: name of the block engine to use (see aes.ENGINES), None - the engine of the crypto backend
+        """
+        dh_bytes = dh_key.to_bytes(256, byteorder='big')
+        self.__set_key(md5(dh_bytes).digest(), engine)
+
+    @staticmethod
+    def from_session_key(session_key: bytes, engine: str = None) -> 'aes':
+        """
+        Creates the AES object from the derived 16 bytes session key (for example, in the worker processes)
+        :param session_key: the AES-128 key
+        :param engine: name of the block engine to use (see aes.ENGINES), None - the engine of the crypto backend
+        :return: new aes instance
+        """
+        cipher = aes.__new__(aes)
+        cipher.__set_key(session_key, engine)
+
+        return cipher
+
+    def __set_key(self, session_key: bytes, engine: str) -> None:
+        """
+        Sets the key and the engine of the instance (the key schedule is taken from the shared cache)
+        :param session_key: the AES-128 key
+        :param engine: name of the block engine to use (see aes.ENGINES), None - the engine of the crypto backend
+        """
+        if engine is None:
+            engine = backend.get().AES_ENGINE
+
+        if engine not in aes.ENGINES:
+            raise ValueError(f"Engine {engine} is not supported")
+
+        schedule = aes.__KEY_CACHE.get(session_key, engine, aes.ENGINES[engine])
+
+        self.__engine_name = engine
+        self.__engine = aes.ENGINES[engine]
+        self.__round_keys = schedule.get_round_keys()
+        self.__expanded_key = schedule.get_expanded_key()
+
+    def get_session_key(self) -> bytes:
+        """
+        Getter for the AES-128 key (the first 16 bytes of the expanded key)
+        :return: the 16 bytes session key
+        """
+        return self.__expanded_key[:_BLOCK_SIZE]
+
+    def get_engine_name(self) -> str:
+        """
+        Getter for the name of the block engine of the instance
+        :return: name of the engine (key of aes.ENGINES)
+        """
+        return self.__engine_name
+
+    @staticmethod
+    def get_key_cache_stats() -> dict[str, int]:
+        """
+        Gives the counters of the key schedule cache (shared by all the instances of the process)
+        :return: dict with hits, misses, size and max_size of the cache
+        """
+        return aes.__KEY_CACHE.get_stats()
+
+    @staticmethod
+    def set_key_cache_size(max_size: int) -> None:
+        """
+        Changes the maximum count of the cached key schedules. 0 disables the cache
+        :param max_size: new maximum count of the cached key schedules
+        """
+        aes.__KEY_CACHE.set_max_size(max_size)
+
+    @staticmethod
+    def clear_key_cache() -> None:
+        """
+        Drops all the cached key schedules and resets the counters
+        """
+        aes.__KEY_CACHE.clear()
+
+    @staticmethod
+    def __to_bytes(text: str) -> bytes:
+        """
+        Converts the text to bytes, every character is one byte (character code modulo 256)
+        :param text: the text to convert
+        :return: bytes of the text
+        """
+        try:
+            return text.encode('latin-1')
+
+        except UnicodeEncodeError:
+            return bytes(ord(ch) % 256 for ch in text)
+
+    @staticmethod
+    def __padded_length(length: int) -> int:
+        """
+        Calculates the length of the data padded with zero bytes up to the multiple of the block size (16 bytes)
+        :param length: length of the data
+        :return: length of the padded data
+        """
+        return length + (-length % _BLOCK_SIZE)
+
+    def __process_into(self, data: bytes | bytearray | memoryview, output: bytearray | memoryview, process) -> int:
+        """
+        Runs the engine function over the data, the last incomplete block is padded with zero bytes
+        :param data: the input data
+        :param output: [reference] buffer to write the result to
+        :param process: engine function (encrypt_into or decrypt_into)
+        :return: count of bytes written to the output
+        """
+        data = memoryview(data).cast('B')
+        output = memoryview(output).cast('B')
+
+        padded_length = aes.__padded_length(len(data))
+        if len(output) < padded_length:
+            raise ValueError(f"Output buffer is too small: {len(output)} < {padded_length}")
+
+        full_length = len(data) - len(data) % _BLOCK_SIZE
+        process(data[:full_length], output[:full_length], self.__round_keys)
+
+        if full_length != padded_length:
+            last_block = bytes(data[full_length:]) + bytes(padded_length - len(data))
+            process(memoryview(last_block), output[full_length:padded_length], self.__round_keys)
+
+        return padded_length
+
+    def encrypt_into(self, data: bytes | bytearray | memoryview, output: bytearray | memoryview) -> int:
+        """
+        Encrypts the data using AES-128 and writes the result into the caller's buffer
+        :param data: The data to be encrypted
+        :param output: [reference] buffer to write the encrypted data to. Must hold the data padded to 16 bytes
+        :return: count of the encrypted bytes written to the output
+        """
+        return self.__process_into(data, output, self.__engine.encrypt_into)
+
+    def decrypt_into(self, data: bytes | bytearray | memoryview, output: bytearray | memoryview) -> int:
+        """
+        Decrypts the data using AES-128 and writes the result into the caller's buffer (trailing zero bytes are removed)
+        :param data: The encrypted data
+        :param output: [reference] buffer to write the decrypted data to. Must hold the data padded to 16 bytes
+        :return: count of the decrypted bytes in the output
+        """
+        length = self.__process_into(data, output, self.__engine.decrypt_into)
+
+        while length and output[length - 1] == 0:
+            length -= 1
+
+        return length
+
+    def encrypt_bytes(self, data: bytes | bytearray | memoryview) -> bytes:
+        """
+        Encrypts the data using AES-128
+        :param data: The data to be encrypted
+        :return: The encrypted data
+        """
+        output = bytearray(aes.__padded_length(len(memoryview(data).cast('B'))))
+        self.encrypt_into(data, output)
+
+        return bytes(output)
+
+    def decrypt_bytes(self, data: bytes | bytearray | memoryview) -> bytes:
+        """
+        Decrypts the data using AES-128
+        :param data: The encrypted data
+        :return: The decrypted data
+        """
+        output = bytearray(aes.__padded_length(len(memoryview(data).cast('B'))))
+        length = self.decrypt_into(data, output)
+
+        return bytes(output[:length])
+
+    def encrypt(self, plain_text: str) -> str:
+        """
+        Encrypts the input text using AES-128
+        :param plain_text: The text to be encrypted
+        :return: The encrypted text (every character is one byte)
+        """
+        return self.encrypt_bytes(aes.__to_bytes(plain_text)).decode('latin-1')
+
+    def decrypt(self, encrypted_text: str) -> str:
+        """
+        Decrypts the cipher list into the original text using AES-128
+        :param encrypted_text: encrypted data
+        :return: The decrypted original text
+        """
+        return self.decrypt_bytes(aes.__to_bytes(encrypted_text)).decode('latin-1')
+
+    @staticmethod
+    def __process_batch(blocks, ciphers, encrypt: bool):
+        """
+        Runs the cipher over many independent blocks at once (see encrypt_batch and decrypt_batch)
+        :param blocks: (N, 16) uint8 array, or N blocks of 16 bytes
+        :param ciphers: one aes instance for all the blocks, or N aes instances - one per block
+        :param encrypt: True - encrypt the blocks | False - decrypt them
+        :return: the processed blocks
+        """
+        single_cipher = isinstance(ciphers, aes)
+
+        # Fallback - block by block on the pure Python engine, many blocks of one key at once on the bitsliced engine
+        if np is None:
+            blocks = [bytes(block) for block in blocks]
+
+            if single_cipher and len(blocks) >= aes.BITSLICE_BATCH_SIZE:
+                data = bytearray(b''.join(blocks))
+                bitsliced = aes.from_session_key(ciphers.get_session_key(), 'bitslice')
+
+                process = _BitslicedEngine.encrypt_into if encrypt else _BitslicedEngine.decrypt_into
+                process(memoryview(data), memoryview(data), bitsliced.__round_keys)
+
+                return [bytes(data[i:i + _BLOCK_SIZE]) for i in range(0, len(data), _BLOCK_SIZE)]
+
+            ciphers = [ciphers] * len(blocks) if single_cipher else ciphers
+
+            if len(ciphers) != len(blocks):
+                raise ValueError("Count of the ciphers must be equal to the count of the blocks")
+
+            outputs = []
+            for block, cipher in zip(blocks, ciphers):
+                output = bytearray(_BLOCK_SIZE)
+                (cipher.encrypt_into if encrypt else cipher.decrypt_into)(block, output)
+                outputs.append(bytes(output))
+
+            return outputs
+
+        if not isinstance(blocks, np.ndarray):
+            blocks = np.frombuffer(b''.join(bytes(block) for block in blocks), dtype=np.uint8)
+        blocks = blocks.reshape(-1, _BLOCK_SIZE)
+
+        if single_cipher:
+            expanded_keys = ciphers.__expanded_key
+        elif len(ciphers) == len(blocks):
+            expanded_keys = b''.join(cipher.__expanded_key for cipher in ciphers)
+        else:
+            raise ValueError("Count of the ciphers must be equal to the count of the blocks")
+
+        round_keys = np.frombuffer(expanded_keys, dtype=np.uint8).reshape(-1, _ROUNDS_COUNT + 1, _BLOCK_SIZE)
+        if single_cipher:
+            round_keys = round_keys[0]
+
+        process = _NumpyEngine.encrypt_blocks if encrypt else _NumpyEngine.decrypt_blocks
+        return process(blocks, round_keys)
+
+    @staticmethod
+    def encrypt_batch(blocks, ciphers):
+        """
+        Encrypts many independent blocks in one call. Blocks of different circuits (different keys) can share a batch.
+        Vectorized with NumPy, block by block on the pure Python engine without it
+        :param blocks: (N, 16) uint8 array, or N blocks of 16 bytes
+        :param ciphers: one aes instance for all the blocks, or N aes instances - one per block
+        :return: (N, 16) uint8 array of the encrypted blocks (list of N blocks of 16 bytes without NumPy)
+        """
+        return aes.__process_batch(blocks, ciphers, encrypt=True)
+
+    @staticmethod
+    def decrypt_batch(blocks, ciphers):
+        """
+        Decrypts many independent blocks in one call. Blocks of different circuits (different keys) can share a batch.
+        Vectorized with NumPy, block by block on the pure Python engine without it
+        :param blocks: (N, 16) uint8 array, or N blocks of 16 bytes
+        :param ciphers: one aes instance for all the blocks, or N aes instances - one per block
+        :return: (N, 16) uint8 array of the decrypted blocks (list of N blocks of 16 bytes without NumPy)
+        """
+        return aes.__process_batch(blocks, ciphers, encrypt=False)
+
+    def ctr(self, nonce: int = 0) -> 'aes_ctr':
+        """
+        Creates counter mode (CTR) stream cipher over the current key
+        :param nonce: nonce of the stream (for example, the circuit direction - aes_ctr.FORWARD or aes_ctr.BACKWARD)
+        :return: new stream cipher, positioned at the start of the keystream
+        """
+        return aes_ctr(self, nonce)
+
+    def encryptor(self) -> 'aes_encryptor':
+        """
+        Creates incremental encryptor over the current key - for data that comes in chunks
+        :return: new encryptor
+        """
+        return aes_encryptor(self)
+
+    def decryptor(self) -> 'aes_decryptor':
+        """
+        Creates incremental decryptor over the current key - for data that comes in chunks
+        :return: new decryptor
+        """
+        return aes_decryptor(self)
+
+    def encrypt_stream(self, chunks: Iterable[bytes | bytearray | memoryview]) -> Iterator[bytes]:
+        """
+        Encrypts the chunks one by one (never holds more than one chunk). Joined result is `encrypt_bytes` of the joined
+        chunks
+        :param chunks: chunks of the plain data (for example, read from a socket or a file)
+        :return: generator of the encrypted chunks (whole blocks, the last one is padded)
+        """
+        encryptor = self.encryptor()
+
+        for chunk in chunks:
+            encrypted = encryptor.update(chunk)
+            if encrypted:
+                yield encrypted
+
+        encrypted = encryptor.finalize()
+        if encrypted:
+            yield encrypted
+
+    def decrypt_stream(self, chunks: Iterable[bytes | bytearray | memoryview]) -> Iterator[bytes]:
+        """
+        Decrypts the chunks one by one (never holds more than one chunk). Joined result is `decrypt_bytes` of the joined
+        chunks
+        :param chunks: chunks of the encrypted data
+        :return: generator of the decrypted chunks
+        """
+        decryptor = self.decryptor()
+
+        for chunk in chunks:
+            decrypted = decryptor.update(chunk)
+            if decrypted:
+                yield decrypted
+
+        decrypted = decryptor.finalize()
+        if decrypted:
+            yield decrypted
+
+
+# Incremental classes
+class aes_encryptor:
+    """
+    Incremental encryption of data that comes in chunks of any size: every update encrypts the whole blocks and keeps
+    the rest (less than a block) for the next one, finalize pads the rest. Memory is bounded by the chunk size
+    """
+
+    __slots__ = ('__cipher', '__pending', '__finalized')
+
+    def __init__(self, cipher: aes):
+        """
+        Initializes the encryptor
+        :param cipher: aes instance (the key)
+        """
+        self.__cipher = cipher
+        self.__pending = bytearray()        # Rest of the data, not a whole block yet
+        self.__finalized = False
+
+    def update(self, data: bytes | bytearray | memoryview) -> bytes:
+        """
+        Encrypts the next chunk
+        :param data: the next chunk of the plain data
+        :return: the encrypted whole blocks (can be empty)
+        """
+        if self.__finalized:
+            raise ValueError("Encryptor is already finalized")
+
+        data = memoryview(data).cast('B')
+        buffer = memoryview(self.__pending + data) if self.__pending else data
+        length = len(buffer) - len(buffer) % _BLOCK_SIZE
+
+        output = bytearray(length)
+        if length:
+            self.__cipher.encrypt_into(buffer[:length], output)
+
+        self.__pending = bytearray(buffer[length:])
+        return bytes(output)
+
+    def finalize(self) -> bytes:
+        """
+        Encrypts the rest of the data (padded with zero bytes to a whole block). The encryptor can't be used after it
+        :return: the last encrypted block (empty if there is no rest)
+        """
+        if self.__finalized:
+            raise ValueError("Encryptor is already finalized")
+
+        self.__finalized = True
+        pending, self.__pending = self.__pending, bytearray()
+
+        return self.__cipher.encrypt_bytes(pending) if pending else b''
+
+
+class aes_decryptor:
+    """
+    Incremental decryption of data that comes in chunks of any size, the result is the same as of aes.decrypt_bytes.
+    Zero bytes at the end of a chunk are held back (as a count) until non zero data follows - the trailing zero bytes
+    of the whole data are the padding and are removed
+    """
+
+    __slots__ = ('__cipher', '__pending', '__zeros', '__finalized')
+
+    def __init__(self, cipher: aes):
+        """
+        Initializes the decryptor
+        :param cipher: aes instance (the key)
+        """
+        self.__cipher = cipher
+        self.__pending = bytearray()        # Rest of the data, not a whole block yet
+        self.__zeros = 0                    # Count of the held back zero bytes
+        self.__finalized = False
+
+    def __release(self, decrypted: bytes | bytearray) -> bytes:
+        """
+        Gives the decrypted data with the held back zero bytes, holds back the zero bytes at its end
+        :param decrypted: the decrypted data
+        :return: the data that is known not to be the padding
+        """
+        stripped = decrypted.rstrip(b'\x00')
+
+        if not stripped:
+            self.__zeros += len(decrypted)
+            return b''
+
+        result = bytes(self.__zeros) + stripped if self.__zeros else bytes(stripped)
+        self.__zeros = len(decrypted) - len(stripped)
+
+        return result
+
+    def update(self, data: bytes | bytearray | memoryview) -> bytes:
+        """
+        Decrypts the next chunk
+        :param data: the next chunk of the encrypted data
+        :return: the decrypted data (can be empty)
+        """
+        if self.__finalized:
+            raise ValueError("Decryptor is already finalized")
+
+        data = memoryview(data).cast('B')
+        buffer = memoryview(self.__pending + data) if self.__pending else data
+        length = len(buffer) - len(buffer) % _BLOCK_SIZE
+
+        # The output keeps all the decrypted bytes, the zero bytes are handled by __release
+        output = bytearray(length)
+        if length:
+            self.__cipher.decrypt_into(buffer[:length], output)
+
+        self.__pending = bytearray(buffer[length:])
+        return self.__release(output)
+
+    def finalize(self) -> bytes:
+        """
+        Decrypts the rest of the data (not a whole block). The decryptor can't be used after it
+        :return: the last decrypted data (can be empty)
+        """
+        if self.__finalized:
+            raise ValueError("Decryptor is already finalized")
+
+        self.__finalized = True
+        pending, self.__pending = self.__pending, bytearray()
+
+        if not pending:
+            return b''
+
+        decrypted = self.__cipher.decrypt_bytes(pending)
+        return bytes(self.__zeros) + decrypted if decrypted else b''
+
+
+# Counter mode classes
+class aes_ctr:
+    """
+    Counter mode (CTR) stream cipher built on the aes key schedule.
+    Keystream block i is the encryption of the counter block (8 bytes nonce | 8 bytes i), the data is XORed with the
+    keystream - no padding, output length is always the input length. Every byte offset can be reached by seek,
+    and the keystream can be precomputed ahead while the connection is idle
+    """
+
+    __slots__ = ('__cipher', '__nonce', '__position', '__keystream', '__keystream_start')
+
+    # Nonces of the circuit directions: from the circuit's client to the exit, and back
+    FORWARD = 0
+    BACKWARD = 1
+
+    # Default size of the keystream precomputed ahead (bytes)
+    PRECOMPUTE_SIZE = 1024
+
+    # Counter block size of the nonce and of the block index (bytes)
+    __COUNTER_SIZE = 8
+
+    def __init__(self, cipher: aes, nonce: int = FORWARD):
+        """
+        Initializes the stream cipher at the start of the keystream
+        :param cipher: aes instance (the key) to generate keystream with
+        :param nonce: nonce of the stream, different for every stream of the same key
+        """
+        self.__cipher = cipher
+        self.__nonce = nonce.to_bytes(aes_ctr.__COUNTER_SIZE, 'big')
+
+        self.__position = 0
+        self.__keystream = bytearray()      # Buffered keystream
+        self.__keystream_start = 0          # Offset of the first buffered keystream byte (multiple of 16)
+
+    def __generate(self, end: int) -> None:
+        """
+        Extends the buffered keystream up to the given offset (at least)
+        :param end: offset to generate keystream up to
+        """
+        first_block = (self.__keystream_start + len(self.__keystream)) // _BLOCK_SIZE
+        last_block = (end + _BLOCK_SIZE - 1) // _BLOCK_SIZE
+
+        if last_block <= first_block:
+            return
+
+        counters = b''.join(self.__nonce + i.to_bytes(aes_ctr.__COUNTER_SIZE, 'big')
+                            for i in range(first_block, last_block))
+
+        keystream = bytearray(len(counters))
+        self.__cipher.encrypt_into(counters, keystream)
+        self.__keystream += keystream
+
+    def __take(self, length: int) -> bytearray:
+        """
+        Gives the keystream from the current position and moves the position after it
+        :param length: count of the keystream bytes
+        :return: the keystream bytes
+        """
+        buffered_end = self.__keystream_start + len(self.__keystream)
+
+        # Position is out of the buffer (seek) - restart buffer from the block of the position
+        if not self.__keystream_start <= self.__position <= buffered_end:
+            self.__keystream_start = self.__position - self.__position % _BLOCK_SIZE
+            self.__keystream = bytearray()
+
+        end = self.__position + length
+        self.__generate(end)
+
+        offset = self.__position - self.__keystream_start
+        keystream = self.__keystream[offset:offset + length]
+
+        # Drop the whole used blocks
+        used = (end - self.__keystream_start) // _BLOCK_SIZE * _BLOCK_SIZE
+        del self.__keystream[:used]
+        self.__keystream_start += used
+
+        self.__position = end
+        return keystream
+
+    def get_cipher(self) -> aes:
+        """
+        Getter for the aes instance (the key) of the stream
+        :return: aes instance of the stream
+        """
+        return self.__cipher
+
+    def get_nonce(self) -> int:
+        """
+        Getter for the nonce of the stream
+        :return: nonce of the stream
+        """
+        return int.from_bytes(self.__nonce, 'big')
+
+    def keystream(self, length: int) -> bytearray:
+        """
+        Gives the next keystream bytes and moves the position after them (to XOR several streams in one pass)
+        :param length: count of the keystream bytes
+        :return: the keystream bytes
+        """
+        return self.__take(length)
+
+    def update(self, data: bytes | bytearray | memoryview) -> bytes:
+        """
+        Encrypts (or decrypts - it's the same operation) the next chunk of the stream. Chunks can be of any length
+        :param data: the next chunk of the stream
+        :return: the processed chunk (same length)
+        """
+        data = memoryview(data).cast('B')
+        length = len(data)
+
+        if not length:
+            return b''
+
+        keystream = self.__take(length)
+        return (int.from_bytes(data, 'big') ^ int.from_bytes(keystream, 'big')).to_bytes(length, 'big')
+
+    def update_into(self, data: bytes | bytearray | memoryview, output: bytearray | memoryview) -> int:
+        """
+        Encrypts (or decrypts) the next chunk of the stream into the caller's buffer
+        :param data: the next chunk of the stream
+        :param output: [reference] buffer to write the processed chunk to
+        :return: count of bytes written to the output (the chunk length)
+        """
+        processed = self.update(data)
+        memoryview(output).cast('B')[:len(processed)] = processed
+
+        return len(processed)
+
+    def seek(self, offset: int) -> None:
+        """
+        Moves the stream position to the given offset (random access)
+        :param offset: byte offset in the stream
+        """
+        if offset < 0:
+            raise ValueError("Offset must be non negative")
+
+        self.__position = offset
+
+    def tell(self) -> int:
+        """
+        Gives the current stream position
+        :return: byte offset in the stream
+        """
+        return self.__position
+
+    def precompute(self, length: int = PRECOMPUTE_SIZE) -> None:
+        """
+        Generates keystream ahead of the current position, so next updates just XOR
+        :param length: count of the keystream bytes to have ready after the current position
+        """
+        buffered_end = self.__keystream_start + len(self.__keystream)
+
+        if not self.__keystream_start <= self.__position <= buffered_end:
+            self.__keystream_start = self.__position - self.__position % _BLOCK_SIZE
+            self.__keystream = bytearray()
+
+        self.__generate(self.__position + length)
+
+
+class aes_ctr_session:
+    """
+    Onion layer of one circuit hop: a CTR stream for every circuit direction over the session key.
+    Has the same bytes API as aes, so it can be used in place of it - but output length is the input length
+    """
+
+    __slots__ = ('__send_stream', '__receive_stream')
+
+    def __init__(self, dh_key: int, initiator: bool):
+        """
+        Initializes both streams of the hop
+        :param dh_key: the Diffie-Hellman key of the hop
+        :param initiator: True - the circuit's client side | False - the relay (or destination) side
+        """
+        cipher = aes(dh_key)
+        forward, backward = cipher.ctr(aes_ctr.FORWARD), cipher.ctr(aes_ctr.BACKWARD)
+
+        self.__send_stream, self.__receive_stream = (forward, backward) if initiator else (backward, forward)
+
+    def encrypt_bytes(self, data: bytes | bytearray | memoryview) -> bytes:
+        """
+        Encrypts outgoing data
+        :param data: The data to be encrypted
+        :return: The encrypted data
+        """
+        return self.__send_stream.update(data)
+
+    def decrypt_bytes(self, data: bytes | bytearray | memoryview) -> bytes:
+        """
+        Decrypts incoming data
+        :param data: The encrypted data
+        :return: The decrypted data
+        """
+        return self.__receive_stream.update(data)
+
+    def send_keystream(self, length: int) -> bytearray:
+        """
+        Gives the next keystream bytes of the outgoing direction
+        :param length: count of the keystream bytes
+        :return: the keystream bytes
+        """
+        return self.__send_stream.keystream(length)
+
+    def receive_keystream(self, length: int) -> bytearray:
+        """
+        Gives the next keystream bytes of the incoming direction
+        :param length: count of the keystream bytes
+        :return: the keystream bytes
+        """
+        return self.__receive_stream.keystream(length)
+
+    def encrypt_into(self, data: bytes | bytearray | memoryview, output: bytearray | memoryview) -> int:
+        """
+        Encrypts outgoing data into the caller's buffer
+        :param data: The data to be encrypted
+        :param output: [reference] buffer to write the encrypted data to
+        :return: count of the encrypted bytes written to the output
+        """
+        return self.__send_stream.update_into(data, output)
+
+    def decrypt_into(self, data: bytes | bytearray | memoryview, output: bytearray | memoryview) -> int:
+        """
+        Decrypts incoming data into the caller's buffer
+        :param data: The encrypted data
+        :param output: [reference] buffer to write the decrypted data to
+        :return: count of the decrypted bytes written to the output
+        """
+        return self.__receive_stream.update_into(data, output)
+
+    def precompute(self, length: int = aes_ctr.PRECOMPUTE_SIZE) -> None:
+        """
+        Generates keystream ahead in both directions
+        :param length: count of the keystream bytes to have ready in every direction
+        """
+        self.__send_stream.precompute(length)
+        self.__receive_stream.precompute(length)
+
+
+# Process pool functions (run in the worker processes)
+
+# Shared memory block attached by the worker: [name, block] (one at a time - the pool reuses a single block)
+_worker_memory: list = [None, None]
+
+
+def _attach_memory(name: str) -> memoryview:
+    """
+    Attaches the worker to the shared memory block of the pool (once per block)
+    :param name: name of the shared memory block
+    :return: view of the block
+    """
+    if _worker_memory[0] != name:
+        if _worker_memory[1] is not None:
+            _worker_memory[1].close()
+
+        _worker_memory[0], _worker_memory[1] = name, SharedMemory(name=name)
+
+    return _worker_memory[1].buf
+
+
+def _process_chunk(name: str, start: int, end: int, session_key: bytes, engine: str, mode: str,
+                   nonce: int = 0, position: int = 0) -> None:
+    """
+    Processes one chunk of the shared memory block in place
+    :param name: name of the shared memory block
+    :param start: offset of the chunk in the block
+    :param end: offset of the chunk end in the block
+    :param session_key: the AES-128 key (the key schedule is cached by the worker, so it's expanded once per worker)
+    :param engine: name of the block engine
+    :param mode: 'encrypt' or 'decrypt' (independent blocks), or 'ctr' (counter mode stream)
+    :param nonce: nonce of the stream (ctr mode)
+    :param position: stream position of the block start (ctr mode)
+    """
+    memory = _attach_memory(name)
+    chunk = memory[start:end]
+    cipher = aes.from_session_key(session_key, engine)
+
+    try:
+        # The chunk is whole blocks, so nothing is padded
+        if mode == 'encrypt':
+            cipher.encrypt_into(chunk, chunk)
+
+        elif mode == 'decrypt':
+            cipher.decrypt_into(chunk, chunk)
+
+        else:
+            stream = cipher.ctr(nonce)
+            stream.seek(position + start)
+            stream.update_into(chunk, chunk)
+
+    finally:
+        chunk.release()
+
+
+# Process pool class
+class aes_pool:
+    """
+    Persistent process pool that processes large buffers on all the cores (the GIL keeps the aes to one core).
+    Buffers above the threshold are split to chunks of whole blocks, the chunks are passed to the workers through one
+    shared memory block (not pickled), and only the 16 bytes key goes with every chunk - the key schedule is expanded
+    once per worker by its key cache. Only modes with independent blocks can be split: ECB and CTR
+    """
+
+    # Default minimal size of the buffer to process in parallel (bytes)
+    PARALLEL_THRESHOLD = 256 * 1024
+
+    # Default minimal size of the chunk of one worker task (bytes)
+    CHUNK_SIZE = 64 * 1024
+
+    def __init__(self, workers: int = None, threshold: int = PARALLEL_THRESHOLD, chunk_size: int = CHUNK_SIZE):
+        """
+        Constructor of the pool. Worker processes are started on the first large buffer
+        :param workers: count of the worker processes (None - count of the cores)
+        :param threshold: minimal size of the buffer to process in parallel, smaller buffers are processed in place
+        :param chunk_size: minimal size of the chunk of one worker task
+        """
+        if chunk_size <= 0 or chunk_size % _BLOCK_SIZE:
+            raise ValueError("Chunk size must be a positive multiple of 16")
+
+        self.__workers = workers or os.cpu_count() or 1
+        self.__threshold = threshold
+        self.__chunk_size = chunk_size
+
+        self.__executor: ProcessPoolExecutor | None = None
+        self.__memory: SharedMemory | None = None
+        self.__mutex = threading.Lock()
+
+    def __enter__(self) -> 'aes_pool':
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        self.shutdown()
+
+    def get_workers_count(self) -> int:
+        """
+        Getter for the count of the worker processes
+        :return: count of the worker processes
+        """
+        return self.__workers
+
+    def __get_executor(self) -> ProcessPoolExecutor:
+        """
+        Gives the executor of the pool, starts it on the first use
+        :return: the executor
+        """
+        if self.__executor is None:
+            self.__executor = ProcessPoolExecutor(max_workers=self.__workers)
+
+        return self.__executor
+
+    def __get_memory(self, size: int) -> SharedMemory:
+        """
+        Gives the shared memory block of at least the given size (the block is reused and grows when needed)
+        :param size: needed size of the block
+        :return: the shared memory block
+        """
+        if self.__memory is None or self.__memory.size < size:
+            self.__release_memory()
+            self.__memory = SharedMemory(create=True, size=size)
+
+        return self.__memory
+
+    def __release_memory(self) -> None:
+        """
+        Frees the shared memory block of the pool
+        """
+        if self.__memory is not None:
+            self.__memory.close()
+            self.__memory.unlink()
+            self.__memory = None
+
+    def __run(self, data: memoryview, length: int, cipher: aes, mode: str, nonce: int = 0,
+              position: int = 0) -> bytes:
+        """
+        Processes the buffer in the worker processes
+        :param data: the input data
+        :param length: size to process (the data padded with zero bytes up to it)
+        :param cipher: aes instance (the key)
+        :param mode: 'encrypt', 'decrypt' or 'ctr' (see _process_chunk)
+        :param nonce: nonce of the stream (ctr mode)
+        :param position: stream position of the data start (ctr mode)
+        :return: the processed data
+        """
+        with self.__mutex:
+            executor = self.__get_executor()
+            memory = self.__get_memory(length)
+
+            buffer = memory.buf
+            buffer[:len(data)] = data
+            buffer[len(data):length] = bytes(length - len(data))
+
+            # Split between all the workers, but not to chunks smaller than the chunk size
+            chunk_size = -(-length // self.__workers)
+            chunk_size = max(self.__chunk_size, chunk_size + (-chunk_size % _BLOCK_SIZE))
+
+            futures = [executor.submit(_process_chunk, memory.name, start, min(start + chunk_size, length),
+                                       cipher.get_session_key(), cipher.get_engine_name(), mode, nonce, position)
+                       for start in range(0, length, chunk_size)]
+
+            for future in futures:
+                future.result()
+
+            return bytes(buffer[:length])
+
+    def encrypt_bytes(self, cipher: aes, data: bytes | bytearray | memoryview) -> bytes:
+        """
+        Encrypts the data like cipher.encrypt_bytes, large data is encrypted in the worker processes
+        :param cipher: aes instance (the key)
+        :param data: The data to be encrypted
+        :return: The encrypted data (padded with zero bytes to a multiple of 16 bytes)
+        """
+        data = memoryview(data).cast('B')
+
+        if len(data) < self.__threshold:
+            return cipher.encrypt_bytes(data)
+
+        return self.__run(data, len(data) + (-len(data) % _BLOCK_SIZE), cipher, 'encrypt')
+
+    def decrypt_bytes(self, cipher: aes, data: bytes | bytearray | memoryview) -> bytes:
+        """
+        Decrypts the data like cipher.decrypt_bytes, large data is decrypted in the worker processes
+        :param cipher: aes instance (the key)
+        :param data: The encrypted data
+        :return: The decrypted data (trailing zero bytes are removed)
+        """
+        data = memoryview(data).cast('B')
+
+        if len(data) < self.__threshold:
+            return cipher.decrypt_bytes(data)
+
+        return self.__run(data, len(data) + (-len(data) % _BLOCK_SIZE), cipher, 'decrypt').rstrip(b'\x00')
+
+    def update(self, stream: aes_ctr, data: bytes | bytearray | memoryview) -> bytes:
+        """
+        Processes the next chunk of the stream like stream.update, large chunks are processed in the worker processes
+        :param stream: the counter mode stream (its position moves after the chunk)
+        :param data: the next chunk of the stream
+        :return: the processed chunk (same length)
+        """
+        data = memoryview(data).cast('B')
+
+        if len(data) < self.__threshold:
+            return stream.update(data)
+
+        position = stream.tell()
+        result = self.__run(data, len(data), stream.get_cipher(), 'ctr', stream.get_nonce(), position)
+        stream.seek(position + len(data))
+
+        return result
+
+    def shutdown(self) -> None:
+        """
+        Stops the worker processes and frees the shared memory
+        """
+        with self.__mutex:
+            if self.__executor is not None:
+                self.__executor.shutdown()
+                self.__executor = None
 
-        decrypted_text = ''.join(decrypted_list)
-        return decrypted_text
+            self.__release_memory()
@@ -0,0 +1,299 @@
+# Libraries
+import os
+from math import gcd
+from random import SystemRandom
+
+try:
+    from Crypto.Math.Numbers import Integer
+    from Crypto.Util.number import getStrongPrime, isPrime
+except ImportError:
+    Integer = None
+
+try:
+    # X25519 of pycryptodome (3.21 and newer)
+    from Crypto.Protocol.DH import import_x25519_private_key, import_x25519_public_key, key_agreement
+except ImportError:
+    key_agreement = None
+
+
+# Import settings
+__all__ = ['backend']
+
+
+# Constants
+
+# Odd primes for the trial division of the prime candidates
+_SMALL_PRIMES = tuple(number for number in range(3, 2000, 2)
+                      if all(number % divisor for divisor in range(3, int(number ** 0.5) + 1, 2)))
+
+# Rounds of the Miller-Rabin test (false positive probability is at most 4^-rounds)
+_MILLER_RABIN_ROUNDS = 40
+
+# Secure random numbers source
+_RANDOM = SystemRandom()
+
+# Curve25519 (RFC 7748): the prime, (A - 2) / 4 and the u-coordinate of the base point
+_X25519_P = 2 ** 255 - 19
+_X25519_A24 = 121665
+_X25519_BASE_POINT = (9).to_bytes(32, 'little')
+
+
+# Classes
+class _PythonBackend:
+    """
+    Reference backend - everything in pure Python (no dependencies)
+    """
+
+    # Block engine of the aes
+    AES_ENGINE = 'table'
+
+    # Window of the fixed-base tables of the dh presets (bits), ~4x faster than pow for the generator powers
+    DH_WINDOW_BITS = 5
+
+    @staticmethod
+    def power(base: int, exponent: int, modulus: int) -> int:
+        """
+        Modular exponentiation
+        :param base: the base
+        :param exponent: the exponent
+        :param modulus: the modulus
+        :return: `base^exponent (mod modulus)`
+        """
+        return pow(base, exponent, modulus)
+
+    @staticmethod
+    def is_prime(number: int) -> bool:
+        """
+        Checks if the number is a probable prime (trial division and Miller-Rabin test)
+        :param number: the number to check
+        :return: True - if the number is a probable prime | else - False
+        """
+        if number < 2:
+            return False
+
+        for small_prime in (2,) + _SMALL_PRIMES:
+            if number % small_prime == 0:
+                return number == small_prime
+
+        # number - 1 = 2^s * d
+        d, s = number - 1, 0
+        while d % 2 == 0:
+            d, s = d // 2, s + 1
+
+        for _ in range(_MILLER_RABIN_ROUNDS):
+            x = pow(_RANDOM.randrange(2, number - 1), d, number)
+
+            if x == 1 or x == number - 1:
+                continue
+
+            for _ in range(s - 1):
+                x = pow(x, 2, number)
+                if x == number - 1:
+                    break
+            else:
+                return False
+
+        return True
+
+    @staticmethod
+    def generate_prime(bits: int, e: int = 0, stop=None) -> int | None:
+        """
+        Generates a random prime of the given size
+        :param bits: size of the prime (bits), the two top bits are set, so product of two primes has 2 * bits
+        :param e: if given, `prime - 1` is coprime to it (for the RSA public exponent)
+        :param stop: if given, function checked before every candidate - the search stops when it returns True
+        :return: the prime | None if the search was stopped
+        """
+        while stop is None or not stop():
+            candidate = _RANDOM.getrandbits(bits) | (3 << (bits - 2)) | 1
+
+            if any(candidate % small_prime == 0 for small_prime in _SMALL_PRIMES):
+                continue
+
+            if e and gcd(candidate - 1, e) != 1:
+                continue
+
+            if _PythonBackend.is_prime(candidate):
+                return candidate
+
+        return None
+
+    @staticmethod
+    def x25519(scalar: bytes, u: bytes = _X25519_BASE_POINT) -> bytes:
+        """
+        X25519 function of RFC 7748 (Montgomery ladder over Curve25519)
+        :param scalar: the 32 bytes scalar (private key), clamped here
+        :param u: the 32 bytes u-coordinate of the point (the base point - to get the public key)
+        :return: the 32 bytes u-coordinate of `scalar * point`
+        """
+        if len(scalar) != 32 or len(u) != 32:
+            raise ValueError("X25519 scalar and point must be 32 bytes")
+
+        k = int.from_bytes(scalar, 'little')
+        k = (k & ~7 & ~(1 << 255)) | (1 << 254)
+
+        p = _X25519_P
+        x1 = int.from_bytes(u, 'little') & ((1 << 255) - 1)
+        x2, z2, x3, z3 = 1, 0, x1, 1
+        swap = 0
+
+        for t in range(254, -1, -1):
+            bit = (k >> t) & 1
+            swap ^= bit
+            if swap:
+                x2, x3, z2, z3 = x3, x2, z3, z2
+            swap = bit
+
+            a, b = x2 + z2, x2 - z2
+            c, d = x3 + z3, x3 - z3
+            aa, bb = a * a % p, b * b % p
+            e = aa - bb
+            da, cb = d * a % p, c * b % p
+
+            x3 = (da + cb) ** 2 % p
+            z3 = x1 * (da - cb) ** 2 % p
+            x2 = aa * bb % p
+            z2 = e * (aa + _X25519_A24 * e) % p
+
+        if swap:
+            x2, z2 = x3, z3
+
+        result = x2 * pow(z2, p - 2, p) % p
+
+        # A point of a small order gives zero - no shared secret
+        if result == 0:
+            raise ValueError("X25519 point of a small order")
+
+        return result.to_bytes(32, 'little')
+
+
+class _PycryptodomeBackend:
+    """
+    Accelerated backend - integer routines and the prime generation of pycryptodome (GMP when it's available).
+    The aes stays on the table engine: pycryptodome's AES core uses the standard block layout, and the aes of the
+    project loads the block by rows - so the AES core can't produce the same ciphertexts
+    """
+
+    # Block engine of the aes
+    AES_ENGINE = 'table'
+
+    # No fixed-base tables of the dh presets - the GMP power is already faster than the table in Python
+    DH_WINDOW_BITS = 0
+
+    @staticmethod
+    def power(base: int, exponent: int, modulus: int) -> int:
+        """
+        Modular exponentiation
+        :param base: the base
+        :param exponent: the exponent
+        :param modulus: the modulus (odd)
+        :return: `base^exponent (mod modulus)`
+        """
+        return int(pow(Integer(base), exponent, modulus))
+
+    @staticmethod
+    def is_prime(number: int) -> bool:
+        """
+        Checks if the number is a probable prime
+        :param number: the number to check
+        :return: True - if the number is a probable prime | else - False
+        """
+        return bool(isPrime(number))
+
+    @staticmethod
+    def generate_prime(bits: int, e: int = 0, stop=None) -> int | None:
+        """
+        Generates a random strong prime of the given size
+        :param bits: size of the prime (bits, multiple of 128)
+        :param e: if given, `prime - 1` is coprime to it (for the RSA public exponent)
+        :param stop: if given, function checked before the search - the search of pycryptodome is one (short) call,
+                     so it isn't stopped in the middle
+        :return: the prime | None if the search was stopped
+        """
+        if stop is not None and stop():
+            return None
+
+        return getStrongPrime(bits, e)
+
+    @staticmethod
+    def x25519(scalar: bytes, u: bytes = _X25519_BASE_POINT) -> bytes:
+        """
+        X25519 function of RFC 7748 (pycryptodome's when it has one, else the pure Python one)
+        :param scalar: the 32 bytes scalar (private key), clamped here
+        :param u: the 32 bytes u-coordinate of the point (the base point - to get the public key)
+        :return: the 32 bytes u-coordinate of `scalar * point`
+        """
+        if key_agreement is None:
+            return _PythonBackend.x25519(scalar, u)
+
+        if len(scalar) != 32 or len(u) != 32:
+            raise ValueError("X25519 scalar and point must be 32 bytes")
+
+        private_key = import_x25519_private_key(scalar)
+
+        if u == _X25519_BASE_POINT:
+            return private_key.public_key().export_key(format='raw')
+
+        # Rejects the points of a small order by itself (ValueError)
+        return key_agreement(static_priv=private_key, static_pub=import_x25519_public_key(u), kdf=lambda secret: secret)
+
+
+class backend:
+    """
+    Registry of the crypto backends used by aes, rsa and dh.
+    The backend is chosen at startup by the environment variable (TOR_CRYPTO_BACKEND=python|pycryptodome) or by
+    backend.set. By default - pycryptodome if it's installed, else the pure Python one
+
+    Attributes:
+    - BACKENDS (dict): The available backends by name
+    """
+
+    # Backends by their names
+    BACKENDS = {
+        'python': _PythonBackend
+    }
+
+    # Accelerated backend - only with pycryptodome
+    if Integer is not None:
+        BACKENDS['pycryptodome'] = _PycryptodomeBackend
+
+    # Environment variable to choose the backend
+    ENVIRONMENT_VARIABLE = 'TOR_CRYPTO_BACKEND'
+
+    # Backend used by default
+    DEFAULT_BACKEND = 'pycryptodome' if Integer is not None else 'python'
+
+    __current_name = DEFAULT_BACKEND
+
+    @staticmethod
+    def get():
+        """
+        Gives the current backend
+        :return: the backend (class with the power, is_prime, generate_prime and x25519 static methods, AES_ENGINE
+                 and DH_WINDOW_BITS)
+        """
+        return backend.BACKENDS[backend.__current_name]
+
+    @staticmethod
+    def get_name() -> str:
+        """
+        Gives the name of the current backend
+        :return: the name of the current backend (key of backend.BACKENDS)
+        """
+        return backend.__current_name
+
+    @staticmethod
+    def set(name: str) -> None:
+        """
+        Changes the current backend (should be done at startup, before the keys are created)
+        :param name: name of the backend (key of backend.BACKENDS)
+        """
+        if name not in backend.BACKENDS:
+            raise ValueError(f"Backend {name} is not supported")
+
+        backend.__current_name = name
+
+
+# Backend from the environment
+if os.environ.get(backend.ENVIRONMENT_VARIABLE):
+    backend.set(os.environ[backend.ENVIRONMENT_VARIABLE])
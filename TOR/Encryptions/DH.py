@@ -1,8 +1,77 @@
 # Libraries
+import threading
+from collections import deque
 from random import getrandbits, choice
 
+from Encryptions.Backend import backend
+
 
 # Classes
+class _FixedBaseTable:
+    """
+    Fixed-base windowed table of one generator and prime: row i holds `g^(j * 2^(window * i)) (mod p)` for every
+    window digit j, so `g^x (mod p)` is one multiplication per nonzero digit of x and no squarings.
+    The rows are added on demand - a table of short exponents stays short
+    """
+
+    __slots__ = ('p', 'window', 'rows', 'next_base', 'mutex')
+
+    def __init__(self, p: int, g: int, window: int):
+        """
+        Creates an empty table
+        :param p: the prime modulus
+        :param g: the generator
+        :param window: size of the digits of the exponents (bits)
+        """
+        self.p = p
+        self.window = window
+        self.rows: list[list[int]] = []
+        self.next_base = g % p          # g^(2^(window * len(rows))) - base of the next row
+        self.mutex = threading.Lock()
+
+    def __extend(self, rows_count: int) -> None:
+        """
+        Adds rows to the table
+        :param rows_count: the needed count of the rows
+        """
+        with self.mutex:
+            p = self.p
+
+            while len(self.rows) < rows_count:
+                row = [1] * (1 << self.window)
+                value = 1
+
+                for digit in range(1, 1 << self.window):
+                    value = value * self.next_base % p
+                    row[digit] = value
+
+                self.next_base = value * self.next_base % p
+                self.rows.append(row)
+
+    def power(self, exponent: int) -> int:
+        """
+        Modular exponentiation of the generator
+        :param exponent: the exponent (not negative)
+        :return: `g^exponent (mod p)`
+        """
+        window = self.window
+        rows_count = -(-exponent.bit_length() // window)
+
+        if rows_count > len(self.rows):
+            self.__extend(rows_count)
+
+        rows, p, mask = self.rows, self.p, (1 << window) - 1
+        result = 1
+
+        for row in rows[:rows_count]:
+            digit = exponent & mask
+            if digit:
+                result = result * row[digit] % p
+            exponent >>= window
+
+        return result
+
+
 class dh:
     """
     An implementation of the DH protocol.
@@ -70,6 +139,27 @@ class dh:
         ]
     }
 
+    # The preset parameters (p, g) of all the key sizes
+    __PRESETS = frozenset((parameters['p'], parameters['g'])
+                          for parameters_list in __PARAMETERS.values() for parameters in parameters_list)
+
+    # Versions of the presets table - the peers name the parameters by the version and the index in its table instead
+    # of sending p and g. The table of a released version never changes (new presets are a new version)
+    __PRESETS_TABLES: dict[int, list[tuple[int, int]]] = {
+        1: [(parameters['p'], parameters['g']) for parameters in __PARAMETERS[2048]]
+    }
+
+    # Version of the presets table used by the requests of this node
+    PRESETS_VERSION = 1
+
+    # Size of the private numbers (bits): the full size of the prime, or a short exponent - the presets are safe primes,
+    # so 256 bits (twice the 128-bit security level of the 2048-bit group) are enough and the handshakes are ~8x faster
+    PRIVATE_NUMBER_BITS = 2048
+
+    # Fixed-base tables of the presets by (p, g, window) - built on the first use of the preset
+    __tables: dict[tuple[int, int, int], _FixedBaseTable] = {}
+    __tables_mutex = threading.Lock()
+
     @staticmethod
     def generate_parameters(key_size: int = 2048) -> tuple[int, int]:
         """
@@ -84,6 +174,87 @@ class dh:
         selected_params = choice(params_list)
         return selected_params['p'], selected_params['g']
 
+    @staticmethod
+    def get_presets(key_size: int = 2048) -> list[tuple[int, int]]:
+        """
+        Gives all the preset Diffie-Hellman parameters of the given key size
+        :param key_size: The key size (default = 2048 bits)
+        :return: A list of tuples containing the prime modulus (p) and generator (g)
+        """
+        if key_size not in dh.__PARAMETERS:
+            raise ValueError(f"Key size {key_size} is not supported")
+
+        return [(parameters['p'], parameters['g']) for parameters in dh.__PARAMETERS[key_size]]
+
+    @staticmethod
+    def generate_preset_index(version: int = None) -> int:
+        """
+        Chooses random preset parameters of the presets table
+        :param version: The version of the presets table (default = dh.PRESETS_VERSION)
+        :return: The index of the parameters in the table (see get_preset)
+        """
+        return choice(range(len(dh.get_presets_table(version))))
+
+    @staticmethod
+    def get_preset(index: int, version: int = None) -> tuple[int, int]:
+        """
+        Gives the preset parameters by the index in the presets table
+        :param index: The index of the parameters in the table
+        :param version: The version of the presets table (default = dh.PRESETS_VERSION)
+        :return: A tuple containing the prime modulus (p) and generator (g)
+        """
+        table = dh.get_presets_table(version)
+
+        if not 0 <= index < len(table):
+            raise ValueError(f"Preset {index} doesn't exist")
+
+        return table[index]
+
+    @staticmethod
+    def get_presets_table(version: int = None) -> list[tuple[int, int]]:
+        """
+        Gives the presets table of the version
+        :param version: The version of the presets table (default = dh.PRESETS_VERSION)
+        :return: A list of tuples containing the prime modulus (p) and generator (g)
+        """
+        if version is None:
+            version = dh.PRESETS_VERSION
+
+        if version not in dh.__PRESETS_TABLES:
+            raise ValueError(f"Presets version {version} is not supported")
+
+        return dh.__PRESETS_TABLES[version]
+
+    @staticmethod
+    def is_preset(parameters: tuple[int, int]) -> bool:
+        """
+        Checks if the parameters are one of the presets
+        :param parameters: A tuple containing the prime modulus (p) and generator (g)
+        :return: True - if the parameters are a preset | else - False
+        """
+        return tuple(parameters) in dh.__PRESETS
+
+    @staticmethod
+    def __get_table(p: int, g: int) -> _FixedBaseTable | None:
+        """
+        Gives the fixed-base table of the parameters (creates it on the first use)
+        :param p: the prime modulus
+        :param g: the generator
+        :return: the table | None - if the parameters aren't a preset, or the backend doesn't use the tables
+        """
+        window = backend.get().DH_WINDOW_BITS
+
+        # Only the presets - the parameters of the peers mustn't grow the cache
+        if not window or (p, g) not in dh.__PRESETS:
+            return None
+
+        table = dh.__tables.get((p, g, window))
+        if table is None:
+            with dh.__tables_mutex:
+                table = dh.__tables.setdefault((p, g, window), _FixedBaseTable(p, g, window))
+
+        return table
+
     def __init__(self, parameters: tuple[int, int] = ()):
         """
         Initializes a Diffie-Hellman instance with the given parameters
@@ -100,7 +271,20 @@ class dh:
         :param private_number: The private number
         :return: `public key = g^private_number (mod p)`
         """
-        return pow(self.__g, private_number, self.__p)
+        table = dh.__get_table(self.__p, self.__g)
+
+        if table is None or private_number < 0:
+            return backend.get().power(self.__g, private_number, self.__p)
+
+        return table.power(private_number)
+
+    def generate_key_pair(self) -> tuple[int, int]:
+        """
+        Generates a new ephemeral key pair (see dh_pool for the pre-generated ones)
+        :return: A tuple containing the private number and the public key
+        """
+        private_number = dh.generate_private_number()
+        return private_number, self.generate_public_key(private_number)
 
     def exchange(self, public_key_other: int, private_number: int) -> int:
         """
@@ -109,13 +293,185 @@ class dh:
         :param private_number: The private number of the current side
         :return: `secret_session_key = public_key_other^private_number (mod p)`
         """
-        return pow(public_key_other, private_number, self.__p)
+        return backend.get().power(public_key_other, private_number, self.__p)
 
     @staticmethod
-    def generate_private_number(number_bit_length: int = 2048) -> int:
+    def generate_private_number(number_bit_length: int = None) -> int:
         """
         *Static method*. Generates a random number
-        :param number_bit_length: The desired private number (default = 2048 bits)
+        :param number_bit_length: The desired private number (default = dh.PRIVATE_NUMBER_BITS)
         :return: A generated private number
         """
-        return getrandbits(number_bit_length)
+        return getrandbits(number_bit_length or dh.PRIVATE_NUMBER_BITS)
+
+
+class dh_pool:
+    """
+    Pool of pre-generated ephemeral key pairs (private number, public key) per dh parameters. When the pairs of the
+    parameters fall below the low watermark, a background thread generates new ones up to the high watermark, so a
+    handshake takes a ready pair and only the exchange is left on its path. A pair is given out once (it leaves the
+    pool), and a miss (no ready pair) generates the pair in place.
+    Only the presets are pooled - the parameters sent by the peers mustn't grow the pool
+    """
+
+    # Default watermarks (pairs per parameters)
+    LOW_WATERMARK = 4
+    HIGH_WATERMARK = 16
+
+    # Pool shared by all the handshakes of the process (created on the first use)
+    __default: 'dh_pool | None' = None
+    __default_mutex = threading.Lock()
+
+    def __init__(self, low_watermark: int = LOW_WATERMARK, high_watermark: int = HIGH_WATERMARK):
+        """
+        Constructor of the pool. The background thread is started on the first use
+        :param low_watermark: count of the ready pairs that starts the refill of the parameters
+        :param high_watermark: count of the ready pairs that the refill stops at
+        """
+        if not 0 <= low_watermark <= high_watermark or high_watermark <= 0:
+            raise ValueError("Watermarks must be 0 <= low <= high and high > 0")
+
+        self.__low_watermark = low_watermark
+        self.__high_watermark = high_watermark
+
+        self.__pairs: dict[tuple[int, int], deque[tuple[int, int]]] = {}    # { parameters: ready pairs }
+        self.__refilling: dict[tuple[int, int], None] = {}                  # parameters to refill (ordered set)
+
+        self.__hits = 0
+        self.__misses = 0
+
+        self.__condition = threading.Condition()
+        self.__thread: threading.Thread | None = None
+        self.__generation = 0           # Incremented by stop, a background thread runs while its generation is current
+
+    @staticmethod
+    def get_default() -> 'dh_pool':
+        """
+        Gives the pool shared by the process (the one used by the communicators)
+        :return: the shared pool
+        """
+        with dh_pool.__default_mutex:
+            if dh_pool.__default is None:
+                dh_pool.__default = dh_pool()
+
+            return dh_pool.__default
+
+    def get_key_pair(self, parameters: tuple[int, int]) -> tuple[int, int]:
+        """
+        Gives a key pair of the parameters - a ready one, or a new one if the pool has no ready pair (a miss)
+        :param parameters: A tuple containing the prime modulus (p) and generator (g)
+        :return: A tuple containing the private number and the public key
+        """
+        parameters = tuple(parameters)
+
+        if not dh.is_preset(parameters):
+            return dh(parameters).generate_key_pair()
+
+        with self.__condition:
+            pairs = self.__pairs.setdefault(parameters, deque())
+            pair = pairs.popleft() if pairs else None
+
+            if pair is None:
+                self.__misses += 1
+            else:
+                self.__hits += 1
+
+            if len(pairs) < self.__low_watermark or not pairs:
+                self.__request_refill(parameters)
+
+        return pair if pair is not None else dh(parameters).generate_key_pair()
+
+    def fill(self, parameters_list: list[tuple[int, int]]) -> None:
+        """
+        Starts the refill of the parameters up to the high watermark ahead of the handshakes (for example, at startup)
+        :param parameters_list: list of the parameters (presets) to fill
+        """
+        with self.__condition:
+            for parameters in map(tuple, parameters_list):
+                if dh.is_preset(parameters):
+                    self.__pairs.setdefault(parameters, deque())
+                    self.__request_refill(parameters)
+
+    def __request_refill(self, parameters: tuple[int, int]) -> None:
+        """
+        Marks the parameters to refill and wakes the background thread (the condition must be held)
+        :param parameters: the parameters to refill
+        """
+        self.__refilling[parameters] = None
+
+        if self.__thread is None or not self.__thread.is_alive():
+            self.__thread = threading.Thread(target=self.__refill, args=(self.__generation,), daemon=True)
+            self.__thread.start()
+
+        self.__condition.notify()
+
+    def __refill(self, generation: int) -> None:
+        """
+        Background thread - generates the pairs of the parameters to refill, one pair per parameters in turn
+        :param generation: the generation of the thread - the thread ends when stop starts the next one
+        """
+        while True:
+            with self.__condition:
+                while not self.__refilling and generation == self.__generation:
+                    self.__condition.wait()
+
+                if generation != self.__generation:
+                    return
+
+                # Take the first parameters and move them to the end (turns between the parameters)
+                parameters = next(iter(self.__refilling))
+                del self.__refilling[parameters]
+                self.__refilling[parameters] = None
+
+            pair = dh(parameters).generate_key_pair()
+
+            with self.__condition:
+                if generation != self.__generation:
+                    return
+
+                pairs = self.__pairs.setdefault(parameters, deque())
+                pairs.append(pair)
+
+                if len(pairs) >= self.__high_watermark:
+                    self.__refilling.pop(parameters, None)
+
+    def stop(self) -> None:
+        """
+        Stops the background thread and drops the ready pairs (the pool starts again on the next use, with a new thread
+        even before the stopped one ends)
+        """
+        with self.__condition:
+            self.__generation += 1
+            self.__refilling.clear()
+            self.__pairs.clear()
+            self.__condition.notify_all()
+
+            thread, self.__thread = self.__thread, None
+
+        if thread is not None:
+            thread.join()
+
+    def get_size(self, parameters: tuple[int, int]) -> int:
+        """
+        Gives the count of the ready pairs of the parameters
+        :param parameters: A tuple containing the prime modulus (p) and generator (g)
+        :return: count of the ready pairs
+        """
+        with self.__condition:
+            return len(self.__pairs.get(tuple(parameters), ()))
+
+    def get_hits(self) -> int:
+        """
+        Getter for the count of the pairs given from the pool
+        :return: count of the hits
+        """
+        with self.__condition:
+            return self.__hits
+
+    def get_misses(self) -> int:
+        """
+        Getter for the count of the pairs generated in place (the pool had no ready pair)
+        :return: count of the misses
+        """
+        with self.__condition:
+            return self.__misses
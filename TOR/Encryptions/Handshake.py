@@ -0,0 +1,241 @@
+# Libraries
+import os
+from collections.abc import Iterable
+from functools import lru_cache
+from hashlib import sha256
+
+from Encryptions.DH import dh, dh_pool
+from Encryptions.RSA import rsa, public_key, private_key
+from Encryptions.X25519 import x25519
+
+
+# Import settings
+__all__ = ['handshake']
+
+
+# Functions
+@lru_cache(maxsize=64)
+def _static_public_key(static_private_key: bytes) -> bytes:
+    """
+    Gives the public key of the relay's static X25519 key (cached - the relay computes it for every handshake)
+    :param static_private_key: the static X25519 private key
+    :return: the static X25519 public key
+    """
+    return x25519.generate_public_key(static_private_key)
+
+
+# Classes
+class handshake:
+    """
+    Client side of the handshake of one hop, in one of the handshake suites:
+        * classic - 2048-bit DH (preset parameters), the client's DH public key is RSA encrypted for the relay
+        * x25519 - X25519 with the relay's static X25519 key (published in the directory) and ephemeral keys of both
+          sides, `session key = sha256(x25519(x, Y) | x25519(x, B) | B | X | Y)` (like the ntor handshake of Tor).
+          Only the owner of the static key computes the same key, and the keys are 32 bytes instead of hundreds
+    The request carries the suite and the handshake numbers of the suite, the response (created, extended or
+    connected) carries the relay's public number and the hash of the session key in both suites.
+
+    Every node chooses its suites (preference order), the client uses the first of its suites that the relay offers.
+    The relay offers the classic suite always and the x25519 suite if it published its static key
+
+    Attributes:
+    - CLASSIC, X25519 (str): Names of the suites
+    - SUITES (tuple): All the suites
+    - ENVIRONMENT_VARIABLE (str): Environment variable with the default suites of the nodes (comma separated)
+    - DEFAULT_SUITES (tuple): Suites of the nodes if the environment variable isn't set
+    """
+
+    # Suites
+    CLASSIC = 'classic'
+    X25519 = 'x25519'
+    SUITES = (CLASSIC, X25519)
+
+    # Environment variable to choose the default suites
+    ENVIRONMENT_VARIABLE = 'TOR_HANDSHAKE_SUITES'
+
+    # Suites used by default
+    DEFAULT_SUITES = (CLASSIC,)
+
+    # Prefixes of the hashes (domain separation)
+    __STATIC_KEY_PREFIX = b'TOR-p2p x25519 static key'
+    __SESSION_KEY_PREFIX = b'TOR-p2p x25519 session key'
+
+    def __init__(self, suite: str, relay_rsa_key: public_key, relay_x25519_key: bytes | None = None):
+        """
+        Starts the handshake with the relay - generates the ephemeral keys of the client
+        :param suite: the suite of the handshake
+        :param relay_rsa_key: the relay's RSA public key (classic suite)
+        :param relay_x25519_key: the relay's static X25519 public key (x25519 suite)
+        """
+        self.__suite = suite
+
+        if suite == handshake.CLASSIC:
+            dh_version, dh_index = dh.PRESETS_VERSION, dh.generate_preset_index()
+            parameters = dh.get_preset(dh_index, dh_version)
+
+            self.__dh = dh(parameters)
+            self.__private_number, public_dh_key = dh_pool.get_default().get_key_pair(parameters)
+
+            self.__request = [dh_version, dh_index, rsa.encrypt(public_dh_key, relay_rsa_key)]
+
+        elif suite == handshake.X25519:
+            if relay_x25519_key is None:
+                raise ValueError("The relay doesn't offer the x25519 suite")
+
+            self.__relay_key = relay_x25519_key
+            self.__private_key = x25519.generate_private_key()
+            self.__public_key = x25519.generate_public_key(self.__private_key)
+
+            self.__request = [int.from_bytes(self.__public_key, 'big')]
+
+        else:
+            raise ValueError(f"Handshake suite {suite} is not supported")
+
+    def get_suite(self) -> str:
+        """
+        Getter for the suite of the handshake
+        :return: the name of the suite
+        """
+        return self.__suite
+
+    def get_request(self) -> list[int]:
+        """
+        Gives the handshake numbers of the request:
+            * classic - [presets version, preset index, RSA encrypted DH public key]
+            * x25519 - [client's ephemeral public key]
+        :return: the handshake numbers of the request
+        """
+        return self.__request
+
+    def finish(self, relay_public_number: int) -> int:
+        """
+        Computes the session key from the relay's response
+        :param relay_public_number: the public number of the relay's response (DH public key or ephemeral X25519 key)
+        :return: the session key
+        """
+        if self.__suite == handshake.CLASSIC:
+            return self.__dh.exchange(relay_public_number, self.__private_number)
+
+        relay_public_key = relay_public_number.to_bytes(x25519.KEY_SIZE, 'big')
+
+        return handshake.__session_key(x25519.exchange(relay_public_key, self.__private_key),
+                                       x25519.exchange(self.__relay_key, self.__private_key),
+                                       self.__relay_key, self.__public_key, relay_public_key)
+
+    @staticmethod
+    def __session_key(ephemeral_secret: bytes, static_secret: bytes, relay_key: bytes, client_public_key: bytes,
+                      relay_public_key: bytes) -> int:
+        """
+        Session key of the x25519 suite
+        :param ephemeral_secret: the secret of both ephemeral keys
+        :param static_secret: the secret of the client's ephemeral key and the relay's static key
+        :param relay_key: the relay's static public key
+        :param client_public_key: the client's ephemeral public key
+        :param relay_public_key: the relay's ephemeral public key
+        :return: the session key
+        """
+        digest = sha256(handshake.__SESSION_KEY_PREFIX + ephemeral_secret + static_secret + relay_key +
+                        client_public_key + relay_public_key).digest()
+
+        return int.from_bytes(digest, 'big')
+
+    @staticmethod
+    def get_default_suites() -> tuple[str, ...]:
+        """
+        Gives the default suites of the nodes - from the environment variable, or DEFAULT_SUITES
+        :return: the suites, in the preference order
+        """
+        suites = os.environ.get(handshake.ENVIRONMENT_VARIABLE)
+
+        if not suites:
+            return handshake.DEFAULT_SUITES
+
+        return handshake.check_suites(suite.strip() for suite in suites.split(','))
+
+    @staticmethod
+    def check_suites(suites: Iterable[str]) -> tuple[str, ...]:
+        """
+        Checks the suites of a node
+        :param suites: the suites, in the preference order
+        :return: the suites as a tuple
+        """
+        suites = tuple(suites)
+
+        for suite in suites:
+            if suite not in handshake.SUITES:
+                raise ValueError(f"Handshake suite {suite} is not supported")
+
+        if not suites:
+            raise ValueError("A node needs at least one handshake suite")
+
+        return suites
+
+    @staticmethod
+    def choose_suite(suites: tuple[str, ...], relay_x25519_key: bytes | None) -> str:
+        """
+        Chooses the suite of a handshake - the first of the client's suites that the relay offers
+        :param suites: the client's suites, in the preference order
+        :param relay_x25519_key: the relay's static X25519 public key (None - the relay doesn't offer the x25519 suite)
+        :return: the name of the suite
+        """
+        for suite in suites:
+            if suite == handshake.CLASSIC or relay_x25519_key is not None:
+                return suite
+
+        # The relay offers the classic suite always
+        return handshake.CLASSIC
+
+    @staticmethod
+    def get_static_private_key(rsa_private_key: private_key) -> bytes:
+        """
+        Gives the relay's static X25519 private key - derived from its RSA private key, so it's stored with it
+        :param rsa_private_key: the relay's RSA private key
+        :return: the static X25519 private key
+        """
+        d = rsa_private_key.get_d()
+        return sha256(handshake.__STATIC_KEY_PREFIX + d.to_bytes((d.bit_length() + 7) // 8, 'big')).digest()
+
+    @staticmethod
+    def get_static_public_key(rsa_private_key: private_key) -> bytes:
+        """
+        Gives the relay's static X25519 public key (to publish in the directory)
+        :param rsa_private_key: the relay's RSA private key
+        :return: the static X25519 public key
+        """
+        return _static_public_key(handshake.get_static_private_key(rsa_private_key))
+
+    @staticmethod
+    def respond(suite: str, request: list[int], rsa_private_key: private_key,
+                static_private_key: bytes | None = None) -> tuple[int, int]:
+        """
+        Relay side of the handshake
+        :param suite: the suite of the request
+        :param request: the handshake numbers of the request (see get_request)
+        :param rsa_private_key: the relay's RSA private key (classic suite)
+        :param static_private_key: the relay's static X25519 private key (None - the relay doesn't offer x25519)
+        :return: tuple of the relay's public number for the response and the session key
+        """
+        if suite == handshake.CLASSIC:
+            dh_version, dh_index, rsa_dh_handshake = request
+            parameters = dh.get_preset(dh_index, dh_version)
+
+            relay_dh = dh(parameters)
+            private_number, public_dh_key = dh_pool.get_default().get_key_pair(parameters)
+
+            client_public_key = rsa.decrypt(rsa_dh_handshake, rsa_private_key)
+            return public_dh_key, relay_dh.exchange(client_public_key, private_number)
+
+        if suite == handshake.X25519 and static_private_key is not None:
+            client_public_key = request[0].to_bytes(x25519.KEY_SIZE, 'big')
+
+            private_key = x25519.generate_private_key()
+            public_key = x25519.generate_public_key(private_key)
+
+            session_key = handshake.__session_key(x25519.exchange(client_public_key, private_key),
+                                                  x25519.exchange(client_public_key, static_private_key),
+                                                  _static_public_key(static_private_key),
+                                                  client_public_key, public_key)
+
+            return int.from_bytes(public_key, 'big'), session_key
+
+        raise ValueError(f"Handshake suite {suite} is not offered")
@@ -0,0 +1,151 @@
+# Libraries
+import json
+import os
+import stat
+import tempfile
+from hashlib import sha256
+
+from Encryptions.RSA import rsa
+
+
+# Import settings
+__all__ = ['keystore']
+
+
+# Classes
+class keystore:
+    """
+    On-disk store of the RSA key pairs of the users, keyed by the username - a node loads its key pair on start instead
+    of generating a new one. The directory is readable only by the owner (0700) and every key file too (0600).
+    The key file keeps the primes only (the rest of the key pair is derived from them), its name is the hash of the
+    username - usernames can't escape the directory
+
+    Attributes:
+    - ENVIRONMENT_VARIABLE (str): Environment variable with the directory of the keystore
+    - DEFAULT_PATH (str): Directory of the keystore if the environment variable isn't set
+    """
+
+    # Environment variable to choose the directory
+    ENVIRONMENT_VARIABLE = 'TOR_KEYSTORE_PATH'
+
+    # Directory used by default
+    DEFAULT_PATH = os.path.join(os.path.expanduser('~'), '.tor_p2p', 'keys')
+
+    # Permissions of the directory and of the key files (owner only)
+    __DIRECTORY_MODE = 0o700
+    __FILE_MODE = 0o600
+
+    # Version of the key file format
+    __VERSION = 1
+
+    def __init__(self, path: str = None):
+        """
+        Constructor of the keystore (the directory is created on the first save)
+        :param path: directory of the keystore (None - the environment variable, or the default one)
+        """
+        self.__path = path or os.environ.get(keystore.ENVIRONMENT_VARIABLE) or keystore.DEFAULT_PATH
+
+    def get_path(self) -> str:
+        """
+        Getter for the directory of the keystore
+        :return: the directory of the keystore
+        """
+        return self.__path
+
+    def __key_path(self, username: str) -> str:
+        """
+        Gives the path of the key file of the user
+        :param username: name of the user
+        :return: path of the key file
+        """
+        return os.path.join(self.__path, f"{sha256(username.encode()).hexdigest()}.key")
+
+    def load(self, username: str) -> rsa | None:
+        """
+        Loads the key pair of the user
+        :param username: name of the user
+        :return: the key pair | None - if the user has no stored key pair
+        """
+        path = self.__key_path(username)
+
+        try:
+            with open(path) as file:
+                content = json.load(file)
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError) as error:
+            raise ValueError(f"Key file {path} is corrupted") from error
+
+        if content.get('version') != keystore.__VERSION or content.get('username') != username:
+            raise ValueError(f"Key file {path} doesn't belong to the user {username}")
+
+        if content.get('e') != rsa.PUBLIC_EXPONENT:
+            raise ValueError(f"Key file {path} has unsupported public exponent")
+
+        # Key files with wider permissions are tightened (copied by hand, or created by an old umask)
+        if os.name == 'posix' and stat.S_IMODE(os.stat(path).st_mode) & ~keystore.__FILE_MODE:
+            os.chmod(path, keystore.__FILE_MODE)
+
+        return rsa(int(content['p'], 16), int(content['q'], 16))
+
+    def save(self, username: str, key_pair: rsa) -> None:
+        """
+        Stores the key pair of the user (replaces the stored one). The file is written aside and renamed, so a crash
+        never leaves a half written key
+        :param username: name of the user
+        :param key_pair: the key pair to store
+        """
+        os.makedirs(self.__path, mode=keystore.__DIRECTORY_MODE, exist_ok=True)
+
+        if os.name == 'posix':
+            os.chmod(self.__path, keystore.__DIRECTORY_MODE)
+
+        p, q = key_pair.get_primes()
+        content = {
+            'version': keystore.__VERSION,
+            'username': username,
+            'e': rsa.PUBLIC_EXPONENT,
+            'p': format(p, 'x'),
+            'q': format(q, 'x')
+        }
+
+        # mkstemp creates the file with 0600 permissions
+        descriptor, temporary_path = tempfile.mkstemp(dir=self.__path, suffix='.tmp')
+
+        try:
+            with os.fdopen(descriptor, 'w') as file:
+                json.dump(content, file)
+                file.flush()
+                os.fsync(file.fileno())
+
+            os.replace(temporary_path, self.__key_path(username))
+
+        except BaseException:
+            os.unlink(temporary_path)
+            raise
+
+    def delete(self, username: str) -> bool:
+        """
+        Deletes the stored key pair of the user
+        :param username: name of the user
+        :return: True - if the key pair was deleted | False - the user has no stored key pair
+        """
+        try:
+            os.unlink(self.__key_path(username))
+            return True
+        except FileNotFoundError:
+            return False
+
+    def load_or_generate(self, username: str) -> rsa:
+        """
+        Loads the key pair of the user, or generates a new one and stores it (first start of the user)
+        :param username: name of the user
+        :return: the key pair
+        """
+        key_pair = self.load(username)
+
+        if key_pair is None:
+            key_pair = rsa()
+            self.save(username, key_pair)
+
+        return key_pair
@@ -0,0 +1,94 @@
+# Libraries
+from collections.abc import Iterable, Iterator
+
+from Encryptions.AES import aes_ctr_session
+
+
+# Import settings
+__all__ = ['OnionCipher']
+
+
+# Classes
+class OnionCipher:
+    """
+    All the onion layers of one circuit, built once and reused for every message through the circuit.
+    Every layer is a CTR stream, so instead of encrypting the payload layer by layer the keystreams of all the layers
+    are XORed together and applied to the payload in a single pass
+    """
+
+    __slots__ = ('__layers',)
+
+    def __init__(self, layers: list[aes_ctr_session] = None):
+        """
+        Constructor of the onion cipher
+        :param layers: session keys of the hops, ordered from the entry node to the last node
+        """
+        self.__layers: list[aes_ctr_session] = list(layers) if layers else []
+
+    def add_layer(self, layer: aes_ctr_session) -> None:
+        """
+        Adds the session key of the next hop (when the circuit is extended)
+        :param layer: session key of the new last hop
+        """
+        self.__layers.append(layer)
+
+    def get_layers_count(self) -> int:
+        """
+        Getter for the count of the layers (hops)
+        :return: count of the layers
+        """
+        return len(self.__layers)
+
+    def wrap(self, data: bytes | bytearray | memoryview) -> bytes:
+        """
+        Puts all the layers on the outgoing data (from the circuit's client to the last hop)
+        :param data: the plain data
+        :return: the onion - data encrypted for every hop
+        """
+        data = memoryview(data).cast('B')
+        length = len(data)
+
+        if not length:
+            return b''
+
+        keystream = 0
+        for layer in self.__layers:
+            keystream ^= int.from_bytes(layer.send_keystream(length), 'big')
+
+        return (int.from_bytes(data, 'big') ^ keystream).to_bytes(length, 'big')
+
+    def unwrap(self, data: bytes | bytearray | memoryview) -> bytes:
+        """
+        Removes all the layers from the incoming data (from the last hop back to the circuit's client)
+        :param data: the onion - data encrypted by every hop
+        :return: the plain data
+        """
+        data = memoryview(data).cast('B')
+        length = len(data)
+
+        if not length:
+            return b''
+
+        keystream = 0
+        for layer in self.__layers:
+            keystream ^= int.from_bytes(layer.receive_keystream(length), 'big')
+
+        return (int.from_bytes(data, 'big') ^ keystream).to_bytes(length, 'big')
+
+    def wrap_stream(self, chunks: Iterable[bytes | bytearray | memoryview]) -> Iterator[bytes]:
+        """
+        Puts all the layers on the outgoing data chunk by chunk (never holds more than one chunk)
+        :param chunks: chunks of the plain data
+        :return: generator of the wrapped chunks (same sizes)
+        """
+        for chunk in chunks:
+            yield self.wrap(chunk)
+
+    def unwrap_stream(self, chunks: Iterable[bytes | bytearray | memoryview]) -> Iterator[bytes]:
+        """
+        Removes all the layers from the incoming data chunk by chunk (never holds more than one chunk)
+        :param chunks: chunks of the onion
+        :return: generator of the plain chunks (same sizes)
+        """
+        for chunk in chunks:
+            yield self.unwrap(chunk)
@@ -0,0 +1,46 @@
+# Libraries
+import os
+
+from Encryptions.Backend import backend
+
+
+# Import settings
+__all__ = ['x25519']
+
+
+# Classes
+class x25519:
+    """
+    An implementation of the X25519 key exchange (RFC 7748) - Diffie-Hellman over Curve25519 with 32 bytes keys.
+    The curve operations are done by the crypto backend
+    """
+
+    # Size of the keys and of the shared secret (bytes)
+    KEY_SIZE = 32
+
+    @staticmethod
+    def generate_private_key() -> bytes:
+        """
+        Generates a random private key
+        :return: the private key (32 bytes)
+        """
+        return os.urandom(x25519.KEY_SIZE)
+
+    @staticmethod
+    def generate_public_key(private_key: bytes) -> bytes:
+        """
+        Computes the public key of the private key
+        :param private_key: the private key (32 bytes)
+        :return: the public key (32 bytes) - `private_key * base point`
+        """
+        return backend.get().x25519(private_key)
+
+    @staticmethod
+    def exchange(public_key_other: bytes, private_key: bytes) -> bytes:
+        """
+        Computes the shared secret with the other side's public key
+        :param public_key_other: the other side's public key (32 bytes)
+        :param private_key: the private key of the current side (32 bytes)
+        :return: the shared secret (32 bytes). ValueError if the public key is a point of a small order
+        """
+        return backend.get().x25519(private_key, public_key_other)
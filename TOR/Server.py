@@ -11,13 +11,29 @@ class Server:
     Server wrapper class of Server communicator
     """
 
-    def __init__(self, port: int, rsa_private_key: private_key):
+    def __init__(self, port: int, rsa_private_key: private_key = None, handshake_suites: tuple[str, ...] = None):
         """
         Constructor of the Server class
         :param port: Port that server must be opened on
+        :param rsa_private_key: RSA private key that user generated (None - set later by set_rsa_private_key)
+        :param handshake_suites: handshake suites that the server offers (None - the default suites)
+        """
+        self.__communicator = ServerCommunicator(port, rsa_private_key, handshake_suites)
+
+    def set_rsa_private_key(self, rsa_private_key: private_key) -> None:
+        """
+        Function sets the RSA private key, if the server runs before the key is ready
         :param rsa_private_key: RSA private key that user generated
         """
-        self.__communicator = ServerCommunicator(port, rsa_private_key)
+        self.__communicator.set_rsa_private_key(rsa_private_key)
+
+    @staticmethod
+    def measure_bandwidth() -> int:
+        """
+        Function measures the bandwidth of the server as a relay
+        :return: the bandwidth (KB/s)
+        """
+        return ServerCommunicator.measure_bandwidth()
 
     def run(self) -> None:
         """
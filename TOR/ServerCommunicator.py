@@ -1,28 +1,40 @@
 # Imports
+import os
 import socket
 import threading
+import time
 
 from Commands import Commands
 from Constants import Constants
 from Client import Client
 
-from Encryptions.DH import dh
-from Encryptions.AES import aes
-from Encryptions.RSA import rsa, private_key
+from Encryptions.AES import aes_ctr_session
+from Encryptions.RSA import private_key
+from Encryptions.Handshake import handshake
 
 
 # Classes
 class ServerCommunicator:
 
+    # Data that the server relays to measure its bandwidth (bytes)
+    BANDWIDTH_TEST_SIZE = 4 * Constants.BUFF_SIZE
+
     # Constructor
-    def __init__(self, port: int, rsa_private_key: private_key):
+    def __init__(self, port: int, rsa_private_key: private_key = None, handshake_suites: tuple[str, ...] = None):
         """
         Constructor for the server communicator
         :param port: Port to open server
+        :param rsa_private_key: RSA private key of the user (None - set later by set_rsa_private_key)
+        :param handshake_suites: handshake suites that the server offers (None - the default suites)
         """
         self.__server: socket.socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
         self.__port: int = port
-        self.__rsa_private_key: private_key = rsa_private_key
+        self.__handshake_suites = handshake.get_default_suites() if (handshake_suites is None) else handshake_suites
+
+        self.__rsa_private_key: private_key = None
+        self.__x25519_private_key: bytes | None = None
+        if rsa_private_key is not None:
+            self.set_rsa_private_key(rsa_private_key)
 
         self.__mutex = threading.Lock()
         self.__next_mutex = threading.Lock()
@@ -37,6 +49,37 @@ class ServerCommunicator:
 
         self.__messages: dict[int, dict[int, list[str]]] = {}       # { circuit_id_1: { stream_id_1: [ message_1, message_2, ... ], stream_id_2: [ message_1, ... ], }  }
 
+    def set_rsa_private_key(self, rsa_private_key: private_key) -> None:
+        """
+        Function sets the RSA private key (when the server was bound before the key was generated)
+        :param rsa_private_key: RSA private key of the user
+        """
+        self.__rsa_private_key = rsa_private_key
+
+        # The static X25519 key is derived from the RSA key (only if the server offers the x25519 suite)
+        if handshake.X25519 in self.__handshake_suites:
+            self.__x25519_private_key = handshake.get_static_private_key(rsa_private_key)
+
+    @staticmethod
+    def measure_bandwidth() -> int:
+        """
+        Function measures the bandwidth of the server as a relay - how fast it removes an onion layer (the CPU bound
+        part of relaying a request). It's a proxy of the CPU capacity, not of the network: the relays on similar CPUs
+        report about the same bandwidth, and the directory server clamps it (DataBaseUser.MAX_BANDWIDTH)
+        :return: the bandwidth (KB/s)
+        """
+        session_key = aes_ctr_session(int.from_bytes(os.urandom(32), 'big'), initiator=False)
+
+        request = bytes(Constants.BUFF_SIZE)
+        decrypt_buffer = bytearray(Constants.BUFF_SIZE)
+
+        start = time.perf_counter()
+        for _ in range(ServerCommunicator.BANDWIDTH_TEST_SIZE // Constants.BUFF_SIZE):
+            session_key.decrypt_into(request, decrypt_buffer)
+
+        elapsed = time.perf_counter() - start
+        return max(int(ServerCommunicator.BANDWIDTH_TEST_SIZE / 1024 / elapsed), 1)
+
     # Socket methods
     def bind_and_listen(self) -> None:
         """
@@ -63,14 +106,16 @@ class ServerCommunicator:
             client_thread.start()
 
     @staticmethod
-    def __receive_request(client_socket: socket.socket) -> str | None:
+    def __receive_request(client_socket: socket.socket, buffer: bytearray) -> memoryview | None:
         """
-        Function receives data from the client socket
+        Function receives data from the client socket into the given buffer
         :param client_socket: socket of the client to receive data
-        :return: None if error occurs | else - tuple by this struct: time, command, data
+        :param buffer: [reference] buffer of the connection to receive data to
+        :return: None if error occurs | else - view of the received bytes in the buffer
         """
         try:
-            request_info = client_socket.recv(Constants.BUFF_SIZE).decode()
+            size = client_socket.recv_into(buffer)
+            request_info = memoryview(buffer)[:size]
             Constants.print_message(False, False, client_socket, request_info)
 
             return request_info
@@ -79,15 +124,15 @@ class ServerCommunicator:
             return None
 
     @staticmethod
-    def __send_response(client_socket: socket.socket, response: str) -> bool:
+    def __send_response(client_socket: socket.socket, response: bytes) -> bool:
         """
         Function sends request to the client
         :param client_socket: socket of the client to send data
-        :param response: response to send to the client
+        :param response: response to send to the client (raw bytes)
         :return: False if error occurs | else - True
         """
         try:
-            client_socket.sendall(response.encode())
+            client_socket.sendall(response)
             Constants.print_message(False, True, client_socket, response)
 
             return True
@@ -95,7 +140,7 @@ class ServerCommunicator:
         except socket.error:
             return False
 
-    def __pass_command(self, curr_client: socket.socket, request: str) -> None:
+    def __pass_command(self, curr_client: socket.socket, request: memoryview) -> None:
         """
         Function passes the request to the next node if possible
         :param curr_client: current socket of the client
@@ -104,7 +149,7 @@ class ServerCommunicator:
         with self.__next_mutex:
             self.__nexts[curr_client].send_request(request)
             response = self.__nexts[curr_client].receive_response()
-            response_encrypted = self.__session_keys[curr_client].encrypt(response)
+            response_encrypted = self.__session_keys[curr_client].encrypt_bytes(response)
             self.__send_response(curr_client, response_encrypted)
 
     def __handle_new_client(self, client_socket: socket.socket) -> None:
@@ -112,9 +157,18 @@ class ServerCommunicator:
         Function handles clients requests, and sends responses
         :param client_socket: current client socket to make conversation
         """
+        # Buffers of the connection - received data and decrypted data
+        receive_buffer = bytearray(Constants.BUFF_SIZE)
+        decrypt_buffer = bytearray(Constants.BUFF_SIZE)
+
         while True:
             try:
-                request = ServerCommunicator.__receive_request(client_socket)
+                # Prepare keystream of the next request while waiting for it
+                session_key = self.__session_keys.get(client_socket)
+                if session_key is not None:
+                    session_key.precompute()
+
+                request = ServerCommunicator.__receive_request(client_socket, receive_buffer)
 
                 if request is None or len(request) == 0:
                     print("[SERVER] Client closed connection.")
@@ -122,13 +176,14 @@ class ServerCommunicator:
 
                 # If the session key that is established in the handle create has not been created yet
                 if client_socket not in self.__session_keys.keys():
-                    request_code = int(request.split('#')[0])
+                    request_code = int(request.tobytes().split(b'#')[0])
 
                     if request_code == Commands.Create.REQUEST_CODE:
-                        self.__handle_create_request(client_socket, request)
+                        self.__handle_create_request(client_socket, str(request, 'utf-8'))
                     continue
 
-                request_decoded = self.__session_keys[client_socket].decrypt(request)
+                decrypted_size = self.__session_keys[client_socket].decrypt_into(request, decrypt_buffer)
+                request_decoded = memoryview(decrypt_buffer)[:decrypted_size]
                 Constants.print_message(False, False, client_socket, request_decoded)
 
                 # If already has next just pass it to the next node
@@ -136,6 +191,8 @@ class ServerCommunicator:
                     self.__pass_command(client_socket, request_decoded)
                     continue
 
+                # Last layer of the onion - the request itself
+                request_decoded = str(request_decoded, 'utf-8')
                 request_code = int(request_decoded[0])
 
                 # Only if the session key has been created check for other commands
@@ -168,30 +225,20 @@ class ServerCommunicator:
         # Convert request to an object
         create = Commands.Create(create_request)
 
-        # DH logic
-        parameters = create.get_dh_p(), create.get_dh_g()
-        server_dh = dh(parameters)
-
-        private_dh_number = dh.generate_private_number()
-        public_dh_key = server_dh.generate_public_key(private_dh_number)
-
-        # RSA logic
-        rsa_dh_handshake = create.get_RSA_DH_handshake()
-        rsa_dh_decrypted = rsa.decrypt(rsa_dh_handshake, self.__rsa_private_key)
-
-        # Session key
-        dh_key = server_dh.exchange(rsa_dh_decrypted, private_dh_number)
+        # Handshake logic - the public number for the response and the session key
+        public_number, session_key = handshake.respond(create.get_handshake_suite(), create.get_handshake(),
+                                                       self.__rsa_private_key, self.__x25519_private_key)
 
         # Send request
-        request = Commands.Created.compose_response(create.get_id(), public_dh_key, Constants.key_hash(dh_key))
+        request = Commands.Created.compose_response(create.get_id(), public_number, Constants.key_hash(session_key))
 
         with self.__prev_mutex:
             self.__prev[create.get_id()] = client_socket
 
-        ServerCommunicator.__send_response(client_socket, request)
+        ServerCommunicator.__send_response(client_socket, request.encode())
 
         # Add new session key
-        self.__session_keys[client_socket] = aes(dh_key)
+        self.__session_keys[client_socket] = aes_ctr_session(session_key, initiator=False)
 
     def __handle_extend_request(self, client_socket: socket.socket, extend_request: str) -> None:
         """
@@ -214,20 +261,20 @@ class ServerCommunicator:
                     self.__nexts[client_socket] = client
 
             # Send request and receive response
-            create_request = Commands.Create.compose_request(extend.get_id(), extend.get_dh_p(), extend.get_dh_g(), extend.get_RSA_DH_handshake())
-            created = client.send_and_receive(create_request)
+            create_request = Commands.Create.compose_request(extend.get_id(), extend.get_handshake_suite(), extend.get_handshake())
+            created = client.send_and_receive(create_request.encode())
 
             if created:
-                created = Commands.Created(created)
+                created = Commands.Created(created.decode())
                 extended = Commands.Extended.compose_response(created.get_id(),
                                                               created.get_DH_handshake(),
                                                               created.get_key_hash())
 
-                extended_encrypted = self.__session_keys[client_socket].encrypt(extended)
+                extended_encrypted = self.__session_keys[client_socket].encrypt_bytes(extended.encode())
                 ServerCommunicator.__send_response(client_socket, extended_encrypted)
         else:
             teardown = Commands.Teardown.compose_request(extend.get_id(), ip, port)
-            teardown_encrypted = self.__session_keys[client_socket].encrypt(teardown)
+            teardown_encrypted = self.__session_keys[client_socket].encrypt_bytes(teardown.encode())
             ServerCommunicator.__send_response(client_socket, teardown_encrypted)
 
             self.__teardown(client_socket)
@@ -256,24 +303,24 @@ class ServerCommunicator:
                 stream_id = len(self.__streams[client_socket]) - 1
 
                 # Send create request to the destination and receive response
-                create_request = Commands.Create.compose_request(begin.get_id(), begin.get_dh_p(), begin.get_dh_g(), begin.get_RSA_DH_handshake())
-                created = client.send_and_receive(create_request)
+                create_request = Commands.Create.compose_request(begin.get_id(), begin.get_handshake_suite(), begin.get_handshake())
+                created = client.send_and_receive(create_request.encode())
 
                 if not created:
                     teardown = Commands.Teardown.compose_request(begin.get_id(), ip, port)
-                    teardown_encrypted = self.__session_keys[client_socket].encrypt(teardown)
+                    teardown_encrypted = self.__session_keys[client_socket].encrypt_bytes(teardown.encode())
                     ServerCommunicator.__send_response(client_socket, teardown_encrypted)
 
                     return self.__teardown(client_socket)
 
-                created = Commands.Created(created)
+                created = Commands.Created(created.decode())
 
                 connected = Commands.Connected.compose_response(begin.get_id(), stream_id, created.get_DH_handshake(), created.get_key_hash())
-                connected_encrypted = self.__session_keys[client_socket].encrypt(connected)
+                connected_encrypted = self.__session_keys[client_socket].encrypt_bytes(connected.encode())
                 ServerCommunicator.__send_response(client_socket, connected_encrypted)
         else:
             teardown = Commands.Teardown.compose_request(begin.get_id(), ip, port)
-            teardown_encrypted = self.__session_keys[client_socket].encrypt(teardown)
+            teardown_encrypted = self.__session_keys[client_socket].encrypt_bytes(teardown.encode())
             ServerCommunicator.__send_response(client_socket, teardown_encrypted)
 
             self.__teardown(client_socket)
@@ -324,7 +371,7 @@ class ServerCommunicator:
         print(f"User sent message: {data_message}", end='\n\n')
 
         confirm = Commands.Confirm.compose_response(data.get_id(), 1, data_message)
-        confirm_encrypted = self.__session_keys[client_socket].encrypt(confirm)
+        confirm_encrypted = self.__session_keys[client_socket].encrypt_bytes(confirm.encode())
         ServerCommunicator.__send_response(client_socket, confirm_encrypted)
 
     def check_for_messages(self) -> tuple[int, int, str] | None:
@@ -1,11 +1,14 @@
-# Global imports
-from queue import SimpleQueue
+# Global Imports
+from collections.abc import Iterable
 
 # Project Imports
 from Client import Client
 from Server import Server
 
-from Encryptions.AES import aes
+from Encryptions.AES import aes_ctr_session
+from Encryptions.Handshake import handshake
+from Encryptions.KeyStore import keystore
+from Encryptions.OnionCipher import OnionCipher
 from Encryptions.RSA import rsa
 
 from Constants import Constants
@@ -19,82 +22,76 @@ class User:
     Class represents every program real user. It contains server and client part.
     """
 
-    def __init__(self, server_port: int, username: str, password: str):
+    def __init__(self, server_port: int, username: str, password: str, keystore_path: str = None,
+                 handshake_suites: tuple[str, ...] = None, bandwidth: int = None):
         """
         Constructor that runs server and creates client
         :param server_port: Port of server to be opened of current user
         :param username: user's entered username
         :param password: user's entered password
+        :param keystore_path: directory of the RSA keys of the users (None - see keystore)
+        :param handshake_suites: handshake suites of the user, in the preference order (None - see handshake)
+        :param bandwidth: bandwidth of the user as a relay, KB/s (None - measured)
         """
         self.__username: str = username
         self.__password: str = Constants.str_hash(password)         # Hash password
         self.__server_port = server_port
 
-        # Init rsa keys
-        self.__rsa = rsa()
+        # Handshake suites - offered by the server part and used by the client part
+        self.__handshake_suites = handshake.get_default_suites() if (handshake_suites is None) \
+            else handshake.check_suites(handshake_suites)
+
+        # The directory server chooses the relays by their bandwidths (measured before the keys generation loads the CPU)
+        if bandwidth is None:
+            bandwidth = Server.measure_bandwidth()
+
+        # Init rsa keys - the stored key pair of the user, generated (in the worker processes) only on the first start
+        rsa_keystore = keystore(keystore_path)
+        self.__rsa = rsa_keystore.load(self.__username)
+        rsa_future = rsa.generate_async() if self.__rsa is None else None
+
+        # While the keys are generated - run user's server part (nobody connects before the user is appended) and
+        # connect to the directory server
+        self.__server: Server = Server(server_port, handshake_suites=self.__handshake_suites)
+        self.__server.run()
 
-        # Add user to db request
         self.__directory_server = DirectoryServerCommunicator()
+        self.__directory_server.connect()
+
+        if rsa_future is not None:
+            self.__rsa = rsa_future.result()
+            rsa_keystore.save(self.__username, self.__rsa)
+
+        self.__server.set_rsa_private_key(self.__rsa.get_private_key())
+
+        # The static X25519 key is published only if the user offers the x25519 suite
+        x25519_public_key = None
+        if handshake.X25519 in self.__handshake_suites:
+            x25519_public_key = handshake.get_static_public_key(self.__rsa.get_private_key())
+
+        # Add user to db request
         append_result = self.__directory_server.append(username=self.__username,
                                                        password=self.__password,
                                                        rsa_public_key=self.__rsa.get_public_key(),
                                                        ip=Constants.IP,
                                                        port=self.__server_port,
-                                                       allow_be_exit_node=True)
+                                                       allow_be_exit_node=True,
+                                                       x25519_public_key=x25519_public_key,
+                                                       bandwidth=bandwidth,
+                                                       connect=False)
 
         if not append_result:
             raise Exception('Error adding user to database')
 
-        # Run user's server part
-        self.__server: Server = Server(server_port, self.__rsa.get_private_key())
-        self.__server.run()
-
         # Create user's client part
         self.__client: Client = None
 
         # User's data
         self.__circuits: dict[int, list[str]] = {}              # { circuit_id: [address1, address2, address3, ...] }
         self.__connected_users: dict[int, str] = {}             # { circuit_id: username }
-        self.__session_keys: dict[str, dict[int, aes]] = {}     # { address: { circuit_id: aes } }
+        self.__onions: dict[int, OnionCipher] = {}              # { circuit_id: onion layers of the circuit }
         self.__streams: dict[str, int] = {}                     # { address: stream_id }
 
-    def __insert_session_key(self, user_ip: str, circuit_id: int, aes_key: aes) -> None:
-        """
-        Method inserts to the list of session keys the current session key (by user ip and circuit id)
-        :param user_ip: ip of the user that uses session key
-        :param circuit_id: circuit id where session key used
-        :param aes_key: add session key of specific user to our list of session keys
-        """
-        user_keys = self.__session_keys.setdefault(user_ip, {})
-        user_keys[circuit_id] = aes_key
-
-    def __get_session_key(self, user_address: str, circuit_id: int) -> aes | None:
-        """
-        Method gives the session keys (by user ip and circuit id)
-        :param user_address: ip and port of the user that uses session key
-        :param circuit_id: circuit id where session key used
-        :return: None - in case where there is no session key | AES-key - in case if exist
-        """
-        user_keys = self.__session_keys.get(user_address)
-        return None if (not user_keys) else user_keys.get(circuit_id)
-
-    def __make_session_keys_queue(self, users_addresses: list[str], circuit_id: int) -> SimpleQueue[aes]:
-        """
-        Method makes queue of the session keys (to encrypt and decrypt by chain)
-        :param users_addresses: list of users addresses (ip and port)
-        :param circuit_id: current circuit id
-        :return: Queue of the session keys to yse
-        """
-        aes_queue = SimpleQueue()
-
-        for address in reversed(users_addresses):
-            aes_key = self.__get_session_key(address, circuit_id)
-
-            if aes_key is not None:
-                aes_queue.put(aes_key)
-
-        return aes_queue
-
     def __is_already_constructed(self, destination_username: str) -> str | None:
         """
         Method checks if circuit to the destination username is already constructed
@@ -153,7 +150,8 @@ class User:
 
         # Connect user client to the first node
         ip_0, port_0 = Constants.ip_and_port(users[0])
-        self.__client = Client(circuit_id=circuit_id, server_ip=ip_0, server_port=port_0)
+        self.__client = Client(circuit_id=circuit_id, server_ip=ip_0, server_port=port_0,
+                               handshake_suites=self.__handshake_suites)
 
         # address_0 is off - send request to the directory server
         if not self.__client.connect():
@@ -162,13 +160,14 @@ class User:
 
         # Create circuit command. Get SK of entry node
         dh_0 = self.__client.create()
-        self.__insert_session_key(users[0], circuit_id, aes(dh_0))
+        onion = OnionCipher([aes_ctr_session(dh_0, initiator=True)])
+        self.__onions[circuit_id] = onion
 
         # Start from second node (not entry)
         for address in users[1:]:
 
             # Send extend request to extend the circuit
-            response = self.__client.extend(address, self.__make_session_keys_queue(users, circuit_id))
+            response = self.__client.extend(address, onion)
 
             # If extend response caused a teardown
             if self.__check_teardown(response, circuit_id):
@@ -176,12 +175,12 @@ class User:
 
             # SK of the middle nodes
             dh_node = response
-            self.__insert_session_key(address, circuit_id, aes(dh_node))
+            onion.add_layer(aes_ctr_session(dh_node, initiator=True))
 
         # Begin circuit and get SK exit node
         response = self.__client.begin(self.__client.get_circId(),
                                        destination_address,
-                                       self.__make_session_keys_queue(users, circuit_id))
+                                       onion)
 
         # If begin response caused a teardown
         if self.__check_teardown(response, circuit_id):
@@ -190,7 +189,7 @@ class User:
         stream, dh_destination = response
 
         self.__streams[destination_address] = stream
-        self.__insert_session_key(destination_address, circuit_id, aes(dh_destination))
+        onion.add_layer(aes_ctr_session(dh_destination, initiator=True))
 
         # Mark current username as already connected
         self.__connected_users[circuit_id] = destination_username
@@ -217,11 +216,35 @@ class User:
                 circuit_id = self.__client.get_circId()
                 print(circuit_id)
 
-                aes_keys = self.__make_session_keys_queue(users_chain, circuit_id)
-                result = self.__client.data(circuit_id, self.__streams[address], data, aes_keys)
+                result = self.__client.data(circuit_id, self.__streams[address], data, self.__onions[circuit_id])
 
                 print("[DATA SENT]: Successfully" if result else "[DATA ERROR]: Error sending data")
 
+    def send_stream(self, chunks: Iterable[str], address: str) -> None:
+        """
+        Function sends a large data (for example, a file read by Constants.text_chunks) from current user to the
+        destination user using Onion Routing, chunk by chunk
+        :param chunks: Chunks of the data to send, at most Constants.DATA_CHUNK_SIZE bytes each
+        :param address: address (ip and port) of the destination user
+        """
+        if self.__client is None:
+            print("[User Error] Client is None")
+            return
+
+        if not isinstance(self.__client, Client):
+            print("[User Error] Client error")
+            return
+
+        for users_chain in self.__circuits.values():
+            if users_chain[-1] == address:
+                circuit_id = self.__client.get_circId()
+
+                result = self.__client.data_stream(circuit_id, self.__streams[address], chunks,
+                                                   self.__onions[circuit_id])
+
+                print("[DATA SENT]: Successfully" if result else "[DATA ERROR]: Error sending data")
+                return
+
     def __get_circuit(self, destination_username: str) -> tuple[int, list[str]]:
         """
         Function connects to the DirectoryServer and asks for the `n` nodes for TOR circuit \n
@@ -248,24 +271,24 @@ class User:
         Method clears current session by circuit id
         :param circuit_id: current circuit id
         """
-        users = self.__circuits[circuit_id]
-
-        for user in users:
-            if user in self.__session_keys.keys():
-                self.__session_keys.pop(user)
-
+        self.__onions.pop(circuit_id, None)
         self.__circuits.pop(circuit_id)
 
     def end_connection(self) -> None:
         """
-        Method ends client connection. And clears data
+        Method ends client connection. And clears data, and tells the directory server that the circuit is finished
         """
         circuit_id = self.__client.get_circId()
         circuit = self.__circuits[circuit_id]
-        stream_id = self.__streams[circuit[-1]]
-        aes_list = [self.__get_session_key(user, circuit_id) for user in reversed(circuit)]
+        stream_id = self.__streams.pop(circuit[-1])
+
+        self.__client.end(circuit_id, stream_id, self.__onions[circuit_id])
 
-        self.__client.end(circuit_id, stream_id, aes_list)
+        self.__connected_users.pop(circuit_id, None)
+        self.__clear_sessions(circuit_id)
+
+        self.__directory_server = DirectoryServerCommunicator()
+        self.__directory_server.send_close(circuit_id)
 
     def destroy(self) -> None:
         """
@@ -0,0 +1,45 @@
+# Imports
+import argparse
+import os
+
+from common import add_tree_path, measure
+
+
+# Functions
+def main():
+    """
+    Benchmark of the batch AES: blocks per second for N blocks per call, one key and a key per block
+    """
+    parser = argparse.ArgumentParser(description='Batch AES benchmark')
+    parser.add_argument('--tree', default='TOR', help='tree to benchmark: TOR or DirectoryServer')
+    parser.add_argument('--circuits', type=int, default=64, help='count of different keys in the mixed batches')
+    arguments = parser.parse_args()
+
+    add_tree_path(arguments.tree)
+    from Encryptions.AES import aes, np
+
+    print(f"NumPy backend: {'on' if np is not None else 'off (pure Python fallback)'}")
+
+    keys = [aes(int.from_bytes(os.urandom(256), 'big')) for _ in range(arguments.circuits)]
+
+    for count in (1, 64, 4096):
+        blocks = [os.urandom(16) for _ in range(count)]
+        mixed_keys = [keys[i % len(keys)] for i in range(count)]
+
+        # Per block on the default engine (the way the relays work today)
+        def per_block():
+            for block, key in zip(blocks, mixed_keys):
+                key.encrypt_bytes(block)
+
+        per_block_time = measure(per_block)
+        single_time = measure(lambda: aes.encrypt_batch(blocks, keys[0]))
+        mixed_time = measure(lambda: aes.encrypt_batch(blocks, mixed_keys))
+
+        print(f"N = {count:>5} | per block: {count / per_block_time:>12,.0f} blocks/s | "
+              f"batch, one key: {count / single_time:>12,.0f} blocks/s | "
+              f"batch, key per block: {count / mixed_time:>12,.0f} blocks/s")
+
+
+# Program start
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,50 @@
+# Imports
+import argparse
+import os
+
+from common import add_tree_path, measure
+
+
+# Constants
+BATCH_SIZES = (1, 8, 32, 64, 128, 256, 1024, 4096)
+
+
+# Functions
+def main():
+    """
+    Benchmark of the bitsliced engine: blocks per second against the per block table engine for growing batches -
+    shows the batch size from which the bitsliced engine is faster (tests/test_aes_engines.py checks its outputs)
+    """
+    parser = argparse.ArgumentParser(description='Bitsliced AES benchmark')
+    parser.add_argument('--tree', default='TOR', help='tree to benchmark: TOR or DirectoryServer')
+    arguments = parser.parse_args()
+
+    add_tree_path(arguments.tree)
+    from Encryptions.AES import aes
+
+    dh_key = int.from_bytes(os.urandom(256), 'big')
+    table, bitsliced = aes(dh_key, 'table'), aes(dh_key, 'bitslice')
+    crossover = None
+
+    for blocks_count in BATCH_SIZES:
+        data = os.urandom(16 * blocks_count)
+
+        table_speed = blocks_count / measure(lambda: table.encrypt_bytes(data))
+        bitsliced_speed = blocks_count / measure(lambda: bitsliced.encrypt_bytes(data))
+
+        if crossover is None and bitsliced_speed > table_speed:
+            crossover = blocks_count
+
+        print(f"N = {blocks_count:>5} | table: {table_speed:>10,.0f} blocks/s | "
+              f"bitslice: {bitsliced_speed:>10,.0f} blocks/s | x{bitsliced_speed / table_speed:5.2f}")
+
+    if crossover is None:
+        print("Bitsliced engine is slower at every measured batch size")
+    else:
+        print(f"Bitsliced engine is faster from {crossover} blocks per call "
+              f"(batch threshold aes.BITSLICE_BATCH_SIZE = {aes.BITSLICE_BATCH_SIZE})")
+
+
+# Program start
+if __name__ == "__main__":
+    main()
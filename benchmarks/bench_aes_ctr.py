@@ -0,0 +1,69 @@
+# Imports
+import argparse
+import os
+
+from common import add_tree_path, measure
+
+
+# Functions
+def main():
+    """
+    Benchmark of the CTR onion layers against ECB layers: size growth per hop and throughput
+    """
+    parser = argparse.ArgumentParser(description='CTR onion layers benchmark')
+    parser.add_argument('--tree', default='TOR', help='tree to benchmark: TOR or DirectoryServer')
+    parser.add_argument('--hops', type=int, default=3, help='count of the onion layers')
+    arguments = parser.parse_args()
+
+    add_tree_path(arguments.tree)
+    from Encryptions.AES import aes, aes_ctr_session
+
+    dh_keys = [int.from_bytes(os.urandom(256), 'big') for _ in range(arguments.hops)]
+    ecb_layers = [aes(dh_key) for dh_key in dh_keys]
+    ctr_layers = [aes_ctr_session(dh_key, initiator=True) for dh_key in dh_keys]
+
+    for payload_size in (10, 100, 1000, 8000):
+        payload = os.urandom(payload_size)
+
+        ecb_sizes, data = [], payload
+        for layer in ecb_layers:
+            data = layer.encrypt_bytes(data)
+            ecb_sizes.append(len(data))
+
+        ctr_sizes, data = [], payload
+        for layer in ctr_layers:
+            data = layer.encrypt_bytes(data)
+            ctr_sizes.append(len(data))
+
+        def ecb_wrap():
+            wrapped = payload
+            for ecb_layer in ecb_layers:
+                wrapped = ecb_layer.encrypt_bytes(wrapped)
+
+        def ctr_wrap(precompute: bool):
+            if precompute:
+                for ctr_layer in ctr_layers:
+                    ctr_layer.precompute(payload_size)
+
+            wrapped = payload
+            for ctr_layer in ctr_layers:
+                wrapped = ctr_layer.encrypt_bytes(wrapped)
+
+        # Precomputation happens in the idle time, so only the update itself is on the critical path
+        def ctr_wrap_precomputed():
+            for ctr_layer in ctr_layers:
+                ctr_layer.precompute(payload_size)
+            return measure(lambda: ctr_wrap(False), repeat=1)
+
+        ecb_time = measure(ecb_wrap)
+        ctr_time = measure(lambda: ctr_wrap(False))
+        ctr_precomputed_time = min(ctr_wrap_precomputed() for _ in range(3))
+
+        print(f"payload {payload_size:>5} B | ECB sizes per layer {ecb_sizes} {ecb_time * 1000:7.2f} ms | "
+              f"CTR sizes per layer {ctr_sizes} {ctr_time * 1000:7.2f} ms, "
+              f"precomputed {ctr_precomputed_time * 1000:7.3f} ms")
+
+
+# Program start
+if __name__ == "__main__":
+    main()
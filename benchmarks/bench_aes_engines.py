@@ -0,0 +1,42 @@
+# Imports
+import argparse
+import os
+
+from common import add_tree_path, measure
+
+
+# Functions
+def main():
+    """
+    Benchmark of the AES block engines: blocks per second of every engine, encryption and decryption
+    """
+    parser = argparse.ArgumentParser(description='AES engines benchmark')
+    parser.add_argument('--tree', default='TOR', help='tree to benchmark: TOR or DirectoryServer')
+    parser.add_argument('--blocks', type=int, default=2048, help='count of 16 bytes blocks per run')
+    arguments = parser.parse_args()
+
+    add_tree_path(arguments.tree)
+    from Encryptions.AES import aes
+
+    plain_text = os.urandom(16 * arguments.blocks).decode('latin-1')
+    dh_key = int.from_bytes(os.urandom(256), 'big')
+
+    reference = aes(dh_key, 'matrix').encrypt(plain_text)
+
+    for engine in aes.ENGINES:
+        cipher = aes(dh_key, engine)
+        encrypted = cipher.encrypt(plain_text)
+
+        if encrypted != reference or cipher.decrypt(encrypted) != plain_text.rstrip(chr(0)):
+            raise AssertionError(f"Engine {engine} output differs from the reference engine")
+
+        encrypt_time = measure(lambda: cipher.encrypt(plain_text))
+        decrypt_time = measure(lambda: cipher.decrypt(encrypted))
+
+        print(f"{engine:>8}: encrypt {arguments.blocks / encrypt_time:>12,.0f} blocks/s | "
+              f"decrypt {arguments.blocks / decrypt_time:>12,.0f} blocks/s")
+
+
+# Program start
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,42 @@
+# Imports
+import argparse
+import os
+
+from common import add_tree_path, measure
+
+
+# Functions
+def main():
+    """
+    Benchmark of the aes construction: new key every time (cache miss) vs the same key again (cache hit)
+    """
+    parser = argparse.ArgumentParser(description='AES key schedule cache benchmark')
+    parser.add_argument('--tree', default='TOR', help='tree to benchmark: TOR or DirectoryServer')
+    parser.add_argument('--count', type=int, default=500, help='count of keys (fits the cache by default)')
+    arguments = parser.parse_args()
+
+    add_tree_path(arguments.tree)
+    from Encryptions.AES import aes
+
+    dh_keys = [int.from_bytes(os.urandom(256), 'big') for _ in range(arguments.count)]
+
+    for engine in aes.ENGINES:
+        def construct_all():
+            aes.clear_key_cache()
+            for dh_key in dh_keys:
+                aes(dh_key, engine)
+
+        def construct_again():
+            for dh_key in dh_keys:
+                aes(dh_key, engine)
+
+        miss_time = measure(construct_all)
+        hit_time = measure(construct_again)
+
+        print(f"{engine:>8}: miss {miss_time / arguments.count * 1e6:8.1f} us | "
+              f"hit {hit_time / arguments.count * 1e6:8.1f} us | stats {aes.get_key_cache_stats()}")
+
+
+# Program start
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+# Imports
+import argparse
+import gc
+import os
+import tracemalloc
+
+from common import add_tree_path
+
+
+# Constants
+INSTANCES_COUNT = 1000
+
+
+# Functions
+def report(name: str, create) -> None:
+    """
+    Function creates the live instances and prints the memory they hold
+    :param name: name of the case
+    :param create: function that creates one instance by its index
+    """
+    gc.collect()
+    objects_before = len(gc.get_objects())
+
+    tracemalloc.start()
+    snapshot_before = tracemalloc.take_snapshot()
+
+    instances = [create(index) for index in range(INSTANCES_COUNT)]
+
+    snapshot_after = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+
+    gc.collect()
+    objects_count = len(gc.get_objects()) - objects_before
+
+    size = sum(stat.size_diff for stat in snapshot_after.compare_to(snapshot_before, 'filename'))
+    blocks = sum(stat.count_diff for stat in snapshot_after.compare_to(snapshot_before, 'filename'))
+
+    print(f"{name:<40} | {size / 1024:9.1f} KiB | {blocks:7} allocations | {objects_count:7} GC tracked objects "
+          f"(per {len(instances)} instances)")
+
+
+def main():
+    """
+    Memory report of the aes: tracemalloc size, allocations and GC tracked objects per 1000 live instances
+    """
+    parser = argparse.ArgumentParser(description='AES memory report')
+    parser.add_argument('--tree', default='TOR', help='tree to report: TOR or DirectoryServer')
+    arguments = parser.parse_args()
+
+    add_tree_path(arguments.tree)
+    from Encryptions.AES import aes, aes_ctr_session
+
+    dh_keys = [int.from_bytes(os.urandom(256), 'big') for _ in range(INSTANCES_COUNT)]
+
+    for engine in aes.ENGINES:
+        # Every instance has its own key - every key schedule is expanded and kept (the cache is off)
+        aes.set_key_cache_size(0)
+        report(f"aes '{engine}', unique keys, no cache", lambda index: aes(dh_keys[index], engine))
+
+        # Every instance has its own key, the schedules are held by the cache too
+        aes.set_key_cache_size(aes.KEY_CACHE_SIZE)
+        aes.clear_key_cache()
+        report(f"aes '{engine}', unique keys, cached", lambda index: aes(dh_keys[index], engine))
+
+    aes.clear_key_cache()
+    report("aes_ctr_session, unique keys", lambda index: aes_ctr_session(dh_keys[index], initiator=True))
+
+
+# Program start
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,65 @@
+# Imports
+import argparse
+import os
+
+from common import add_tree_path, measure
+
+
+# Functions
+def main():
+    """
+    Benchmark of the process pool AES: throughput against payload size and worker count (to find the crossover)
+    """
+    parser = argparse.ArgumentParser(description='Process pool AES benchmark')
+    parser.add_argument('--tree', default='TOR', help='tree to benchmark: TOR or DirectoryServer')
+    parser.add_argument('--sizes', type=int, nargs='+', default=[16 * 1024, 64 * 1024, 256 * 1024, 1024 * 1024],
+                        help='payload sizes (bytes)')
+    parser.add_argument('--workers', type=int, nargs='+', default=sorted({1, 2, 4, os.cpu_count() or 1}),
+                        help='counts of the worker processes')
+    parser.add_argument('--mode', default='ctr', choices=('ecb', 'ctr'), help='mode to benchmark')
+    parser.add_argument('--repeat', type=int, default=2, help='runs per measurement (the best is taken)')
+    arguments = parser.parse_args()
+
+    add_tree_path(arguments.tree)
+    from Encryptions.AES import aes, aes_pool
+
+    cipher = aes(int.from_bytes(os.urandom(256), 'big'))
+    stream = cipher.ctr()
+
+    print(f"cores: {os.cpu_count()} | mode: {arguments.mode}")
+
+    pools = {}
+    for workers in arguments.workers:
+        # Threshold 0 - every payload goes to the workers, so the crossover is visible
+        pools[workers] = aes_pool(workers=workers, threshold=0, chunk_size=4096)
+
+        # Start the workers (and fill their key caches) before the measurements
+        pools[workers].update(stream, bytes(4096 * workers))
+
+    for size in arguments.sizes:
+        payload = os.urandom(size)
+
+        if arguments.mode == 'ecb':
+            serial_time = measure(lambda: cipher.encrypt_bytes(payload), arguments.repeat)
+        else:
+            serial_time = measure(lambda: stream.update(payload), arguments.repeat)
+
+        results = [f"serial {size / serial_time / 2 ** 20:6.2f} MB/s"]
+
+        for workers, pool in pools.items():
+            if arguments.mode == 'ecb':
+                pool_time = measure(lambda: pool.encrypt_bytes(cipher, payload), arguments.repeat)
+            else:
+                pool_time = measure(lambda: pool.update(stream, payload), arguments.repeat)
+
+            results.append(f"{workers} workers {size / pool_time / 2 ** 20:6.2f} MB/s")
+
+        print(f"payload {size:>8} B | " + ' | '.join(results))
+
+    for pool in pools.values():
+        pool.shutdown()
+
+
+# Program start
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,189 @@
+# Imports
+import argparse
+import contextlib
+import os
+import resource
+import socket
+import subprocess
+import sys
+import threading
+
+from common import add_tree_path
+
+
+# Constants
+MEGABYTE = 1024 * 1024
+
+
+# Classes
+class TextSource:
+    """
+    Binary file like source of random text of the given size - generated on read, never held in memory
+    """
+
+    def __init__(self, size: int):
+        """
+        Constructor of the source
+        :param size: total size of the text (bytes)
+        """
+        self.__left = size
+        self.__block = bytes(ord('a') + byte % 26 for byte in os.urandom(4096))
+
+    def read(self, size: int) -> bytes:
+        """
+        Reads the next bytes of the text
+        :param size: maximal count of the bytes to read
+        :return: the bytes (empty at the end)
+        """
+        size = min(size, self.__left, len(self.__block))
+        self.__left -= size
+
+        return self.__block[:size]
+
+
+# Functions
+def generate_chunks(size: int, chunk_size: int):
+    """
+    Function gives the data of the given size chunk by chunk (like reading it from a file)
+    :param size: total size of the data (bytes)
+    :param chunk_size: size of one chunk (bytes)
+    :return: generator of the chunks
+    """
+    chunk = os.urandom(chunk_size)
+
+    for start in range(0, size, chunk_size):
+        yield chunk[:size - start]
+
+
+def get_peak_rss() -> int:
+    """
+    Function gives the peak resident memory of the process
+    :return: the peak resident memory (KB)
+    """
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+
+def run_relay(server: socket.socket, layers: list) -> None:
+    """
+    Function plays all the hops of the circuit in one socket: peels the onion layers of every data request and sends
+    back the confirm wrapped by every hop
+    :param server: listening socket of the entry node
+    :param layers: session keys of the hops (relay side), from the entry node to the last node
+    """
+    from Commands import Commands
+
+    connection, _ = server.accept()
+
+    with connection:
+        while request := connection.recv(16 * 1024):
+            for layer in layers:
+                request = layer.decrypt_bytes(request)
+
+            data = Commands.Data(request.decode())
+            response = Commands.Confirm.compose_response(data.get_id(), 1, data.get_data()).encode()
+
+            for layer in reversed(layers):
+                response = layer.encrypt_bytes(response)
+            connection.sendall(response)
+
+
+def stream_through_circuit(size: int, hops: int) -> bool:
+    """
+    Function sends the data through ClientCommunicator and a local onion circuit chunk by chunk
+    :param size: total size of the data (bytes)
+    :param hops: count of the hops of the circuit
+    :return: True - if every chunk was confirmed
+    """
+    from ClientCommunicator import ClientCommunicator
+    from Constants import Constants
+    from Encryptions.AES import aes_ctr_session
+    from Encryptions.OnionCipher import OnionCipher
+
+    dh_keys = [int.from_bytes(os.urandom(256), 'big') for _ in range(hops)]
+    onion = OnionCipher([aes_ctr_session(dh_key, initiator=True) for dh_key in dh_keys])
+    relay_layers = [aes_ctr_session(dh_key, initiator=False) for dh_key in dh_keys]
+
+    server = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    server.bind(('127.0.0.1', 0))
+    server.listen()
+    relay = threading.Thread(target=run_relay, args=(server, relay_layers), daemon=True)
+    relay.start()
+
+    communicator = ClientCommunicator(1, server.getsockname()[1], '127.0.0.1')
+    communicator.connect()
+
+    # Every message is printed by the communicator - silence it
+    with open(os.devnull, 'w') as null, contextlib.redirect_stdout(null):
+        result = communicator.data_stream(1, 1, Constants.text_chunks(TextSource(size)), onion)
+
+    communicator.disconnect()
+    relay.join()
+    server.close()
+
+    return result
+
+
+def run_case(arguments) -> None:
+    """
+    Function runs one transfer in this process and prints the growth of the peak resident memory (the peak of a fresh
+    process - so every case runs in its own process)
+    :param arguments: arguments of the benchmark
+    """
+    add_tree_path(arguments.tree)
+    from Encryptions.AES import aes
+
+    size = int(arguments.case_size * MEGABYTE)
+    cipher = aes(int.from_bytes(os.urandom(256), 'big'))
+
+    def run(transfer_size: int) -> bool:
+        if arguments.case == 'circuit':
+            return stream_through_circuit(transfer_size, arguments.hops)
+
+        for _ in cipher.decrypt_stream(cipher.encrypt_stream(generate_chunks(transfer_size, arguments.chunk_size))):
+            pass
+        return True
+
+    # Warm up - imports and the first allocations of the code path are not the memory of the transfer
+    run(2 * arguments.chunk_size)
+
+    before = get_peak_rss()
+    result = run(size)
+    print(get_peak_rss() - before, result)
+
+
+def main():
+    """
+    Benchmark of the streaming encryption: the peak memory of a transfer doesn't grow with its size (bounded by the
+    chunk size)
+    """
+    parser = argparse.ArgumentParser(description='Streaming AES memory benchmark')
+    parser.add_argument('--tree', default='TOR', help='tree to benchmark: TOR or DirectoryServer')
+    parser.add_argument('--sizes', type=float, nargs='+', default=[0.5, 2.0],
+                        help='transfer sizes (MB), 100 for the full transfer (slow in pure Python)')
+    parser.add_argument('--chunk-size', type=int, default=64 * 1024, help='chunk size of the aes stream (bytes)')
+    parser.add_argument('--hops', type=int, default=3, help='count of the hops of the circuit')
+    parser.add_argument('--case', choices=('aes', 'circuit'), help=argparse.SUPPRESS)
+    parser.add_argument('--case-size', type=float, help=argparse.SUPPRESS)
+    arguments = parser.parse_args()
+
+    if arguments.case:
+        return run_case(arguments)
+
+    # The circuit is of the client tree only
+    cases = ('aes', 'circuit') if arguments.tree == 'TOR' else ('aes',)
+
+    for case in cases:
+        for megabytes in arguments.sizes:
+            command = [sys.executable, os.path.abspath(__file__), '--tree', arguments.tree, '--case', case,
+                       '--case-size', str(megabytes), '--chunk-size', str(arguments.chunk_size),
+                       '--hops', str(arguments.hops)]
+            growth, result = subprocess.run(command, capture_output=True, text=True, check=True).stdout.split()
+
+            name = 'aes.encrypt_stream + decrypt_stream' if case == 'aes' else \
+                f'ClientCommunicator.data_stream, {arguments.hops} hops'
+            print(f"{name:<42} {megabytes:>8.2f} MB: peak memory growth {int(growth):>7,} KB, ok: {result}")
+
+
+# Program start
+if __name__ == "__main__":
+    main()
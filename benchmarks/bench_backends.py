@@ -0,0 +1,54 @@
+# Imports
+import argparse
+import os
+import random
+
+from common import add_tree_path, measure
+
+
+# Functions
+def main():
+    """
+    Benchmark of the crypto backends against each other (tests/test_backends.py checks that they produce identical
+    outputs)
+    """
+    parser = argparse.ArgumentParser(description='Crypto backends benchmark')
+    parser.add_argument('--tree', default='TOR', help='tree to benchmark: TOR or DirectoryServer')
+    parser.add_argument('--keygen', action='store_true', help='also benchmark the RSA key generation (slow)')
+    arguments = parser.parse_args()
+
+    add_tree_path(arguments.tree)
+    from Encryptions.Backend import backend
+    from Encryptions.AES import aes
+    from Encryptions.DH import dh
+    from Encryptions.RSA import rsa
+
+    print(f"backends: {', '.join(backend.BACKENDS)} | default: {backend.DEFAULT_BACKEND}")
+
+    p, g = dh.generate_parameters()
+    private_number = dh.generate_private_number()
+    n = backend.get().generate_prime(2048, rsa.PUBLIC_EXPONENT) * backend.get().generate_prime(2048, rsa.PUBLIC_EXPONENT)
+    exponent = random.getrandbits(4096) % n
+    message = os.urandom(8000)
+
+    for name in backend.BACKENDS:
+        backend.set(name)
+        current = backend.get()
+        cipher = aes(random.getrandbits(2048))
+
+        results = [
+            f"dh power {measure(lambda: dh((p, g)).generate_public_key(private_number)) * 1000:7.2f} ms",
+            f"rsa decrypt {measure(lambda: current.power(12345, exponent, n)) * 1000:7.2f} ms",
+            f"prime 1024 {measure(lambda: current.generate_prime(1024, rsa.PUBLIC_EXPONENT)) * 1000:8.2f} ms",
+            f"aes 8 KB {measure(lambda: cipher.encrypt_bytes(message)) * 1000:7.2f} ms"
+        ]
+
+        if arguments.keygen:
+            results.append(f"rsa keygen {measure(rsa, repeat=1):6.2f} s")
+
+        print(f"{name:>12} | " + ' | '.join(results))
+
+
+# Program start
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+# Imports
+import argparse
+import os
+import random
+import statistics
+import tempfile
+
+from common import add_tree_path
+
+
+# Constants
+# Classes of the relays: (share of the relays, bandwidth KB/s) - home nodes, ordinary nodes and fast nodes
+RELAY_CLASSES = ((0.5, 100), (0.35, 1000), (0.15, 10000))
+
+
+# Functions
+def throughputs(paths: list[list[str]], bandwidths: dict[str, int]) -> list[float]:
+    """
+    Function gives the throughput of every circuit when all the circuits transfer together: every relay shares its
+    bandwidth equally between its circuits, and a circuit is as fast as its slowest share
+    :param paths: the relays of every circuit
+    :param bandwidths: the bandwidth of every relay (KB/s)
+    :return: the throughput of every circuit (KB/s)
+    """
+    loads = {}
+    for path in paths:
+        for relay in path:
+            loads[relay] = loads.get(relay, 0) + 1
+
+    return [min(bandwidths[relay] / loads[relay] for relay in path) for path in paths]
+
+
+def main():
+    """
+    Simulation of the aggregate throughput of the circuits over relays of different bandwidths - relays chosen
+    uniformly against relays chosen by the bandwidths (get_circuit)
+    """
+    parser = argparse.ArgumentParser(description='Bandwidth weighted relay selection simulation')
+    parser.add_argument('--relays', type=int, default=500, help='count of the relays')
+    parser.add_argument('--circuits', type=int, default=2000, help='count of the circuits that transfer together')
+    arguments = parser.parse_args()
+
+    add_tree_path('DirectoryServer')
+    import DirectoryServer          # Adds the paths of the directory server modules
+    from DataBaseManager.DataBase import DataBase
+    from DataBaseManager.DataBaseUser import DataBaseUser
+
+    generator = random.Random(31337)
+    random.seed(31337)
+
+    with tempfile.TemporaryDirectory() as directory:
+        db = DataBase(os.path.join(directory, 'db', 'TOR_DB.db'))
+
+        bandwidths = {}
+        for index in range(arguments.relays):
+            bandwidth = generator.choices([bandwidth for _, bandwidth in RELAY_CLASSES],
+                                          [share for share, _ in RELAY_CLASSES])[0]
+
+            bandwidths[f"relay{index}"] = bandwidth
+            db.add_user(DataBaseUser(f"relay{index},password,65537,{generator.getrandbits(2048) | 1},"
+                                     f"10.0.{index // 256}.{index % 256},{9001 + index},1,,{bandwidth}"))
+
+        # The source and the destination of the circuits (not relays)
+        for index, username in enumerate(('source', 'destination')):
+            db.add_user(DataBaseUser(f"{username},password,65537,3,10.1.0.{index},9000,0,,1"))
+            db.change_availability(f"10.1.0.{index}", 9000)
+
+        relays = list(bandwidths)
+        total = sum(bandwidths.values())
+        print(f"{arguments.relays} relays, total bandwidth {total} KB/s, {arguments.circuits} circuits of 3 relays")
+
+        # The circuits are opened one after another (like the construct requests), the next ones see their loads
+        weighted = []
+        for _ in range(arguments.circuits):
+            path = db.get_circuit('source', 'destination')[:-1]
+            db.open_circuit(path)
+
+            weighted.append([relay[DataBase.USERNAME_INDEX] for relay in path])
+
+        paths = {
+            'uniform': [generator.sample(relays, 3) for _ in range(arguments.circuits)],
+            'weighted': weighted
+        }
+
+        for name, circuits in paths.items():
+            results = sorted(throughputs(circuits, bandwidths))
+
+            print(f"{name:>8}: aggregate {sum(results):9.0f} KB/s | median circuit {statistics.median(results):7.1f} "
+                  f"KB/s | slowest 10% {results[len(results) // 10]:6.1f} KB/s")
+
+
+# Program start
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+# Imports
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+from common import REPOSITORY_PATH, add_tree_path
+
+
+# Constants
+
+# Starts the directory server of the repository on its port with the given database file
+DIRECTORY_SERVER_SCRIPT = "import sys; from DirectoryServer import ExternalServer; ExternalServer(sys.argv[1]).start_server()"
+
+
+# Functions
+def main():
+    """
+    Benchmark of the circuit construction latency: the users of one process build circuits to each other through the
+    directory server (a subprocess) and the relays of the other users (3 hops and the destination)
+    """
+    parser = argparse.ArgumentParser(description='Circuit construction latency benchmark')
+    parser.add_argument('--users', type=int, default=5, help='count of the users (at least 5 - 3 relays per circuit)')
+    parser.add_argument('--port', type=int, default=12000, help='port of the first user server')
+    parser.add_argument('--keystore', default=None,
+                        help='keystore of the users, to reuse their keys between the runs (default - a new one)')
+    arguments = parser.parse_args()
+
+    add_tree_path('TOR')
+    from Encryptions.Backend import backend
+    from User import User
+
+    print(f"Backend: {backend.get_name()}, users: {arguments.users}")
+
+    # The users and their servers print every message - silence them (the servers print until the exit)
+    results = sys.stdout
+    sys.stdout = open(os.devnull, 'w')
+
+    with tempfile.TemporaryDirectory() as directory:
+        directory_server = subprocess.Popen([sys.executable, '-c', DIRECTORY_SERVER_SCRIPT,
+                                             os.path.join(directory, 'TOR_DB.db')],
+                                            cwd=os.path.join(REPOSITORY_PATH, 'DirectoryServer'),
+                                            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        time.sleep(1.5)
+
+        try:
+            # The directory server exits if it can't bind (its port may stay busy for a while after the previous run)
+            if directory_server.poll() is not None:
+                raise RuntimeError("Directory server didn't start")
+
+            keystore_path = arguments.keystore or os.path.join(directory, 'keys')
+            users = [User(arguments.port + i, f"bench{i}", 'password', keystore_path) for i in range(arguments.users)]
+
+            # Every user builds one circuit to every other user (a constructed circuit is reused by the user)
+            latencies = []
+            for source in users:
+                for destination in users:
+                    if source is destination:
+                        continue
+
+                    start = time.perf_counter()
+                    source.construct_circuit(destination.get_username())
+                    latencies.append(time.perf_counter() - start)
+
+        finally:
+            directory_server.kill()
+            directory_server.wait()
+
+    latencies.sort()
+    print(f"Circuits: {len(latencies)} | median {statistics.median(latencies) * 1000:7.1f} ms | "
+          f"p95 {latencies[int(len(latencies) * 0.95)] * 1000:7.1f} ms | "
+          f"mean {statistics.fmean(latencies) * 1000:7.1f} ms", file=results)
+
+
+# Program start
+if __name__ == "__main__":
+    main()
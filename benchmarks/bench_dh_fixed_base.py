@@ -0,0 +1,60 @@
+# Imports
+import argparse
+import random
+import time
+
+from common import add_tree_path, measure
+
+
+# Functions
+def main():
+    """
+    Benchmark of the dh public key generation for every preset: pow against the fixed-base table (first use builds the
+    table), for the full and the short private numbers
+    """
+    parser = argparse.ArgumentParser(description='DH fixed-base tables benchmark')
+    parser.add_argument('--tree', default='TOR', help='tree to benchmark: TOR or DirectoryServer')
+    parser.add_argument('--short-bits', type=int, default=256, help='size of the short private numbers (bits)')
+    arguments = parser.parse_args()
+
+    add_tree_path(arguments.tree)
+    from Encryptions.Backend import backend
+    from Encryptions.DH import dh
+
+    window = backend.get().DH_WINDOW_BITS
+    print(f"Backend: {backend.get_name()}, window: {window} bits")
+    if not window:
+        print("The backend doesn't use the fixed-base tables (set TOR_CRYPTO_BACKEND=python)")
+        return
+
+    generator = random.Random(2048)
+    sizes = (('full', dh.PRIVATE_NUMBER_BITS), ('short', arguments.short_bits))
+
+    print(f"{'preset':>6} {'g':>2} | " + ' | '.join(f"{name:>5} {bits:>4} bits: pow / build / table" for name, bits in sizes))
+
+    for index, (p, g) in enumerate(dh.get_presets()):
+        current_dh = dh((p, g))
+        results = []
+
+        # The short exponents first - their table is the beginning of the full one
+        for name, bits in sorted(sizes, key=lambda size: size[1]):
+            private_number = generator.getrandbits(bits) | (1 << (bits - 1))
+
+            start = time.perf_counter()
+            public_key = current_dh.generate_public_key(private_number)
+            build_time = time.perf_counter() - start
+
+            assert public_key == pow(g, private_number, p), f"table of the preset {index} is wrong"
+
+            power_time = measure(lambda: backend.get().power(g, private_number, p), repeat=5)
+            table_time = measure(lambda: current_dh.generate_public_key(private_number), repeat=5)
+            results.append((name, f"{power_time * 1000:6.2f} / {build_time * 1000:6.1f} / {table_time * 1000:5.2f} ms "
+                                  f"(x{power_time / table_time:.1f})"))
+
+        results.sort(key=lambda result: [name for name, _ in sizes].index(result[0]))
+        print(f"{index:>6} {g:>2} | " + ' | '.join(result for _, result in results))
+
+
+# Program start
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+# Imports
+import argparse
+import statistics
+import time
+
+from common import add_tree_path
+
+
+# Functions
+def handshakes(dh, pool, parameters_list: list, count: int, gap: float) -> tuple[list[float], set[int]]:
+    """
+    Runs the server side of the handshakes: takes a key pair and exchanges with the peer's public key.
+    The handshakes come every `gap` seconds (the node waits for the network in between)
+    :return: the latencies of the handshakes and the private numbers used
+    """
+    latencies, private_numbers = [], set()
+    peer_private = dh.generate_private_number()
+
+    for i in range(count):
+        parameters = parameters_list[i % len(parameters_list)]
+        peer_public = dh(parameters).generate_public_key(peer_private)
+
+        start = time.perf_counter()
+        current_dh = dh(parameters)
+        if pool is None:
+            private_number, public_key = current_dh.generate_key_pair()
+        else:
+            private_number, public_key = pool.get_key_pair(parameters)
+        current_dh.exchange(peer_public, private_number)
+        latencies.append(time.perf_counter() - start)
+
+        private_numbers.add(private_number)
+        time.sleep(gap)
+
+    return latencies, private_numbers
+
+
+def main():
+    """
+    Benchmark of the handshake latency: key pair generated inline against the pre-generated pairs of the dh_pool
+    """
+    parser = argparse.ArgumentParser(description='DH key pairs pool benchmark')
+    parser.add_argument('--tree', default='TOR', help='tree to benchmark: TOR or DirectoryServer')
+    parser.add_argument('--handshakes', type=int, default=60, help='count of the handshakes per case')
+    parser.add_argument('--gap', type=float, default=0.05, help='time between the handshakes (seconds)')
+    parser.add_argument('--presets', type=int, default=3, help='count of the presets used by the handshakes')
+    arguments = parser.parse_args()
+
+    add_tree_path(arguments.tree)
+    from Encryptions.Backend import backend
+    from Encryptions.DH import dh, dh_pool
+
+    parameters_list = dh.get_presets()[:arguments.presets]
+    print(f"Backend: {backend.get_name()}, presets: {len(parameters_list)}, gap: {arguments.gap * 1000:.0f} ms")
+
+    # Fixed-base tables are built before the measure in both cases
+    for parameters in parameters_list:
+        dh(parameters).generate_key_pair()
+
+    pool = dh_pool()
+    pool.fill(parameters_list)
+    while any(pool.get_size(parameters) < dh_pool.HIGH_WATERMARK for parameters in parameters_list):
+        time.sleep(0.01)
+
+    for name, current_pool in (('inline', None), ('pool', pool)):
+        latencies, private_numbers = handshakes(dh, current_pool, parameters_list, arguments.handshakes, arguments.gap)
+        assert len(private_numbers) == arguments.handshakes, "a key pair was used twice"
+
+        latencies.sort()
+        print(f"{name:>7}: median {statistics.median(latencies) * 1000:6.2f} ms | "
+              f"p95 {latencies[int(len(latencies) * 0.95)] * 1000:6.2f} ms")
+
+    print(f"Pool hits: {pool.get_hits()}, misses: {pool.get_misses()}")
+    pool.stop()
+
+
+# Program start
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+# Imports
+import argparse
+import os
+import random
+import tempfile
+import time
+
+from common import add_tree_path
+
+
+# Functions
+def user_parameters(index: int, generator: random.Random) -> str:
+    """
+    Function gives the append parameters of a relay (as the directory server receives them)
+    :param index: index of the relay
+    :param generator: random generator of the keys
+    :return: the parameters "username,password,e,n,ip,port,allow_exit,x25519"
+    """
+    n = generator.getrandbits(4096) | (1 << 4095)
+    x25519_key = generator.getrandbits(256).to_bytes(32, 'big').hex()
+
+    return f"relay{index},password{index},65537,{n},10.0.{index // 250}.{index % 250},{9001 + index},1,{x25519_key}"
+
+
+def operations_per_second(function, count: int) -> float:
+    """
+    Function runs the given function `count` times
+    :param function: function of the operation index
+    :param count: how many operations to run
+    :return: operations per second
+    """
+    start = time.perf_counter()
+    for index in range(count):
+        function(index)
+
+    return count / (time.perf_counter() - start)
+
+
+def main():
+    """
+    Benchmark of the database of the directory server - the operations of the append, get_rsa, construct and teardown
+    requests (as ExternalServer calls them) per second (the coherence of the registry with the database is checked by
+    tests/test_directory_registry.py)
+    """
+    parser = argparse.ArgumentParser(description='Directory server database benchmark')
+    parser.add_argument('--relays', type=int, default=1000, help='count of the registered relays')
+    parser.add_argument('--count', type=int, default=300, help='count of the operations per request type')
+    arguments = parser.parse_args()
+
+    add_tree_path('DirectoryServer')
+    import DirectoryServer          # Adds the paths of the directory server modules
+    from DataBaseManager.DataBase import DataBase
+    from DataBaseManager.DataBaseUser import DataBaseUser
+
+    generator = random.Random(1729)
+    users = [DataBaseUser(user_parameters(index, generator)) for index in range(arguments.relays)]
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'db', 'TOR_DB.db')
+        db = DataBase(path)
+
+        start = time.perf_counter()
+        for user in users:
+            db.add_user(user)
+        print(f"Registered {arguments.relays} relays in {time.perf_counter() - start:.2f} s")
+
+        def append(index: int):
+            # Update path of the append - a registered relay starts again
+            user = users[index % len(users)]
+
+            if not db.does_username_exists(user.get_username()):
+                db.add_user(user)
+
+            elif db.is_password_valid(user.get_username(), user.get_password()):
+                db.change_ip_and_port(user.get_username(), user.get_port(), user.get_ip())
+                db.change_rsa_public_key(user)
+                db.change_x25519_public_key(user)
+                db.change_availability(user.get_ip(), user.get_port(), available=1)
+
+        def get_rsa(index: int):
+            user = users[(index * 7919) % len(users)]
+
+            db.get_rsa_by_ip(user.get_ip(), user.get_port())
+            db.get_x25519_by_ip(user.get_ip(), user.get_port())
+
+        def construct(index: int):
+            source, destination = users[index % len(users)], users[(index + 1) % len(users)]
+            db.get_circuit(source.get_username(), destination.get_username())
+
+        def teardown(index: int):
+            user = users[(index * 7919) % len(users)]
+            db.change_availability(user.get_ip(), user.get_port(), available=index % 2)
+
+        for name, function in (('append', append), ('get_rsa', get_rsa), ('construct', construct),
+                               ('teardown', teardown)):
+            rate = operations_per_second(function, arguments.count)
+            print(f"{name:>9}: {rate:9.1f} ops/s | {1e6 / rate:9.1f} us")
+
+
+# Program start
+if __name__ == "__main__":
+    main()
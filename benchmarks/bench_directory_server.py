@@ -0,0 +1,388 @@
+# Imports
+import argparse
+import asyncio
+import os
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+from common import REPOSITORY_PATH, add_tree_path
+
+add_tree_path('DirectoryServer')
+import DirectoryServer          # Adds the paths of the directory server modules
+from DirectoryServer import ExternalServer, _DirectoryRequests
+from DataBaseManager.DataBase import DataBase
+from DataBaseManager.DataBaseUser import DataBaseUser
+from Encryptions.DH import dh, dh_pool
+from Encryptions.AES import aes
+from Constants import Constants
+
+
+# Constants
+# Code of the server process: path of the database, port, bits of the DH private numbers, class of the server
+SERVER_CODE = f'''
+import sys
+sys.path.insert(0, {os.path.dirname(os.path.abspath(__file__))!r})
+
+from bench_directory_server import ExternalServer, ThreadedExternalServer, dh, Constants
+
+db_path, port, private_bits, server = sys.argv[1], int(sys.argv[2]), int(sys.argv[3]), sys.argv[4]
+
+Constants.IP, Constants.PORT = '127.0.0.1', port
+dh.PRIVATE_NUMBER_BITS = private_bits
+
+(ExternalServer if server == 'asyncio' else ThreadedExternalServer)(db_path).start_server()
+'''
+
+RELAYS_COUNT = 20
+
+
+# Classes
+class ThreadedExternalServer:
+    """
+    External server with a detached thread for every client (the directory server before ExternalServer), with the
+    same requests - the baseline of the benchmark
+    """
+
+    def __init__(self, db_path: str = None):
+        """
+        Constructor of the external server that initialize fields
+        :param db_path: path to the database file (to create)
+        """
+        dp_path = ExternalServer.DB_PATH if (db_path is None) else db_path
+        self.__requests = _DirectoryRequests(dp_path)
+
+        self.__server_socket: socket.socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+
+    def start_server(self) -> None:
+        """
+        Method starts the server, listening for the new clients, and run detached thread for everyone
+        """
+        try:
+            self.__server_socket.bind((Constants.IP, Constants.PORT))
+            self.__server_socket.listen(ExternalServer.BACKLOG)
+
+            print(f"[Directory Server] Bind ON {Constants.IP}:{Constants.PORT}", end='\n\n\n')
+            print(f"[Directory Server] Start listen port: {Constants.PORT}", end='\n\n\n')
+
+            # Every start request takes a key pair of a random preset - generate them while waiting for the clients
+            dh_pool.get_default().fill(dh.get_presets())
+
+            while True:
+                client_socket, client_address = self.__server_socket.accept()
+
+                client_thread = threading.Thread(target=self.__handle_new_client, args=(client_socket,))
+                client_thread.daemon = True
+                client_thread.start()
+
+        except OSError as e:
+            print(e)
+            exit(1)
+
+    def __handle_new_client(self, client_socket: socket.socket) -> None:
+        """
+        Method to handle new clients (runs in detached thread for each new connected client).
+        Method runs until user stops or disconnects
+        :param client_socket: the socket with the current client
+        """
+
+        # Aes of the client (currently none)
+        AES = None
+
+        try:
+            while True:
+                request = client_socket.recv(Constants.BUFF_SIZE)
+
+                # The client closed the connection
+                if not request:
+                    break
+
+                if AES is None:
+                    if request != b"start":
+                        break
+
+                    Constants.print_message(False, False, client_socket, request)
+                    AES = ThreadedExternalServer.__handle_start_request(client_socket)
+                    continue
+
+                response = self.__requests.handle(client_socket, AES, request)
+
+                if response is None:
+                    break
+
+                if response:
+                    client_socket.sendall(response)
+                    Constants.print_message(False, True, client_socket, response)
+
+        except (OSError, ValueError) as e:
+            # Reset connection or a broken request
+            print(f"[Directory Server] Client error: {e}", end='\n\n\n')
+
+        client_socket.close()
+
+    @staticmethod
+    def __handle_start_request(client_socket: socket.socket) -> aes | None:
+        """
+        Static method that handles start request for each user
+        :param client_socket: socket of the current user
+        :return: aes of the session | None if the session isn't started
+        """
+        DH, private_number, dh_response = _DirectoryRequests.start()
+
+        client_socket.sendall(dh_response.encode())
+        Constants.print_message(False, True, client_socket, dh_response)
+
+        dh_request = client_socket.recv(Constants.BUFF_SIZE).decode()
+        Constants.print_message(False, False, client_socket, dh_request)
+
+        AES = _DirectoryRequests.finish_start(DH, private_number, dh_request)
+
+        if AES is not None:
+            client_socket.sendall("started".encode())
+            Constants.print_message(False, True, client_socket, "started")
+
+        return AES
+
+
+# Functions
+def process_stats(pid: int) -> tuple[int, int, float] | None:
+    """
+    Function gives the threads, the memory and the CPU time of a process (from /proc)
+    :param pid: the process id
+    :return: tuple of the threads count, the resident memory (KB) and the CPU time (seconds) | None without /proc
+    """
+    try:
+        with open(f"/proc/{pid}/status") as file:
+            status = dict(line.split(':', 1) for line in file if ':' in line)
+
+        with open(f"/proc/{pid}/stat") as file:
+            fields = file.read().rsplit(')', 1)[1].split()
+
+    except OSError:
+        return None
+
+    cpu_time = (int(fields[11]) + int(fields[12])) / os.sysconf('SC_CLK_TCK')
+    return int(status['Threads']), int(status['VmRSS'].split()[0]), cpu_time
+
+
+def percentile(values: list[float], fraction: float) -> float:
+    """
+    Function gives a percentile of the values
+    :param values: the sorted values
+    :param fraction: the percentile (0 to 1)
+    :return: the value at the percentile
+    """
+    return values[min(int(len(values) * fraction), len(values) - 1)]
+
+
+async def client(index: int, port: int, requests: int, barriers: tuple[asyncio.Barrier, asyncio.Barrier],
+                 latencies: list[float], errors: list[str], dh, aes, Constants) -> None:
+    """
+    Coroutine of a client: starts a session, waits for all the clients, sends the requests (get_rsa and construct)
+    and closes the session after all the clients - with stop (even clients) or just closes the connection (odd ones)
+    :param index: index of the client
+    :param port: port of the server
+    :param requests: count of the requests after the start
+    :param barriers: the barriers of all the clients - started, and done
+    :param latencies: [reference] latencies of the requests (seconds)
+    :param errors: [reference] the errors of the clients
+    :param dh, aes, Constants: the modules of the directory server tree
+    """
+    started, done = barriers
+
+    try:
+        reader, writer = await asyncio.open_connection('127.0.0.1', port)
+
+        writer.write(b"start")
+        p, g, server_public_key = map(int, (await reader.read(Constants.BUFF_SIZE)).decode().split(','))
+
+        DH = dh((p, g))
+        private_number, public_key = DH.generate_key_pair()
+        dh_key = DH.exchange(server_public_key, private_number)
+
+        writer.write(f"{public_key},{Constants.key_hash(dh_key)}".encode())
+        if await reader.read(Constants.BUFF_SIZE) != b"started":
+            raise ValueError("the session isn't started")
+
+        AES = aes(dh_key)
+
+    except (OSError, ValueError) as e:
+        errors.append(f"client {index}: {e!r}")
+        await started.wait()
+        await done.wait()
+        return
+
+    # All the clients are connected together
+    await started.wait()
+
+    generator = random.Random(index)
+
+    for request_index in range(requests):
+        if request_index % 2 == 0:
+            relay = generator.randrange(RELAYS_COUNT)
+            request = f"get_rsa#10.0.0.{relay}:{9001 + relay}"
+        else:
+            source, destination = generator.sample(range(RELAYS_COUNT), 2)
+            request = f"construct#relay{source},relay{destination}"
+
+        start = time.perf_counter()
+        writer.write(AES.encrypt_bytes(request.encode()))
+
+        response = AES.decrypt_bytes(await reader.read(Constants.BUFF_SIZE)).decode()
+        latencies.append(time.perf_counter() - start)
+
+        if response == 'error' or not response:
+            errors.append(f"client {index}: {request} - {response!r}")
+
+    await done.wait()
+
+    if index % 2 == 0:
+        writer.write(AES.encrypt_bytes(b"stop"))
+        await writer.drain()
+
+    writer.close()
+
+
+async def run_clients(server: subprocess.Popen, port: int, clients: int, requests: int, modules: tuple) -> dict:
+    """
+    Coroutine that runs the clients together against a server
+    :param server: the process of the server
+    :param port: port of the server
+    :param clients: count of the clients
+    :param requests: count of the requests of every client
+    :param modules: the modules of the directory server tree (dh, aes, Constants)
+    :return: the results
+    """
+    latencies, errors = [], []
+    results = {}
+
+    start = time.perf_counter()
+
+    started, done = asyncio.Barrier(clients + 1), asyncio.Barrier(clients + 1)
+    tasks = [asyncio.create_task(client(index, port, requests, (started, done), latencies, errors, *modules))
+             for index in range(clients)]
+
+    await started.wait()
+    results['start'] = time.perf_counter() - start
+
+    requests_start = time.perf_counter()
+    while len(latencies) + len(errors) < clients * requests and not all(task.done() for task in tasks):
+        await asyncio.sleep(0.01)
+    results['requests'] = time.perf_counter() - requests_start
+
+    # All the sessions are still open
+    results['open'] = process_stats(server.pid)
+
+    await done.wait()
+    await asyncio.gather(*tasks)
+
+    results['latencies'] = sorted(latencies)
+    results['errors'] = errors
+
+    return results
+
+
+def free_port() -> int:
+    """
+    Function gives a free port for a server (the threaded server doesn't reuse the ports of the previous runs)
+    :return: the port
+    """
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def wait_for_port(port: int, timeout: float = 30) -> None:
+    """
+    Function waits until the server accepts connections
+    :param port: port of the server
+    :param timeout: seconds to wait
+    """
+    deadline = time.monotonic() + timeout
+
+    while time.monotonic() < deadline:
+        try:
+            socket.create_connection(('127.0.0.1', port), timeout=1).close()
+            return
+        except OSError:
+            time.sleep(0.1)
+
+    raise TimeoutError(f"The server doesn't listen on port {port}")
+
+
+def main():
+    """
+    Benchmark of the directory servers with many concurrent clients - the asyncio server (ExternalServer) against the
+    threaded server (ThreadedExternalServer): the time to start all the sessions, the latencies of the requests while
+    all the sessions are open, the threads and the memory of the server, and its CPU time after the clients left
+    (half of them stop, half just close the connection)
+    """
+    parser = argparse.ArgumentParser(description='Directory server benchmark')
+    parser.add_argument('--clients', type=int, default=1000, help='count of the concurrent clients')
+    parser.add_argument('--requests', type=int, default=4, help='count of the requests of every client')
+    parser.add_argument('--private-bits', type=int, default=256,
+                        help='bits of the DH private numbers of the server and the clients (dh.PRIVATE_NUMBER_BITS)')
+    parser.add_argument('--servers', nargs='+', default=['threaded', 'asyncio'], choices=['threaded', 'asyncio'])
+    arguments = parser.parse_args()
+
+    dh.PRIVATE_NUMBER_BITS = arguments.private_bits
+    generator = random.Random(5)
+
+    print(f"{arguments.clients} clients, {arguments.requests} requests each (get_rsa and construct), "
+          f"{arguments.private_bits}-bit DH private numbers")
+
+    with tempfile.TemporaryDirectory() as directory:
+        for name in arguments.servers:
+            port = free_port()
+            db_path = os.path.join(directory, name, 'TOR_DB.db')
+
+            db = DataBase(db_path)
+            for index in range(RELAYS_COUNT):
+                db.add_user(DataBaseUser(f"relay{index},password,65537,{generator.getrandbits(2048) | 1},"
+                                         f"10.0.0.{index},{9001 + index},1,"))
+            db.close()
+
+            server = subprocess.Popen([sys.executable, '-c', SERVER_CODE, db_path, str(port),
+                                       str(arguments.private_bits), name],
+                                      cwd=os.path.join(REPOSITORY_PATH, 'DirectoryServer'),
+                                      stdout=subprocess.DEVNULL, stderr=subprocess.STDOUT)
+
+            try:
+                wait_for_port(port)
+                idle = process_stats(server.pid)
+
+                results = asyncio.run(run_clients(server, port, arguments.clients, arguments.requests,
+                                                  (dh, aes, Constants)))
+
+                # The clients left - the server should be idle
+                time.sleep(1)
+                left = process_stats(server.pid)
+                time.sleep(2)
+                after = process_stats(server.pid)
+
+            finally:
+                server.kill()
+                server.wait()
+
+            latencies = results['latencies']
+            print(f"{name:>8}: start of all the sessions {results['start']:6.2f} s | "
+                  f"requests {results['requests']:6.2f} s, latency p50 {percentile(latencies, 0.5) * 1000:7.1f} ms "
+                  f"p99 {percentile(latencies, 0.99) * 1000:7.1f} ms | errors {len(results['errors'])}")
+
+            if idle and results['open'] and after:
+                threads, memory, _ = results['open']
+                print(f"{'':>8}  server CPU {results['open'][2] - idle[2]:5.2f} s | "
+                      f"open sessions: {threads} threads, {memory - idle[1]} KB more memory | "
+                      f"CPU after the clients left {(after[2] - left[2]) / 2 * 100:5.1f}%")
+
+            for error in results['errors'][:5]:
+                print(f"{'':>8}  {error}")
+
+
+# Program start
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+# Imports
+import argparse
+import time
+
+from common import add_tree_path
+
+
+# Functions
+def cpu_time(function, count: int) -> float:
+    """
+    Function runs the given function `count` times and returns the mean CPU time of a run in the current thread (the
+    refill thread of the DH pool isn't counted)
+    :param function: function without arguments to measure
+    :param count: how many times to run the function
+    :return: the mean CPU time of a run in seconds
+    """
+    start = time.thread_time()
+    for _ in range(count):
+        function()
+
+    return (time.thread_time() - start) / count
+
+
+def main():
+    """
+    Benchmark of the handshake suites of one hop: CPU time of the client (request and session key) and of the relay
+    (response and session key), and the size of the CREATE request and of the CREATED response
+    """
+    parser = argparse.ArgumentParser(description='Handshake suites benchmark')
+    parser.add_argument('--count', type=int, default=20, help='count of the handshakes per suite')
+    arguments = parser.parse_args()
+
+    add_tree_path('TOR')
+    from Commands import Commands
+    from Constants import Constants
+    from Encryptions.Backend import backend
+    from Encryptions.DH import dh, dh_pool
+    from Encryptions.Handshake import handshake
+    from Encryptions.RSA import rsa
+
+    print(f"Backend: {backend.get_name()}")
+
+    # The relay's keys (the static X25519 key is derived from the RSA key)
+    key_pair = rsa()
+    rsa_private_key, rsa_public_key = key_pair.get_private_key(), key_pair.get_public_key()
+    x25519_private_key = handshake.get_static_private_key(rsa_private_key)
+    x25519_public_key = handshake.get_static_public_key(rsa_private_key)
+
+    # Fixed-base tables are built before the measure. The key pairs of the classic suite are taken from the pool (the
+    # handshakes come one after another, faster than the pool refills - see the hits and misses)
+    for parameters in dh.get_presets():
+        dh(parameters).generate_key_pair()
+
+    for suite in handshake.SUITES:
+        client_handshakes = []
+
+        def client_request():
+            client_handshakes.append(handshake(suite, rsa_public_key, x25519_public_key))
+
+        client_request_time = cpu_time(client_request, arguments.count)
+
+        responses = []
+
+        def relay_response():
+            request = client_handshakes[len(responses)]
+            responses.append(handshake.respond(suite, request.get_request(), rsa_private_key, x25519_private_key))
+
+        relay_time = cpu_time(relay_response, arguments.count)
+
+        finished = []
+
+        def client_finish():
+            index = len(finished)
+            finished.append(client_handshakes[index].finish(responses[index][0]))
+
+        client_finish_time = cpu_time(client_finish, arguments.count)
+
+        # Conformance - both sides have the same session key
+        assert finished == [session_key for _, session_key in responses], f"{suite}: the session keys aren't same"
+
+        public_number, session_key = responses[0]
+        create_size = len(Commands.Create.compose_request(1, suite, client_handshakes[0].get_request()).encode())
+        created_size = len(Commands.Created.compose_response(1, public_number, Constants.key_hash(session_key)).encode())
+
+        print(f"{suite:>8}: client {(client_request_time + client_finish_time) * 1000:7.2f} ms | "
+              f"relay {relay_time * 1000:7.2f} ms | CREATE {create_size:4} bytes | CREATED {created_size:4} bytes")
+
+    pool = dh_pool.get_default()
+    print(f"DH pool hits: {pool.get_hits()}, misses: {pool.get_misses()}")
+    pool.stop()
+
+
+# Program start
+if __name__ == "__main__":
+    main()
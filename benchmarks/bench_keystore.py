@@ -0,0 +1,60 @@
+# Imports
+import argparse
+import os
+import stat
+import tempfile
+import time
+
+from common import add_tree_path
+
+
+# Functions
+def main():
+    """
+    Benchmark of the node startup key pair: cold start (generate and store) against warm start (load from the keystore)
+    """
+    parser = argparse.ArgumentParser(description='RSA keystore startup benchmark')
+    parser.add_argument('--users', type=int, default=5, help='count of the users started (like the GUI launcher)')
+    arguments = parser.parse_args()
+
+    add_tree_path('TOR')
+    from Encryptions.Backend import backend
+    from Encryptions.KeyStore import keystore
+    from Encryptions.RSA import rsa
+
+    print(f"Backend: {backend.get_name()}")
+    usernames = [f"user{i}" for i in range(arguments.users)]
+
+    with tempfile.TemporaryDirectory() as directory:
+        store = keystore(os.path.join(directory, 'keys'))
+
+        start = time.perf_counter()
+        cold_keys = [store.load_or_generate(username) for username in usernames]
+        cold_time = time.perf_counter() - start
+
+        start = time.perf_counter()
+        warm_keys = [store.load_or_generate(username) for username in usernames]
+        warm_time = time.perf_counter() - start
+
+        # The loaded key pairs are the stored ones
+        for cold, warm in zip(cold_keys, warm_keys):
+            assert cold.get_public_key().get_n() == warm.get_public_key().get_n()
+            assert cold.get_private_key().get_d() == warm.get_private_key().get_d()
+            assert rsa.decrypt(rsa.encrypt(12345, cold.get_public_key()), warm.get_private_key()) == 12345
+
+        # Owner only permissions
+        if os.name == 'posix':
+            assert stat.S_IMODE(os.stat(store.get_path()).st_mode) == 0o700
+            for name in os.listdir(store.get_path()):
+                assert stat.S_IMODE(os.stat(os.path.join(store.get_path(), name)).st_mode) == 0o600
+
+    print(f"Cold start ({arguments.users} users, generate and store): {cold_time:8.3f} s "
+          f"({cold_time / arguments.users * 1000:9.1f} ms per user)")
+    print(f"Warm start ({arguments.users} users, load):               {warm_time:8.3f} s "
+          f"({warm_time / arguments.users * 1000:9.1f} ms per user)")
+    print(f"Warm start is x{cold_time / warm_time:.0f} faster")
+
+
+# Program start
+if __name__ == "__main__":
+    main()
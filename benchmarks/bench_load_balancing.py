@@ -0,0 +1,127 @@
+# Imports
+import argparse
+import os
+import random
+import tempfile
+import time
+
+from common import add_tree_path
+
+
+# Constants
+# Classes of the relays: (share of the relays, bandwidth KB/s) - like bench_bandwidth_weighting
+RELAY_CLASSES = ((0.5, 100), (0.35, 1000), (0.15, 10000))
+
+
+# Functions
+def register(db, DataBaseUser, count: int, bandwidths: list[int], generator: random.Random) -> None:
+    """
+    Function registers relays with random bandwidths, every relay allows to be an exit node
+    :param db: the database
+    :param DataBaseUser: the database user class
+    :param count: count of the relays
+    :param bandwidths: the bandwidths to choose from
+    :param generator: random generator of the relays
+    """
+    for index in range(count):
+        db.add_user(DataBaseUser(f"relay{index},password,65537,{generator.getrandbits(2048) | 1},"
+                                 f"10.0.{index // 256}.{index % 256},{9001 + index},1,,{generator.choice(bandwidths)}"))
+
+
+def workload(db, DataBase, relays_count: int, circuits: int, steps: int, generator: random.Random) -> float:
+    """
+    Function runs the construct and teardown requests of the clients: every step constructs a circuit between random
+    users, and when there are more than `circuits` open circuits a random one is torn down
+    :param db: the database
+    :param DataBase: the database class (indexes of the columns)
+    :param relays_count: count of the relays
+    :param circuits: count of the open circuits
+    :param steps: count of the constructed circuits
+    :param generator: random generator of the workload
+    :return: the mean time of a construct (get_circuit and open_circuit) in seconds
+    """
+    open_circuits = []
+    elapsed = 0.0
+
+    for _ in range(steps):
+        source, destination = generator.sample(range(relays_count), 2)
+
+        start = time.perf_counter()
+        relays = db.get_circuit(f"relay{source}", f"relay{destination}")[:-1]
+        db.open_circuit(relays)
+        elapsed += time.perf_counter() - start
+
+        open_circuits.append(relays)
+
+        if len(open_circuits) > circuits:
+            index = generator.randrange(len(open_circuits))
+            open_circuits[index], open_circuits[-1] = open_circuits[-1], open_circuits[index]
+
+            db.close_circuit(open_circuits.pop())
+
+    # Conformance - the counts are the open circuits of every relay
+    counts = {}
+    for relays in open_circuits:
+        for relay in relays:
+            counts[relay[DataBase.USERNAME_INDEX]] = counts.get(relay[DataBase.USERNAME_INDEX], 0) + 1
+
+    assert db.get_circuits_counts() == counts, "the counts of the circuits aren't the open circuits"
+
+    return elapsed / steps
+
+
+def main():
+    """
+    Simulation of the load spread of the open circuits over the relays - the relays of every circuit sampled by the
+    bandwidths only (1 choice) against the less loaded of 2 sampled relays (power of two choices).
+    Report of the max and the mean circuits per relay (relays of the same bandwidth) and per bandwidth (relays of
+    different bandwidths)
+    """
+    parser = argparse.ArgumentParser(description='Load aware relay selection simulation')
+    parser.add_argument('--relays', type=int, default=500, help='count of the relays')
+    parser.add_argument('--circuits', type=int, default=2000, help='count of the open circuits')
+    parser.add_argument('--steps', type=int, default=20000, help='count of the constructed circuits')
+    arguments = parser.parse_args()
+
+    add_tree_path('DirectoryServer')
+    import DirectoryServer          # Adds the paths of the directory server modules
+    from DataBaseManager.DataBase import DataBase, _RelaySet
+    from DataBaseManager.DataBaseUser import DataBaseUser
+
+    print(f"{arguments.relays} relays, {arguments.circuits} open circuits of 3 relays, {arguments.steps} constructs")
+
+    with tempfile.TemporaryDirectory() as directory:
+        for name, bandwidths in (('same bandwidth', [1000]),
+                                 ('different bandwidths', [bandwidth for share, bandwidth in RELAY_CLASSES
+                                                           for _ in range(int(share * 100))])):
+            print(f"{name}:")
+
+            for choices in (1, 2):
+                _RelaySet.CHOICES = choices
+                random.seed(2024)
+
+                db = DataBase(os.path.join(directory, f"{name}-{choices}", 'TOR_DB.db'))
+                register(db, DataBaseUser, arguments.relays, bandwidths, random.Random(7))
+
+                construct_time = workload(db, DataBase, arguments.relays, arguments.circuits, arguments.steps,
+                                          random.Random(99))
+
+                counts = db.get_circuits_counts()
+                relays = db.get_relays()
+
+                circuits = [counts.get(relay[DataBase.USERNAME_INDEX], 0) for relay in relays]
+                relays_bandwidths = [relay[DataBase.BANDWIDTH_INDEX] / 1000 for relay in relays]       # MB/s
+
+                mean = sum(circuits) / len(circuits)
+                mean_per_bandwidth = sum(circuits) / sum(relays_bandwidths)
+                per_bandwidth = [count / bandwidth for count, bandwidth in zip(circuits, relays_bandwidths)]
+
+                print(f"  {choices} choice{'s' if choices > 1 else ' '}: circuits per relay max {max(circuits):4} "
+                      f"mean {mean:6.1f} (max/mean {max(circuits) / mean:5.2f}) | "
+                      f"per MB/s max/mean {max(per_bandwidth) / mean_per_bandwidth:5.2f} | "
+                      f"construct {construct_time * 1e6:6.1f} us")
+
+
+# Program start
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+# Imports
+import argparse
+import os
+from queue import SimpleQueue, LifoQueue
+
+from common import add_tree_path, measure
+
+
+# Functions
+def encrypt_by_aes_chain(data: bytes, aes_queue: SimpleQueue) -> tuple[bytes, LifoQueue]:
+    """
+    The layer by layer chain encryption that the onion cipher replaced (kept here as the baseline)
+    """
+    aes_stack = LifoQueue()
+
+    while not aes_queue.empty():
+        key = aes_queue.get()
+        aes_stack.put(key)
+        data = key.encrypt_bytes(data)
+
+    return data, aes_stack
+
+
+def decrypt_by_aes_chain(data: bytes, aes_stack: LifoQueue) -> bytes:
+    """
+    The layer by layer chain decryption that the onion cipher replaced (kept here as the baseline)
+    """
+    while not aes_stack.empty():
+        data = aes_stack.get().decrypt_bytes(data)
+
+    return data
+
+
+def main():
+    """
+    Benchmark of the onion cipher against the layer by layer chain functions (3 and 5 hops)
+    """
+    parser = argparse.ArgumentParser(description='Onion cipher benchmark')
+    parser.add_argument('--repeat', type=int, default=20, help='count of the messages per measurement')
+    arguments = parser.parse_args()
+
+    add_tree_path('TOR')
+    from Encryptions.AES import aes_ctr_session
+    from Encryptions.OnionCipher import OnionCipher
+
+    for hops in (3, 5):
+        dh_keys = [int.from_bytes(os.urandom(256), 'big') for _ in range(hops)]
+
+        client_layers = [aes_ctr_session(dh_key, initiator=True) for dh_key in dh_keys]
+        relay_layers = [aes_ctr_session(dh_key, initiator=False) for dh_key in dh_keys]
+        onion = OnionCipher([aes_ctr_session(dh_key, initiator=True) for dh_key in dh_keys])
+
+        # The onion must be peeled by the relays exactly like the chain (before the measurements move the streams)
+        for payload_size in (1, 100, 1000):
+            payload = os.urandom(payload_size)
+
+            wrapped = onion.wrap(payload)
+            for layer in relay_layers:
+                wrapped = layer.decrypt_bytes(wrapped)
+            assert wrapped == payload, "Onion isn't peeled by the relays"
+
+            response = payload
+            for layer in reversed(relay_layers):
+                response = layer.encrypt_bytes(response)
+            assert onion.unwrap(response) == payload, "Onion response isn't unwrapped"
+
+        for payload_size in (100, 1000, 8000):
+            payload = os.urandom(payload_size)
+
+            def chain_round_trip():
+                for _ in range(arguments.repeat):
+                    # The queue is rebuilt for every message (as the user did)
+                    aes_queue = SimpleQueue()
+                    for layer in reversed(client_layers):
+                        aes_queue.put(layer)
+
+                    _, aes_stack = encrypt_by_aes_chain(payload, aes_queue)
+                    decrypt_by_aes_chain(payload, aes_stack)
+
+            def onion_round_trip():
+                for _ in range(arguments.repeat):
+                    onion.wrap(payload)
+                    onion.unwrap(payload)
+
+            chain_time = measure(chain_round_trip) / arguments.repeat
+            onion_time = measure(onion_round_trip) / arguments.repeat
+
+            print(f"{hops} hops | payload {payload_size:>5} B | chain {chain_time * 1000:7.3f} ms | "
+                  f"onion {onion_time * 1000:7.3f} ms | x{chain_time / onion_time:5.2f}")
+
+
+# Program start
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,119 @@
+# Imports
+import argparse
+import os
+import random
+import tempfile
+import time
+
+from common import add_tree_path
+
+
+# Functions
+def shuffle_path(relays: list[tuple], source: str, destination: str, nodes_count: int, DataBase) -> list[tuple]:
+    """
+    Function selects the path like get_circuit did before the sampling - all the relays without the source and the
+    destination, shuffled (without the availability and exit node flags)
+    :return: the relays of the path and the destination
+    """
+    relays = list(relays)
+
+    source_user = [user for user in relays if user[DataBase.USERNAME_INDEX] == source][0]
+    relays.remove(source_user)
+
+    destination_user = [user for user in relays if user[DataBase.USERNAME_INDEX] == destination][0]
+    relays.remove(destination_user)
+
+    random.shuffle(relays)
+    return relays[:nodes_count] + [destination_user]
+
+
+def register(db, DataBaseUser, count: int, generator: random.Random) -> None:
+    """
+    Function registers relays: 90% of them are available and half of them allow to be an exit node
+    :param db: the database
+    :param DataBaseUser: the database user class
+    :param count: count of the relays
+    :param generator: random generator of the relays
+    """
+    for index in range(count):
+        allow_exit = int(generator.random() < 0.5)
+        db.add_user(DataBaseUser(f"relay{index},password,65537,{generator.getrandbits(2048) | 1},"
+                                 f"10.{index // 65536}.{index // 256 % 256}.{index % 256},{9001 + index % 50000},"
+                                 f"{allow_exit},"))
+
+        if generator.random() < 0.1:
+            db.change_availability(f"10.{index // 65536}.{index // 256 % 256}.{index % 256}", 9001 + index % 50000)
+
+
+def main():
+    """
+    Benchmark of the path selection of the construct request - sampling from the sets of the eligible relays against
+    the shuffle of all the relays, for several counts of relays
+    """
+    parser = argparse.ArgumentParser(description='Path selection benchmark')
+    parser.add_argument('--relays', type=int, nargs='+', default=[10, 1000, 100000], help='counts of the relays')
+    parser.add_argument('--count', type=int, default=200, help='count of the paths per measurement')
+    arguments = parser.parse_args()
+
+    add_tree_path('DirectoryServer')
+    import DirectoryServer          # Adds the paths of the directory server modules
+    from DataBaseManager.DataBase import DataBase
+    from DataBaseManager.DataBaseUser import DataBaseUser
+
+    generator = random.Random(4242)
+
+    with tempfile.TemporaryDirectory() as directory:
+        # Too few relays - a clear error instead of a short circuit
+        db = DataBase(os.path.join(directory, 'small', 'TOR_DB.db'))
+        register(db, DataBaseUser, 4, random.Random(1))
+        try:
+            db.get_circuit('relay0', 'relay1')
+            raise AssertionError("a circuit of 2 relays was constructed")
+        except ValueError as e:
+            print(f"4 relays: {e}")
+
+        for relays_count in arguments.relays:
+            db = DataBase(os.path.join(directory, str(relays_count), 'TOR_DB.db'))
+            register(db, DataBaseUser, relays_count, generator)
+
+            relays = {relay[DataBase.USERNAME_INDEX]: relay for relay in db.get_relays()}
+            ends = [(f"relay{generator.randrange(relays_count)}", f"relay{generator.randrange(relays_count)}")
+                    for _ in range(arguments.count)]
+            ends = [(source, destination) for source, destination in ends if source != destination]
+
+            # Conformance - available relays, the last one is an exit node, without the source and the destination
+            for source, destination in ends:
+                try:
+                    path = db.get_circuit(source, destination)
+                except ValueError:
+                    continue
+
+                usernames = [relay[DataBase.USERNAME_INDEX] for relay in path[:-1]]
+                assert len(set(usernames)) == 3 and not {source, destination} & set(usernames)
+                assert all(relays[username][DataBase.AVAILABLE_INDEX] for username in usernames)
+                assert relays[usernames[-1]][DataBase.ALLOW_EXIT_NODE_INDEX]
+                assert path[-1][DataBase.USERNAME_INDEX] == destination
+
+            def sample_all():
+                for source, destination in ends:
+                    try:
+                        db.get_circuit(source, destination)
+                    except ValueError:
+                        pass
+
+            def shuffle_all():
+                for source, destination in ends:
+                    shuffle_path(db.get_relays(), source, destination, 3, DataBase)
+
+            results = []
+            for name, function in (('shuffle', shuffle_all), ('sampling', sample_all)):
+                start = time.perf_counter()
+                function()
+                results.append(f"{name} {(time.perf_counter() - start) / len(ends) * 1e6:10.1f} us")
+
+            print(f"{relays_count:>7} relays: {' | '.join(results)}")
+
+
+# Program start
+if __name__ == "__main__":
+    main()
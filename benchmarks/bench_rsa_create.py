@@ -0,0 +1,94 @@
+# Imports
+import argparse
+import contextlib
+import os
+import random
+import socket
+
+from common import add_tree_path, measure
+
+
+# Functions
+def connected_pair() -> tuple[socket.socket, socket.socket]:
+    """
+    Function makes two connected TCP sockets over the loopback
+    :return: the client side and the server side sockets
+    """
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as server:
+        server.bind(('127.0.0.1', 0))
+        server.listen()
+
+        client = socket.create_connection(server.getsockname())
+        connection, _ = server.accept()
+
+    return client, connection
+
+
+def main():
+    """
+    Benchmark of the CREATE handling of a relay (ServerCommunicator) with the RSA private key of d and n only, and with
+    the CRT parameters
+    """
+    parser = argparse.ArgumentParser(description='RSA CRT benchmark of the CREATE handling')
+    parser.add_argument('--count', type=int, default=20, help='count of the CREATE requests per measurement')
+    arguments = parser.parse_args()
+
+    add_tree_path('TOR')
+    from Commands import Commands
+    from Encryptions.Backend import backend
+    from Encryptions.DH import dh
+    from Encryptions.RSA import rsa, private_key
+    from ServerCommunicator import ServerCommunicator
+
+    print(f"Backend: {backend.get_name()}")
+
+    key_pair = rsa()
+    crt_key = key_pair.get_private_key()
+    plain_key = private_key(crt_key.get_d(), crt_key.get_n())
+
+    # Conformance - the same plaintexts with and without the CRT
+    generator = random.Random(2718)
+    for _ in range(20):
+        number = generator.randrange(crt_key.get_n())
+        encrypted = rsa.encrypt(number, key_pair.get_public_key())
+        assert rsa.decrypt(encrypted, crt_key) == rsa.decrypt(encrypted, plain_key) == number
+
+    # CREATE requests of the clients
+    parameters = dh.get_preset(0)
+    client_dh = dh(parameters)
+    requests = []
+    for circuit_id in range(arguments.count):
+        public_dh_key = client_dh.generate_public_key(dh.generate_private_number())
+        handshake = rsa.encrypt(public_dh_key, key_pair.get_public_key())
+        requests.append(Commands.Create.compose_request(circuit_id, 'classic', [dh.PRESETS_VERSION, 0, handshake]))
+
+    client, connection = connected_pair()
+    timings = {}
+
+    for name, key in (('private_key(d, n)', plain_key), ('private_key with CRT', crt_key)):
+        communicator = ServerCommunicator(0, key)
+        handle_create = communicator._ServerCommunicator__handle_create_request
+
+        def handle_all():
+            for request in requests:
+                handle_create(connection, request)
+                client.recv(65536)
+
+        # The relay prints every message - silence it
+        with open(os.devnull, 'w') as null, contextlib.redirect_stdout(null):
+            timings[name] = measure(handle_all) / len(requests)
+
+        rsa_time = measure(lambda: [rsa.decrypt(int(request.split(',')[-1]), key) for request in requests])
+        print(f"{name:<22} CREATE handling: {timings[name] * 1000:8.2f} ms | "
+              f"rsa.decrypt: {rsa_time / len(requests) * 1000:8.2f} ms")
+
+    client.close()
+    connection.close()
+
+    print(f"CRT speedup of the CREATE handling: "
+          f"x{timings['private_key(d, n)'] / timings['private_key with CRT']:.2f}")
+
+
+# Program start
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,61 @@
+# Imports
+import argparse
+import os
+import time
+
+from common import add_tree_path
+
+
+# Functions
+def main():
+    """
+    Benchmark of the RSA key generation: the primes one after the other on one core (rsa()) against the parallel
+    searches in the worker processes (rsa.generate). The prime search time varies a lot, so several key pairs are made
+    """
+    parser = argparse.ArgumentParser(description='RSA key generation benchmark')
+    parser.add_argument('--keys', type=int, default=3, help='count of the key pairs generated per case')
+    parser.add_argument('--bits', type=int, default=None, help='size of every prime (bits), default - rsa.PRIME_BITS')
+    parser.add_argument('--workers', type=int, nargs='+', default=None,
+                        help='counts of the worker processes (default - 1, 2 and the count of the cores)')
+    arguments = parser.parse_args()
+
+    add_tree_path('TOR')
+    from Encryptions.Backend import backend
+    from Encryptions.RSA import rsa
+
+    if arguments.bits is not None:
+        rsa.PRIME_BITS = arguments.bits
+
+    cores = os.cpu_count() or 1
+    workers_counts = arguments.workers or sorted({1, 2, cores})
+
+    print(f"Backend: {backend.get_name()}, prime size: {rsa.PRIME_BITS} bits, cores: {cores}")
+    if cores == 1:
+        print("Only one core - the worker processes share it, no speedup is expected")
+
+    def check(key_pair: rsa) -> None:
+        assert rsa.decrypt(rsa.encrypt(12345, key_pair.get_public_key()), key_pair.get_private_key()) == 12345
+
+    start = time.perf_counter()
+    for _ in range(arguments.keys):
+        check(rsa())
+    sequential_time = (time.perf_counter() - start) / arguments.keys
+    print(f"{'sequential':>12}: {sequential_time:8.3f} s per key pair")
+
+    for workers in workers_counts:
+        # The worker processes are started before the measure (like a node, that starts the pool on the first key)
+        check(rsa.generate(workers))
+
+        start = time.perf_counter()
+        for _ in range(arguments.keys):
+            check(rsa.generate(workers))
+        parallel_time = (time.perf_counter() - start) / arguments.keys
+
+        print(f"{f'{workers} workers':>12}: {parallel_time:8.3f} s per key pair (x{sequential_time / parallel_time:.2f})")
+
+    rsa.shutdown_pool()
+
+
+# Program start
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+# Imports
+import argparse
+import os
+import random
+import string
+
+from common import add_tree_path, measure
+
+
+# Functions
+def str_chain(request: str, keys: list) -> list[int]:
+    """
+    Onion path of the str API: every layer is a str, every hop sends it as UTF-8
+    :param request: the plain request
+    :param keys: aes instances from the exit node to the entry node
+    :return: bytes on the wire of every hop (from the entry node to the exit node)
+    """
+    layers = []
+    for key in keys:
+        request = key.encrypt(request)
+        layers.append(len(request.encode()))
+
+    return layers[::-1]
+
+
+def bytes_chain(request: str, keys: list) -> list[int]:
+    """
+    Onion path of the bytes API: every layer goes on the wire as it is
+    :param request: the plain request
+    :param keys: aes instances from the exit node to the entry node
+    :return: bytes on the wire of every hop (from the entry node to the exit node)
+    """
+    data = request.encode()
+
+    layers = []
+    for key in keys:
+        data = key.encrypt_bytes(data)
+        layers.append(len(data))
+
+    return layers[::-1]
+
+
+def main():
+    """
+    Benchmark of the bytes on the wire per Data message through a 3 hops circuit, str path vs bytes path
+    """
+    parser = argparse.ArgumentParser(description='Onion wire size benchmark')
+    parser.add_argument('--tree', default='TOR', help='tree to benchmark: TOR or DirectoryServer')
+    parser.add_argument('--hops', type=int, default=3, help='count of the onion layers')
+    arguments = parser.parse_args()
+
+    add_tree_path(arguments.tree)
+    from Encryptions.AES import aes
+
+    keys = [aes(int.from_bytes(os.urandom(256), 'big')) for _ in range(arguments.hops)]
+
+    for payload_size in (16, 256, 1024, 4096):
+        payload = ''.join(random.choices(string.ascii_letters, k=payload_size))
+        request = f"4#1,1,{payload}"
+
+        before = str_chain(request, keys)
+        after = bytes_chain(request, keys)
+
+        before_time = measure(lambda: str_chain(request, keys))
+        after_time = measure(lambda: bytes_chain(request, keys))
+
+        print(f"payload {payload_size:>5} B | str + UTF-8: {sum(before):>6} B on the wire {before} {before_time * 1000:7.2f} ms | "
+              f"bytes: {sum(after):>6} B on the wire {after} {after_time * 1000:7.2f} ms | x{sum(before) / sum(after):.2f}")
+
+
+# Program start
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,40 @@
+# Imports
+import os
+import sys
+import time
+
+
+# Constants
+REPOSITORY_PATH = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+TREES = ('TOR', 'DirectoryServer')
+
+
+# Functions
+def add_tree_path(tree: str = 'TOR') -> None:
+    """
+    Function makes the modules of the given tree importable (as if the benchmark was run from the tree directory)
+    :param tree: name of the tree - TOR or DirectoryServer
+    """
+    if tree not in TREES:
+        raise ValueError(f"Tree {tree} is not supported")
+
+    tree_path = os.path.join(REPOSITORY_PATH, tree)
+    if tree_path not in sys.path:
+        sys.path.insert(0, tree_path)
+
+
+def measure(function, repeat: int = 3) -> float:
+    """
+    Function runs the given function several times and returns the best time
+    :param function: function without arguments to measure
+    :param repeat: how many times to run the function
+    :return: the best run time in seconds
+    """
+    best = float('inf')
+
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        best = min(best, time.perf_counter() - start)
+
+    return best
@@ -0,0 +1,259 @@
+# Imports
+import argparse
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import time
+
+from common import TREES, add_tree_path
+
+
+# Constants
+BASELINES_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'baselines')
+
+# Allowed slowdown against the baseline before a case counts as a regression (0.25 - 25% slower)
+DEFAULT_THRESHOLD = 0.25
+
+# Minimal time of one sample - fast cases are run several times per sample
+MIN_SAMPLE_TIME = 0.1
+
+# Count of the samples of a case (the best is taken)
+REPEAT = 5
+
+AES_SIZES = (16, 256, 1024, 8192)
+ONION_LAYERS = (1, 2, 3, 4, 5)
+ONION_PAYLOAD_SIZE = 1024
+
+
+# Functions
+def time_case(function, repeat: int) -> float:
+    """
+    Function measures the time of one call of the function (calls per sample are chosen like timeit.autorange)
+    :param function: function without arguments to measure
+    :param repeat: count of the samples (the best is taken)
+    :return: the best time of one call in seconds
+    """
+    number = 1
+    while True:
+        start = time.perf_counter()
+        for _ in range(number):
+            function()
+        elapsed = time.perf_counter() - start
+
+        if elapsed >= MIN_SAMPLE_TIME:
+            break
+        number *= 2
+
+    best = elapsed / number
+    for _ in range(repeat - 1):
+        start = time.perf_counter()
+        for _ in range(number):
+            function()
+        best = min(best, (time.perf_counter() - start) / number)
+
+    return best
+
+
+def make_cases(tree: str, keygen: bool) -> dict:
+    """
+    Function makes the benchmark cases of the tree
+    :param tree: name of the tree - TOR or DirectoryServer
+    :param keygen: True - include the RSA key generation (seconds per key)
+    :return: dict of the case name to a tuple of (function without arguments, count of the samples)
+    """
+    add_tree_path(tree)
+    from Encryptions.AES import aes, aes_ctr_session
+    from Encryptions.DH import dh
+    from Encryptions.RSA import rsa
+    from Constants import Constants
+
+    generator = random.Random(6243037)
+    cases = {}
+
+    # AES of every payload size
+    cipher = aes(generator.getrandbits(2048))
+    for size in AES_SIZES:
+        text = ''.join(chr(generator.randrange(32, 127)) for _ in range(size))
+        data = text.encode()
+        encrypted_text, encrypted_data = cipher.encrypt(text), cipher.encrypt_bytes(data)
+
+        cases[f'aes.encrypt/{size}'] = (lambda text=text: cipher.encrypt(text), REPEAT)
+        cases[f'aes.decrypt/{size}'] = (lambda encrypted=encrypted_text: cipher.decrypt(encrypted), REPEAT)
+        cases[f'aes.encrypt_bytes/{size}'] = (lambda data=data: cipher.encrypt_bytes(data), REPEAT)
+        cases[f'aes.decrypt_bytes/{size}'] = (lambda encrypted=encrypted_data: cipher.decrypt_bytes(encrypted), REPEAT)
+
+    # Onion (wrap and unwrap of one message): the client's onion cipher, or the layers chain in the directory tree
+    payload = bytes(generator.getrandbits(8) for _ in range(ONION_PAYLOAD_SIZE))
+    for layers_count in ONION_LAYERS:
+        layers = [aes_ctr_session(generator.getrandbits(2048), initiator=True) for _ in range(layers_count)]
+
+        if tree == 'TOR':
+            from Encryptions.OnionCipher import OnionCipher
+            onion = OnionCipher(layers)
+
+            def onion_round_trip(onion=onion):
+                onion.unwrap(onion.wrap(payload))
+        else:
+            def onion_round_trip(layers=layers):
+                data = payload
+                for layer in layers:
+                    data = layer.encrypt_bytes(data)
+                for layer in reversed(layers):
+                    data = layer.decrypt_bytes(data)
+
+        cases[f'onion/{layers_count}'] = (onion_round_trip, REPEAT)
+
+    # RSA
+    if keygen:
+        cases['rsa.keygen'] = (rsa, 1)
+
+    key_pair = rsa()
+    rsa_public, rsa_private = key_pair.get_public_key(), key_pair.get_private_key()
+    plain_number = generator.getrandbits(2048)
+    encrypted_number = rsa.encrypt(plain_number, rsa_public)
+
+    cases['rsa.encrypt'] = (lambda: rsa.encrypt(plain_number, rsa_public), REPEAT)
+    cases['rsa.decrypt'] = (lambda: rsa.decrypt(encrypted_number, rsa_private), REPEAT)
+
+    # DH of every preset prime
+    for index, parameters in enumerate(dh.get_presets()):
+        current_dh = dh(parameters)
+        private_number = generator.getrandbits(2048)
+        other_public_key = current_dh.generate_public_key(generator.getrandbits(2048))
+
+        cases[f'dh.generate_public_key/{index}'] = (
+            lambda current_dh=current_dh, private_number=private_number:
+            current_dh.generate_public_key(private_number), REPEAT)
+        cases[f'dh.exchange/{index}'] = (
+            lambda current_dh=current_dh, private_number=private_number, other=other_public_key:
+            current_dh.exchange(other, private_number), REPEAT)
+
+    # Session key hash
+    dh_key = generator.getrandbits(2048)
+    cases['Constants.key_hash'] = (lambda: Constants.key_hash(dh_key), REPEAT)
+
+    return cases
+
+
+def run_tree(tree: str, keygen: bool) -> dict:
+    """
+    Function runs all the cases of the tree
+    :param tree: name of the tree - TOR or DirectoryServer
+    :param keygen: True - include the RSA key generation
+    :return: the report - environment and the time of every case (seconds)
+    """
+    cases = make_cases(tree, keygen)
+
+    from Encryptions.Backend import backend
+
+    return {
+        'tree': tree,
+        'backend': backend.get_name(),
+        'python': platform.python_version(),
+        'machine': platform.machine(),
+        'results': {name: time_case(function, repeat) for name, (function, repeat) in cases.items()}
+    }
+
+
+def compare(report: dict, baseline: dict, threshold: float) -> list[str]:
+    """
+    Function compares the report to the baseline and prints the table
+    :param report: the current report
+    :param baseline: the baseline report of the same tree
+    :param threshold: allowed slowdown (0.25 - 25% slower)
+    :return: names of the regressed cases
+    """
+    if baseline.get('backend') != report['backend']:
+        print(f"Warning: baseline backend is {baseline.get('backend')}, current is {report['backend']}")
+
+    regressions = []
+
+    for name, seconds in report['results'].items():
+        base_seconds = baseline['results'].get(name)
+
+        if base_seconds is None:
+            print(f"  {name:<32} {seconds * 1000:10.3f} ms  (new)")
+            continue
+
+        ratio = seconds / base_seconds
+        status = 'REGRESSION' if ratio > 1 + threshold else ''
+
+        if status:
+            regressions.append(name)
+
+        print(f"  {name:<32} {seconds * 1000:10.3f} ms  baseline {base_seconds * 1000:10.3f} ms  "
+              f"x{ratio:5.2f}  {status}")
+
+    return regressions
+
+
+def main():
+    """
+    Crypto micro-benchmark suite: runs the cases of a tree, emits JSON and compares it against the committed baseline
+    """
+    parser = argparse.ArgumentParser(description='Crypto micro-benchmark suite')
+    parser.add_argument('--tree', default='TOR', choices=TREES + ('all',), help='tree to benchmark')
+    parser.add_argument('--threshold', type=float, default=DEFAULT_THRESHOLD,
+                        help='allowed slowdown against the baseline (0.25 - 25%% slower)')
+    parser.add_argument('--output', help='file to write the JSON report to (default - stdout)')
+    parser.add_argument('--baseline', help='baseline file (default - baselines/<tree>.json)')
+    parser.add_argument('--save-baseline', action='store_true', help='store the report as the new baseline')
+    parser.add_argument('--no-keygen', action='store_true', help='skip the RSA key generation case (slow)')
+    arguments = parser.parse_args()
+
+    # Every tree in its own process - the trees have modules with the same names
+    if arguments.tree == 'all':
+        failed = False
+
+        for tree in TREES:
+            command = [sys.executable, os.path.abspath(__file__), '--tree', tree,
+                       '--threshold', str(arguments.threshold)]
+            command += ['--save-baseline'] if arguments.save_baseline else []
+            command += ['--no-keygen'] if arguments.no_keygen else []
+            command += ['--output', f'{arguments.output}.{tree}.json'] if arguments.output else []
+
+            failed |= subprocess.run(command).returncode != 0
+
+        sys.exit(1 if failed else 0)
+
+    report = run_tree(arguments.tree, not arguments.no_keygen)
+    report_json = json.dumps(report, indent=4)
+
+    if arguments.output:
+        with open(arguments.output, 'w') as file:
+            file.write(report_json)
+    else:
+        print(report_json)
+
+    baseline_path = arguments.baseline or os.path.join(BASELINES_PATH, f'{arguments.tree}.json')
+
+    if arguments.save_baseline:
+        with open(baseline_path, 'w') as file:
+            file.write(report_json + '\n')
+
+        print(f"Baseline saved: {baseline_path}")
+        return
+
+    if not os.path.exists(baseline_path):
+        print(f"No baseline: {baseline_path}")
+        return
+
+    with open(baseline_path) as file:
+        baseline = json.load(file)
+
+    print(f"Comparison with {baseline_path} (threshold {arguments.threshold:.0%}):")
+    regressions = compare(report, baseline, arguments.threshold)
+
+    if regressions:
+        print(f"{len(regressions)} regression(s): {', '.join(regressions)}")
+        sys.exit(1)
+
+    print("No regressions")
+
+
+# Program start
+if __name__ == "__main__":
+    main()
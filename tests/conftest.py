@@ -0,0 +1,19 @@
+# Imports
+import os
+import sys
+
+
+# Function
+def add_directory_server_path() -> None:
+    """
+    Function makes the modules of the directory server importable (as if the tests were run from its directory),
+    its Encryptions package is the same as the one of the TOR tree
+    """
+    tree_path = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'DirectoryServer')
+    if tree_path not in sys.path:
+        sys.path.insert(0, tree_path)
+
+
+add_directory_server_path()
+
+import DirectoryServer          # Adds the paths of the directory server modules
@@ -0,0 +1,56 @@
+# Imports
+import random
+
+import pytest
+
+from Encryptions.AES import aes
+
+
+# Constants
+KEYS_COUNT = 3
+
+# Block counts around the group boundaries of the bitsliced engine (8 groups of blocks in the planes)
+BLOCKS_COUNTS = (1, 7, 8, 9, 63, 64, 65, 130)
+
+
+# Functions
+@pytest.fixture(params=range(KEYS_COUNT))
+def generator(request) -> random.Random:
+    """
+    Fixture of a random generator of the keys and the data, one per checked key
+    :return: the generator
+    """
+    return random.Random(3141 + request.param)
+
+
+def test_bytes(generator):
+    dh_key = generator.getrandbits(2048)
+    reference, table, bitsliced = aes(dh_key, 'matrix'), aes(dh_key, 'table'), aes(dh_key, 'bitslice')
+
+    for blocks_count in BLOCKS_COUNTS:
+        data = bytes(generator.getrandbits(8) for _ in range(16 * blocks_count))
+        encrypted = reference.encrypt_bytes(data)
+
+        assert bitsliced.encrypt_bytes(data) == encrypted == table.encrypt_bytes(data)
+        assert bitsliced.decrypt_bytes(encrypted) == reference.decrypt_bytes(encrypted)
+
+
+def test_text(generator):
+    dh_key = generator.getrandbits(2048)
+    reference, bitsliced = aes(dh_key, 'matrix'), aes(dh_key, 'bitslice')
+
+    text = ''.join(chr(generator.randrange(32, 127)) for _ in range(generator.randrange(1, 200)))
+
+    assert bitsliced.encrypt(text) == reference.encrypt(text)
+    assert bitsliced.decrypt(reference.encrypt(text)) == text
+
+
+def test_batch(generator):
+    # Bitsliced (without NumPy) from aes.BITSLICE_BATCH_SIZE blocks
+    table = aes(generator.getrandbits(2048), 'table')
+    blocks = [bytes(generator.getrandbits(8) for _ in range(16)) for _ in range(aes.BITSLICE_BATCH_SIZE + 3)]
+
+    encrypted_blocks = [bytes(block) for block in aes.encrypt_batch(blocks, table)]
+
+    assert encrypted_blocks == [table.encrypt_bytes(block) for block in blocks]
+    assert [bytes(block) for block in aes.decrypt_batch(encrypted_blocks, table)] == blocks
@@ -0,0 +1,156 @@
+# Imports
+import random
+from collections.abc import Iterator
+
+import pytest
+
+from Encryptions.Backend import backend
+from Encryptions.AES import aes
+from Encryptions.DH import dh
+from Encryptions.RSA import rsa, public_key, private_key
+
+
+# Constants
+# X25519 test vectors of RFC 7748 (section 5.2): scalar, u-coordinate, result
+X25519_VECTORS = (
+    ('a546e36bf0527c9d3b16154b82465edd62144c0ac1fc5a18506a2244ba449ac4',
+     'e6db6867583030db3594c1a424b15f7c726624ec26b3353b10a903a6d0ab1c4c',
+     'c3da55379de9c6908e94ea4df28d084f32eccf03491c71f754b4075577a28552'),
+    ('4b66e9d4d1b4673c5ad22691957d6af5c11b6421e0ea01d42ca4169e7918ba0d',
+     'e5210f12786811d3f4b7959d0538ae2c31dbe7106fc03c3efc4cd549c715a493',
+     '95cbde9476e8907d7aade45cb4b873f88b595a68799fa152e6f8f7647aac7957')
+)
+
+# Results of the iterated X25519 of RFC 7748 (section 5.2) by the count of the iterations
+X25519_ITERATIONS = {
+    1: '422c8e7a6227d7bca1350b3e2bb7279f7897b87bb6854b783c60e80311ae3079',
+    1000: '684cf59ba83309552800ef566f2f4d3c1c3887c49360e3875f2eb94d99532c51'
+}
+
+# Diffie-Hellman of RFC 7748 (section 6.1): private keys and public keys of Alice and Bob, and their shared secret
+X25519_ALICE = ('77076d0a7318a57d3c16c17251b26645df4c2f87ebc0992ab177fba51db92c2a',
+                '8520f0098930a754748b7ddcb43ef75a0dbf3a0d26381af4eba4a98eaa9b4e6a')
+X25519_BOB = ('5dab087e624a8a4b79e17f8b83800ee66f3bb1292618b6fd1c2f8b27ff88e0eb',
+              'de9edb7d7b7dc1b4d35b61c2ece435373f8343c85b78674dadfc7e146f882b4f')
+X25519_SHARED_SECRET = '4a5d9d5ba4ce2de1728e3bf480350f25e07e21c947d19e3376f09b3c1e161742'
+
+
+# Functions
+@pytest.fixture(params=['python', 'pycryptodome'])
+def backend_name(request) -> str:
+    """
+    Fixture of the name of every backend (pycryptodome is skipped if it isn't installed)
+    :return: the name of the backend
+    """
+    if request.param == 'pycryptodome':
+        pytest.importorskip('Crypto')
+
+    return request.param
+
+
+@pytest.fixture
+def names() -> Iterator[list[str]]:
+    """
+    Fixture of the names of all the backends - the conformance needs two backends at least (skipped without
+    pycryptodome), the current backend is restored after the test
+    :return: [yield] the names of the backends
+    """
+    pytest.importorskip('Crypto')
+    current_name = backend.get_name()
+
+    yield list(backend.BACKENDS)
+    backend.set(current_name)
+
+
+@pytest.mark.parametrize('bits', [64, 1024, 2048, 4096])
+def test_power(names, bits):
+    generator = random.Random(6243037 + bits)
+    modulus = generator.getrandbits(bits) | (1 << (bits - 1)) | 1
+    base, exponent = generator.getrandbits(bits) % modulus, generator.getrandbits(bits)
+
+    results = {name: backend.BACKENDS[name].power(base, exponent, modulus) for name in names}
+    assert len(set(results.values())) == 1
+
+
+def test_primes(names):
+    # Primes of every backend are primes for all the backends
+    primes = {name: backend.BACKENDS[name].generate_prime(1024, rsa.PUBLIC_EXPONENT) for name in names}
+
+    for name, prime in primes.items():
+        assert prime.bit_length() == 1024
+        assert (prime - 1) % rsa.PUBLIC_EXPONENT
+
+        for checker in names:
+            assert backend.BACKENDS[checker].is_prime(prime)
+            assert not backend.BACKENDS[checker].is_prime(prime * primes[names[0]])
+
+
+def test_public_api(names):
+    # aes, dh and rsa on top of every backend give the same outputs
+    generator = random.Random(6243037)
+
+    p, q = (backend.BACKENDS[name].generate_prime(1024, rsa.PUBLIC_EXPONENT) for name in names[:2])
+    n, phi = p * q, (p - 1) * (q - 1)
+    rsa_public, rsa_private = public_key(rsa.PUBLIC_EXPONENT, n), private_key(pow(rsa.PUBLIC_EXPONENT, -1, phi), n)
+
+    dh_numbers = [(dh.generate_parameters(), generator.getrandbits(2048), generator.getrandbits(2048))
+                  for _ in range(3)]
+    message = bytes(generator.getrandbits(8) for _ in range(1000))
+    aes_key = generator.getrandbits(2048)
+    plain_number = generator.getrandbits(2000)
+
+    outputs = {}
+    for name in names:
+        backend.set(name)
+        cipher = aes(aes_key)
+
+        output = [cipher.encrypt_bytes(message), cipher.decrypt_bytes(cipher.encrypt_bytes(message))]
+
+        for parameters, first, second in dh_numbers:
+            first_dh, second_dh = dh(parameters), dh(parameters)
+            first_public, second_public = first_dh.generate_public_key(first), second_dh.generate_public_key(second)
+            first_key, second_key = first_dh.exchange(second_public, first), second_dh.exchange(first_public, second)
+
+            assert first_key == second_key
+            output += [first_public, second_public, first_key]
+
+        encrypted = rsa.encrypt(plain_number, rsa_public)
+        assert rsa.decrypt(encrypted, rsa_private) == plain_number
+        output.append(encrypted)
+
+        outputs[name] = output
+
+    assert all(output == outputs[names[0]] for output in outputs.values())
+
+
+@pytest.mark.parametrize('scalar, u, result', X25519_VECTORS)
+def test_x25519_vectors(backend_name, scalar, u, result):
+    assert backend.BACKENDS[backend_name].x25519(bytes.fromhex(scalar), bytes.fromhex(u)) == bytes.fromhex(result)
+
+
+@pytest.mark.parametrize('iterations', sorted(X25519_ITERATIONS))
+def test_x25519_iterations(backend_name, iterations):
+    x25519 = backend.BACKENDS[backend_name].x25519
+    k = u = (9).to_bytes(32, 'little')
+
+    for _ in range(iterations):
+        k, u = x25519(k, u), k
+
+    assert k == bytes.fromhex(X25519_ITERATIONS[iterations])
+
+
+def test_x25519_exchange(backend_name):
+    x25519 = backend.BACKENDS[backend_name].x25519
+    (alice_private, alice_public), (bob_private, bob_public) = ((bytes.fromhex(private), bytes.fromhex(public))
+                                                                for private, public in (X25519_ALICE, X25519_BOB))
+
+    assert x25519(alice_private) == alice_public
+    assert x25519(bob_private) == bob_public
+
+    assert x25519(alice_private, bob_public) == x25519(bob_private, alice_public) == bytes.fromhex(X25519_SHARED_SECRET)
+
+
+def test_x25519_small_order(backend_name):
+    # The point of order 1 (u = 0) gives no shared secret
+    with pytest.raises(ValueError):
+        backend.BACKENDS[backend_name].x25519(bytes.fromhex(X25519_ALICE[0]), bytes(32))
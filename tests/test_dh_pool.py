@@ -0,0 +1,41 @@
+# Imports
+import threading
+
+from Encryptions.DH import dh, dh_pool
+
+
+# Functions
+def test_refill():
+    pool = dh_pool(low_watermark=2, high_watermark=4)
+    parameters = dh.get_preset(0)
+
+    pool.get_key_pair(parameters)
+    pool.stop()
+
+    assert (pool.get_hits(), pool.get_misses()) == (0, 1)
+    assert pool.get_size(parameters) == 0
+
+
+def test_use_while_stopping():
+    # A pair asked between the release of the condition by stop and its join starts a new background thread, the
+    # stopped one still ends (stop returns)
+    pool = dh_pool(low_watermark=2, high_watermark=4)
+    parameters = dh.get_preset(0)
+
+    pool.fill([parameters])
+    stopped_thread = pool._dh_pool__thread
+
+    def join(timeout: float = None) -> None:
+        pool.get_key_pair(parameters)
+        threading.Thread.join(stopped_thread, timeout=10)
+
+    stopped_thread.join = join
+    pool.stop()
+
+    assert not stopped_thread.is_alive()
+
+    new_thread = pool._dh_pool__thread
+    assert new_thread is not None and new_thread is not stopped_thread and new_thread.is_alive()
+
+    pool.stop()
+    assert not new_thread.is_alive()
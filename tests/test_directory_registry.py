@@ -0,0 +1,108 @@
+# Imports
+import random
+from collections.abc import Iterator
+
+import pytest
+
+from DataBaseManager.DataBase import DataBase
+from DataBaseManager.DataBaseUser import DataBaseUser
+
+
+# Constants
+RELAYS_COUNT = 200
+CHANGES_COUNT = 300
+
+
+# Functions
+def user_parameters(index: int, generator: random.Random) -> str:
+    """
+    Function gives the append parameters of a relay (as the directory server receives them)
+    :param index: index of the relay
+    :param generator: random generator of the keys
+    :return: the parameters "username,password,e,n,ip,port,allow_exit,x25519"
+    """
+    n = generator.getrandbits(2048) | (1 << 2047)
+    x25519_key = generator.getrandbits(256).to_bytes(32, 'big').hex()
+
+    return f"relay{index},password{index},65537,{n},10.0.{index // 250}.{index % 250},{9001 + index},1,{x25519_key}"
+
+
+def check_registry(db: DataBase) -> None:
+    """
+    Function checks that the reads of the database (served by the registry of the relays) give the rows of the
+    database file
+    :param db: the database to check
+    """
+    key_index = DataBase.PUBLIC_KEY_INDEX
+    rows = [row[:key_index] + (int.from_bytes(row[key_index], 'big'),) + row[key_index + 1:] for row in db.get_users()]
+
+    assert db.get_relays() == rows
+
+    # The first registered relay of every address (like the query of the database)
+    first_relays = {}
+    for row in rows:
+        first_relays.setdefault((row[DataBase.IP_INDEX], row[DataBase.PORT_INDEX]), row)
+
+    for (ip, port), row in first_relays.items():
+        assert db.get_rsa_by_ip(ip, port) == row[key_index]
+        assert db.get_x25519_by_ip(ip, port) == row[DataBase.X25519_KEY_INDEX]
+
+    for row in rows:
+        assert db.is_password_valid(row[DataBase.USERNAME_INDEX], row[DataBase.PASSWORD_INDEX])
+
+
+@pytest.fixture
+def database(tmp_path) -> Iterator[tuple[str, DataBase]]:
+    """
+    Fixture of a database with registered relays, after random changes: a relay moves to another address, changes
+    its keys or the availability, new relays and removed relays
+    :return: [yield] tuple of the path of the database file and the database
+    """
+    generator = random.Random(1729)
+    path = str(tmp_path / 'db' / 'TOR_DB.db')
+    db = DataBase(path)
+
+    users = [DataBaseUser(user_parameters(index, generator)) for index in range(RELAYS_COUNT)]
+    for user in users:
+        db.add_user(user)
+
+    for index in range(CHANGES_COUNT):
+        user_index = generator.randrange(len(users))
+        user = users[user_index]
+        change = generator.randrange(5)
+
+        if change == 0:
+            db.change_ip_and_port(user.get_username(), 20000 + index, f"10.1.{index // 250}.{index % 250}")
+        elif change == 1:
+            changed = DataBaseUser(user_parameters(user_index, generator))
+            db.change_rsa_public_key(changed)
+            db.change_x25519_public_key(changed)
+        elif change == 2:
+            db.change_availability(user.get_ip(), user.get_port(), available=index % 2)
+        elif change == 3:
+            db.add_user(DataBaseUser(user_parameters(RELAYS_COUNT + index, generator)))
+        else:
+            db.remove_user(user.get_username())
+
+    yield path, db
+    db.close()
+
+
+def test_registry_after_changes(database):
+    _, db = database
+    check_registry(db)
+
+
+def test_registry_at_startup(database):
+    path, _ = database
+    check_registry(DataBase(path))
+
+
+def test_unknown_relay(database):
+    _, db = database
+
+    with pytest.raises(ValueError):
+        db.get_rsa_by_ip('10.2.0.1', 1)
+
+    with pytest.raises(ValueError):
+        db.get_x25519_by_ip('10.2.0.1', 1)
@@ -0,0 +1,130 @@
+# Imports
+import pytest
+
+from DirectoryServer import _DirectoryRequests
+from DataBaseManager.DataBase import DataBase
+from DataBaseManager.DataBaseUser import DataBaseUser
+from Encryptions.AES import aes
+
+
+# Constants
+# The key of the session of the tests
+SESSION_KEY = 6243037
+
+
+# Functions
+def append_request(index: int, x25519_public_key: str = '', bandwidth: str = '') -> str:
+    """
+    Function gives the append request of a relay
+    :param index: index of the relay
+    :param x25519_public_key: the static X25519 public key (hex, empty - no x25519 handshake suite)
+    :param bandwidth: the bandwidth (KB/s, empty - the default bandwidth)
+    :return: the request
+    """
+    return f"append#relay{index},password,65537,{(1 << 2047) | 1},10.0.0.{index},{9001 + index},1," \
+           f"{x25519_public_key},{bandwidth}"
+
+
+@pytest.fixture
+def requests(tmp_path) -> _DirectoryRequests:
+    """
+    Fixture of the requests of a directory server on an empty database
+    :return: the requests
+    """
+    return _DirectoryRequests(str(tmp_path / 'db' / 'TOR_DB.db'))
+
+
+@pytest.fixture
+def respond(requests):
+    """
+    Fixture of a function that sends a request of a started session
+    :return: function of the request that gives the decrypted response (None if the session ends)
+    """
+    AES = aes(SESSION_KEY)
+
+    def send(request: str) -> str | None:
+        response = requests.respond(AES, request)
+        return response if not response else AES.decrypt_bytes(response).decode()
+
+    return send
+
+
+def test_append(respond):
+    assert respond(append_request(1, '11' * 32)) == 'appended'
+    assert respond('get_rsa#10.0.0.1:9002') == f"65537,{(1 << 2047) | 1},{'11' * 32}"
+
+
+@pytest.mark.parametrize('x25519_public_key', ['11' * 31, '11' * 33, 'not hex'])
+def test_append_bad_x25519_key(respond, x25519_public_key):
+    assert respond(append_request(1, x25519_public_key)) == 'error'
+    assert respond('get_rsa#10.0.0.1:9002') == 'error'
+
+
+def test_append_bandwidth_clamped(tmp_path, respond):
+    assert respond(append_request(1, bandwidth=str(10 ** 12))) == 'appended'
+    assert respond(append_request(2, bandwidth='0')) == 'appended'
+    assert respond(append_request(3)) == 'appended'
+
+    bandwidths = {relay[DataBase.USERNAME_INDEX]: relay[DataBase.BANDWIDTH_INDEX]
+                  for relay in DataBase(str(tmp_path / 'db' / 'TOR_DB.db')).get_relays()}
+
+    assert bandwidths == {'relay1': DataBaseUser.MAX_BANDWIDTH, 'relay2': 1, 'relay3': DataBaseUser.DEFAULT_BANDWIDTH}
+
+
+@pytest.fixture
+def circuits(requests, respond):
+    """
+    Fixture of a function that constructs a circuit between two of the appended relays
+    :return: function that gives the circuit id of a new circuit
+    """
+    for index in range(6):
+        assert respond(append_request(index)) == 'appended'
+
+    def construct() -> str:
+        response = respond('construct#relay0,relay1')
+        assert response != 'error'
+
+        return response.split(',')[0]
+
+    return construct
+
+
+def test_close(requests, respond, circuits):
+    counts = requests._DirectoryRequests__db.get_circuits_counts
+
+    circuit_ids = [circuits() for _ in range(3)]
+    assert sum(counts().values()) == 9
+
+    for circuit_id in circuit_ids:
+        assert respond(f"close#{circuit_id}") == b''
+
+    assert counts() == {}
+
+    # A closed or an unknown circuit changes nothing
+    assert respond(f"close#{circuit_ids[0]}") == b''
+    assert respond('close#abc') == b''
+    assert counts() == {}
+
+
+def test_expire(requests, circuits, monkeypatch):
+    counts = requests._DirectoryRequests__db.get_circuits_counts
+
+    for _ in range(3):
+        circuits()
+
+    # The next construct closes the circuits older than the lifetime
+    monkeypatch.setattr(_DirectoryRequests, 'CIRCUIT_LIFETIME', 0)
+    circuits()
+
+    assert sum(counts().values()) == 3
+
+
+@pytest.mark.parametrize('request_text', ['get_rsa', 'get_rsa#10.0.0.1', 'get_rsa#10.0.0.1:port', 'construct',
+                                          'construct#relay0', 'append', 'append#relay0,password'])
+def test_malformed_request(respond, request_text):
+    assert respond(request_text) == 'error'
+
+
+@pytest.mark.parametrize('request_text', ['teardown', 'teardown#10.0.0.1', 'close'])
+def test_malformed_request_without_response(respond, request_text):
+    assert respond(request_text) == b''